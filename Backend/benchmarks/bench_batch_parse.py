@@ -0,0 +1,121 @@
+"""
+Benchmark: multi-image /api/parse, per-image vs. batched Vision calls
+
+Runs routers.parse.parse_images on N images in both modes against a fake
+vision LLM. Each call sleeps for a base latency plus a per-image cost, and
+tokens are estimated per call: the text prompt (system prompt, labels, note)
+plus a fixed cost per image. Per-image mode repeats the system prompt for
+every image; batched mode pays it once. --miss-rate drops a fraction of
+images from the batched answer to show the cost of the per-image fallback.
+No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_batch_parse [--images 6] [--miss-rate 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+
+from config import settings  # noqa: E402
+from routers.parse import parse_images  # noqa: E402
+from services import llm_service  # noqa: E402
+from services.prompt_budget import count_tokens  # noqa: E402
+
+from benchmarks.bench_multi_image import make_images  # noqa: E402
+
+# Vision input tokens per image (OpenAI high-detail estimate for a portrait poster)
+IMAGE_TOKENS = 765
+
+
+class VisionFakeLLM(FakeListChatModel):
+    """Fake vision model: one event per image, latency and tokens grow with the image count"""
+    base_latency: float = 0.8
+    per_image_latency: float = 0.15
+    miss_rate: float = 0.0
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    responses: list = [""]
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text_tokens = 0
+        image_count = 0
+        for message in messages:
+            parts = message.content if isinstance(message.content, list) else [message.content]
+            for part in parts:
+                if isinstance(part, dict) and part.get("type") == "image_url":
+                    image_count += 1
+                else:
+                    text_tokens += count_tokens(part["text"] if isinstance(part, dict) else part)
+
+        start = (datetime.now() + timedelta(days=7)).replace(microsecond=0)
+        events = []
+        for i in range(image_count):
+            event = {"title": f"Poster event {self.calls}-{i}", "start_time": (start + timedelta(hours=i)).isoformat()}
+            if image_count > 1:
+                if random.random() < self.miss_rate:
+                    continue
+                event["source_image_index"] = i
+            events.append(event)
+        content = json.dumps({"events": events})
+
+        self.calls += 1
+        self.input_tokens += text_tokens + image_count * IMAGE_TOKENS
+        self.output_tokens += count_tokens(content)
+        await asyncio.sleep(self.base_latency + self.per_image_latency * image_count)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+async def run(images: list, mode: str, args) -> tuple:
+    """Return (wall-clock seconds, events, fake LLM)"""
+    llm = VisionFakeLLM(
+        base_latency=args.base_latency,
+        per_image_latency=args.per_image_latency,
+        miss_rate=args.miss_rate,
+    )
+    llm_service.get_llm = lambda: llm
+    started = time.perf_counter()
+    events = await parse_images(images, "from the bench", mode=mode)
+    return time.perf_counter() - started, events, llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", type=int, default=6)
+    parser.add_argument("--base-latency", type=float, default=0.8, help="Fixed latency per Vision call (s)")
+    parser.add_argument("--per-image-latency", type=float, default=0.15, help="Added latency per image in a call (s)")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="Fraction of images the batched call returns nothing for")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    settings.ENABLE_WEB_SEARCH = False
+    random.seed(args.seed)
+    images = make_images(args.images)
+
+    print(f"{args.images} images, {IMAGE_TOKENS} tokens/image, miss rate {args.miss_rate:.0%}")
+    for mode in ["per_image", "batched"]:
+        elapsed, events, llm = asyncio.run(run(images, mode, args))
+        with_thumbnail = sum(1 for e in events if e.source_thumbnail)
+        print(f"{mode:>10}: {elapsed:6.2f}s  calls={llm.calls:<3} "
+              f"input_tokens={llm.input_tokens:<6} output_tokens={llm.output_tokens:<5} "
+              f"events={len(events)} (with thumbnail {with_thumbnail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Load test: /api/chat?stream=true end to end against the fake OpenAI server
+
+Starts benchmarks.fake_openai and the backend (uvicorn, temporary SQLite
+database, OPENAI_BASE_URL pointing at the fake) as subprocesses, then runs
+--requests chat turns with --concurrency clients over real HTTP. Messages
+cycle through create / query / chat turns from the preset users. Reports
+throughput, time to first SSE event and to the "done" event (p50/p95/p99),
+failed turns, the LLM requests per prompt and the share of prompt tokens
+served from the fake's prompt cache. Use --target to load an already
+running backend instead.
+
+No real OpenAI or search calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_chat_stream_load [--requests 200] [--concurrency 1,10,50]
+        [--ttft lognormal:0.4,0.5] [--token-interval fixed:0.01] [--error-rate 0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+USERS = ["alice123", "bob123", "jane123", "xiao123", "moni123"]  # Token = password
+MESSAGES = [
+    "Schedule a team meeting tomorrow at 10",
+    "what do I have tomorrow",
+    "hello there, what can you do?",
+    "when is the team meeting",
+]
+
+
+def start(args: list, env: dict) -> subprocess.Popen:
+    """Start a server process; its output goes to a temporary log file (shown if it exits)"""
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(args, cwd=BACKEND_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+    process.log = log
+    return process
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            process.log.seek(0)
+            raise RuntimeError(f"{' '.join(process.args)} exited:\n{process.log.read().decode()[-2000:]}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+async def chat_turn(client: httpx.AsyncClient, token: str, message: str) -> tuple:
+    """(seconds to first event, seconds to done, ok) for one streamed turn"""
+    started = time.perf_counter()
+    first = None
+    async with client.stream(
+        "POST",
+        "/api/chat?stream=true",
+        json={"message": message},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as response:
+        if response.status_code != 200:
+            return time.perf_counter() - started, time.perf_counter() - started, False
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if first is None:
+                first = time.perf_counter() - started
+            event = json.loads(line[6:])
+            if event.get("type") == "done":
+                return first, time.perf_counter() - started, True
+            if event.get("type") == "error":
+                return first, time.perf_counter() - started, False
+    return first or 0.0, time.perf_counter() - started, False
+
+
+async def run_load(target: str, requests: int, concurrency: int) -> dict:
+    turns = itertools.cycle(itertools.product(USERS, MESSAGES))
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(next(turns))
+    firsts, totals, failures = [], [], 0
+
+    async def worker(client):
+        nonlocal failures
+        while not queue.empty():
+            token, message = queue.get_nowait()
+            try:
+                first, total, ok = await chat_turn(client, token, message)
+            except httpx.HTTPError:
+                failures += 1
+                continue
+            if ok:
+                firsts.append(first)
+                totals.append(total)
+            else:
+                failures += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "throughput": len(totals) / elapsed,
+        "first_p50": percentile(firsts, 0.5),
+        "first_p95": percentile(firsts, 0.95),
+        "done_p50": percentile(totals, 0.5),
+        "done_p95": percentile(totals, 0.95),
+        "done_p99": percentile(totals, 0.99),
+        "failed": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated client counts")
+    parser.add_argument("--ttft", default="lognormal:0.4,0.5")
+    parser.add_argument("--token-interval", default="fixed:0.01")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--target", help="backend URL to load (skip starting the fake server and backend)")
+    parser.add_argument("--fake-port", type=int, default=8001)
+    parser.add_argument("--port", type=int, default=8002)
+    args = parser.parse_args()
+
+    processes = []
+    target = args.target
+    try:
+        if not target:
+            fake = start(
+                [
+                    sys.executable, "-m", "benchmarks.fake_openai", "--port", str(args.fake_port),
+                    "--ttft", args.ttft, "--token-interval", args.token_interval, "--error-rate", str(args.error_rate),
+                ],
+                {},
+            )
+            processes.append(fake)
+            wait_ready(f"http://127.0.0.1:{args.fake_port}/v1/models", fake)
+
+            db_path = Path(tempfile.mkdtemp()) / "load.db"
+            backend = start(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+                {
+                    "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+                    "OPENAI_API_KEY": "sk-fake",
+                    "DATABASE_URL": f"sqlite:///{db_path}",
+                    "LOG_LEVEL": "WARNING",
+                    "LOG_FILE_ENABLED": "false",
+                },
+            )
+            processes.append(backend)
+            target = f"http://127.0.0.1:{args.port}"
+            wait_ready(f"{target}/api/health", backend)
+
+        print(f"{args.requests} streamed chat turns against {target} (fake LLM ttft={args.ttft}, error rate={args.error_rate})")
+        print(f"{'clients':>8} {'turns/s':>8} {'first p50':>10} {'first p95':>10} {'done p50':>9} {'done p95':>9} {'done p99':>9} {'failed':>7}")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            r = asyncio.run(run_load(target, args.requests, concurrency))
+            print(
+                f"{r['concurrency']:>8} {r['throughput']:>8.1f} {r['first_p50'] * 1000:>8.0f}ms {r['first_p95'] * 1000:>8.0f}ms "
+                f"{r['done_p50'] * 1000:>7.0f}ms {r['done_p95'] * 1000:>7.0f}ms {r['done_p99'] * 1000:>7.0f}ms {r['failed']:>7}"
+            )
+        if not args.target:
+            stats = httpx.get(f"http://127.0.0.1:{args.fake_port}/stats").json()
+            print(f"LLM requests per prompt: {stats['requests']}")
+            prompt_tokens = sum(stats["prompt_tokens"].values())
+            if prompt_tokens:
+                print(f"Prompt tokens served from the (simulated) prompt cache: {sum(stats['cached_tokens'].values()) / prompt_tokens:.0%}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
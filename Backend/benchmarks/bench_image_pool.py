@@ -0,0 +1,112 @@
+"""
+Benchmark: preprocessing 20 images at once - inline vs. thread pool vs. process pool
+
+Preprocesses N distinct photos (from tests/images, each marked so no two
+share a content hash) concurrently, the way a multi-image /api/parse or
+chat message does, and reports wall-clock time, throughput and the worst
+event-loop stall (measured by a 10 ms heartbeat coroutine). Inline runs
+Pillow on the event loop as before; the pool modes use
+services.image_pool.ImagePool with 1..--workers workers. Process pools are
+warmed up before timing. No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_image_pool [--images 20] [--workers 4]
+"""
+import argparse
+import asyncio
+import base64
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from services.image_pool import ImagePool  # noqa: E402
+from services.image_utils import preprocess_image  # noqa: E402
+
+IMAGES_DIR = Path(__file__).parent.parent / "tests" / "images"
+
+
+def make_images(count: int) -> list:
+    """Distinct poster photos: tests/images cycled, each with a numbered mark"""
+    sources = [Image.open(path).convert("RGB") for path in sorted(IMAGES_DIR.iterdir()) if path.is_file()]
+    images = []
+    for i in range(count):
+        image = sources[i % len(sources)].copy()
+        ImageDraw.Draw(image).rectangle((0, 0, 40 + i, 40), fill=(i * 12 % 256, 0, 0))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=92)
+        images.append(base64.b64encode(buffer.getvalue()).decode())
+    return images
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    """Record how late each 10 ms tick fires (event-loop stall)"""
+    interval = 0.01
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - expected)
+
+
+async def run(images: list, pool) -> tuple:
+    """Return (wall-clock seconds, worst event-loop stall)"""
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0.02)
+
+    start = time.perf_counter()
+    if pool is None:
+        async def inline(image):
+            return preprocess_image(image)
+        await asyncio.gather(*(inline(image) for image in images))
+    else:
+        await asyncio.gather(*(pool.run(preprocess_image, image) for image in images))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    return elapsed, max(lags, default=0.0)
+
+
+async def main_async(args):
+    images = make_images(args.images)
+    print(f"{args.images} images, {os.cpu_count()} CPU(s)")
+
+    configs = [("inline", None)]
+    workers = 1
+    while workers <= args.workers:
+        configs.append((f"thread x{workers}", ImagePool(mode="thread", max_workers=workers)))
+        configs.append((f"process x{workers}", ImagePool(mode="process", max_workers=workers)))
+        workers *= 2
+
+    for name, pool in configs:
+        if pool is not None:
+            # Warm up: spawn the workers and import Pillow in them
+            await asyncio.gather(*(pool.run(preprocess_image, images[0]) for _ in range(pool.max_workers)))
+        elapsed, stall = await run(images, pool)
+        print(f"{name:>12}: {elapsed:6.2f}s  {len(images) / elapsed:6.1f} img/s  "
+              f"max loop stall {stall * 1000:7.1f} ms")
+        if pool is not None:
+            pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
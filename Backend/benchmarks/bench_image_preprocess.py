@@ -0,0 +1,104 @@
+"""
+Benchmark: image preprocessing, full decode vs. one-pass preprocess_image
+
+For each image in tests/images (plus a synthetic 12 MP phone photo stored
+with an EXIF rotation), compares the old path - the original bytes are sent
+to the Vision API and the thumbnail is made from a full-resolution decode -
+with preprocess_image, which decodes once (JPEG draft mode), applies the EXIF
+orientation and produces the model image, thumbnail and hash together.
+Reports CPU time, request payload bytes and estimated Vision input tokens.
+No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_image_preprocess [--max-edge 1536] [--quality 85] [--repeat 5]
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from PIL import Image  # noqa: E402
+
+from services.image_utils import THUMBNAIL_QUALITY, THUMBNAIL_SIZE, preprocess_image, vision_tokens  # noqa: E402
+
+IMAGES_DIR = Path(__file__).parent.parent / "tests" / "images"
+
+
+def load_images() -> dict:
+    """tests/images plus a 4032x3024 JPEG stored sideways with EXIF orientation 6"""
+    images = {path.name: path.read_bytes() for path in sorted(IMAGES_DIR.iterdir()) if path.is_file()}
+
+    source = Image.open(IMAGES_DIR / "event2.jpg").convert("RGB")
+    phone = source.resize((3024, 4032), Image.Resampling.BICUBIC).rotate(90, expand=True)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    phone.save(buffer, format="JPEG", quality=92, exif=exif)
+    images["phone_12mp_rotated.jpg"] = buffer.getvalue()
+    return images
+
+
+def old_path(raw: bytes) -> tuple:
+    """Previous behaviour: original bytes to the model, thumbnail from a full decode"""
+    image = Image.open(io.BytesIO(raw))
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("RGB")
+    image.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    return Image.open(io.BytesIO(raw)).size, len(raw)
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-edge", type=int, default=1536)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"max edge {args.max_edge}px, JPEG quality {args.quality}, {args.repeat} runs per image")
+    print(f"{'image':<24} {'path':>5} {'cpu ms':>8} {'size':>11} {'payload KB':>11} {'tokens':>7}")
+    totals = {"old": [0.0, 0, 0], "new": [0.0, 0, 0]}
+    for name, raw in load_images().items():
+        encoded = base64.b64encode(raw).decode()
+
+        old_seconds = timed(lambda: old_path(raw), args.repeat)
+        old_size, old_bytes = old_path(raw)
+        new_seconds = timed(lambda: preprocess_image(encoded, args.max_edge, args.quality), args.repeat)
+        prepared = preprocess_image(encoded, args.max_edge, args.quality)
+
+        rows = [
+            ("old", old_seconds, old_size, old_bytes),
+            ("new", new_seconds, prepared.model_size, prepared.model_bytes),
+        ]
+        for path, seconds, size, nbytes in rows:
+            tokens = vision_tokens(*size)
+            totals[path][0] += seconds
+            totals[path][1] += nbytes
+            totals[path][2] += tokens
+            print(f"{name if path == 'old' else '':<24} {path:>5} {seconds * 1000:8.1f} "
+                  f"{f'{size[0]}x{size[1]}':>11} {nbytes * 4 / 3 / 1024:11.0f} {tokens:7d}")
+
+    print()
+    for path, (seconds, nbytes, tokens) in totals.items():
+        print(f"{'total':<24} {path:>5} {seconds * 1000:8.1f} {'':>11} {nbytes * 4 / 3 / 1024:11.0f} {tokens:7d}")
+
+
+if __name__ == "__main__":
+    main()
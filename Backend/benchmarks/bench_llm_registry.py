@@ -0,0 +1,71 @@
+"""
+Benchmark: per-request setup overhead of the agent
+
+Compares the old per-request path (compile the LangGraph graph and build a new
+ChatOpenAI client for every node) with the registry path (shared compiled graph
+and pooled clients). No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_llm_registry [--requests 200]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from config import settings  # noqa: E402
+from services.agent.graph import create_agent_graph, get_agent_graph  # noqa: E402
+from services.llm_registry import llm_registry, get_chat_model  # noqa: E402
+
+# LLM clients a typical non-chat turn requests (classifier + handler)
+LLM_CALLS_PER_REQUEST = 2
+
+
+def per_request_old() -> None:
+    """Old path: compile graph + new client per node"""
+    create_agent_graph()
+    for _ in range(LLM_CALLS_PER_REQUEST):
+        ChatOpenAI(model=settings.OPENAI_MODEL, temperature=0.3, api_key=os.environ["OPENAI_API_KEY"])
+
+
+def per_request_registry() -> None:
+    """Registry path: shared graph + pooled clients"""
+    get_agent_graph()
+    for _ in range(LLM_CALLS_PER_REQUEST):
+        get_chat_model(settings.OPENAI_MODEL, temperature=0.3)
+
+
+def measure(fn, requests: int) -> float:
+    """Return average milliseconds per request"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) * 1000 / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    old_ms = measure(per_request_old, args.requests)
+    new_ms = measure(per_request_registry, args.requests)
+
+    print(f"Requests:                {args.requests}")
+    print(f"Per-request (old):       {old_ms:.3f} ms")
+    print(f"Per-request (registry):  {new_ms:.3f} ms")
+    print(f"Speedup:                 {old_ms / new_ms:.1f}x")
+    print(f"Registry stats:          {llm_registry.stats()}")
+
+
+if __name__ == "__main__":
+    main()
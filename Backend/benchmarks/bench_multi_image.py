@@ -0,0 +1,124 @@
+"""
+Benchmark: multi-image event creation, serial vs. concurrent
+
+Runs handle_create_event on N poster images against a fake vision LLM with
+injected per-call latency. With IMAGE_CONCURRENCY >= N the wall-clock time
+should be close to the slowest single image; with IMAGE_CONCURRENCY=1 it is
+the sum of all images. No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_multi_image [--images 10] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import base64
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import Base  # noqa: E402
+from models import User  # noqa: E402
+from services import llm_service  # noqa: E402
+from services.agent.graph import AgentState, handle_create_event  # noqa: E402
+
+
+class LatencyFakeLLM(FakeListChatModel):
+    """Fake vision model: returns one event per call after a random delay"""
+    min_latency: float = 0.5
+    max_latency: float = 1.5
+    latencies: list = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        latency = random.uniform(self.min_latency, self.max_latency)
+        self.latencies.append(latency)
+        await asyncio.sleep(latency)
+        return self._generate(messages, stop=stop, **kwargs)
+
+
+def make_images(count: int) -> list:
+    """Create poster-sized JPEGs"""
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1600, 2400), ((i * 40) % 256, 80, 160)).save(buffer, format="JPEG")
+        images.append(base64.b64encode(buffer.getvalue()).decode())
+    return images
+
+
+async def run(images: list, concurrency: int, min_latency: float, max_latency: float):
+    """Return (wall-clock seconds, slowest single call, sum of calls)"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(username="bench", password="bench")
+    db.add(user)
+    db.commit()
+
+    start = (datetime.now() + timedelta(days=7)).replace(microsecond=0).isoformat()
+    llm = LatencyFakeLLM(
+        responses=[
+            f'{{"events": [{{"title": "Poster event {i}", "start_time": "{start}"}}]}}'
+            for i in range(len(images))
+        ],
+        min_latency=min_latency,
+        max_latency=max_latency,
+        latencies=[],
+    )
+    llm_service.get_llm = lambda: llm
+    settings.IMAGE_CONCURRENCY = concurrency
+
+    state = AgentState(
+        message="add these events",
+        image_base64=None,
+        images_base64=images,
+        user_id=user.id,
+        conversation_history="",
+        intent="create_event",
+        confidence=1.0,
+        response="",
+        action_result=None,
+        db=db,
+    )
+    started = time.perf_counter()
+    result = await handle_create_event(state)
+    elapsed = time.perf_counter() - started
+    assert len(result["action_result"]["events"]) == len(images), result["response"]
+    db.close()
+    return elapsed, max(llm.latencies), sum(llm.latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--min-latency", type=float, default=0.5)
+    parser.add_argument("--max-latency", type=float, default=1.5)
+    args = parser.parse_args()
+
+    settings.ENABLE_WEB_SEARCH = False
+    images = make_images(args.images)
+
+    for label, concurrency in [("serial", 1), ("concurrent", args.concurrency)]:
+        elapsed, slowest, total = asyncio.run(run(images, concurrency, args.min_latency, args.max_latency))
+        print(f"{label:>10} (concurrency={concurrency:>2}): {elapsed:6.2f}s  "
+              f"slowest image {slowest:.2f}s, sum of images {total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: query_event latency vs. calendar size
+
+Seeds an in-memory SQLite calendar with N events and times the query
+handler's database work for templated questions. The old path loaded and
+serialized every event for the prompt; the planner path runs one indexed
+range query. No network calls are made.
+
+Usage:
+    cd Backend
+    python -m benchmarks.bench_query_planner [--sizes 100,1000,5000] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Event, User  # noqa: E402
+from services.agent.query_planner import (  # noqa: E402
+    TEMPLATE_MAX_EVENTS,
+    execute_plan,
+    plan_query,
+    render_answer,
+)
+
+QUESTIONS = ["what do I have tomorrow", "what's planned for the weekend", "show my events next week"]
+
+
+def seed(size: int):
+    """Create a session with one user owning `size` events spread over two years"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(username="bench", password="bench")
+    db.add(user)
+    db.commit()
+    start = datetime.now() - timedelta(days=365)
+    db.add_all([
+        Event(
+            user_id=user.id,
+            title=f"Event {i}",
+            start_time=start + timedelta(minutes=i * 730 * 24 * 60 // size),
+            location="Somewhere",
+            description="Lorem ipsum dolor sit amet " * 10,
+            source_type="manual",
+        )
+        for i in range(size)
+    ])
+    db.commit()
+    return db, user.id
+
+
+def old_path(db, user_id, question):
+    """Old path: load all events and build the full JSON prompt payload"""
+    events = db.query(Event).filter(Event.user_id == user_id).order_by(Event.start_time).all()
+    return json.dumps([
+        {
+            "id": e.id,
+            "title": e.title,
+            "start_time": e.start_time.isoformat(),
+            "end_time": e.end_time.isoformat() if e.end_time else None,
+            "location": e.location,
+            "description": e.description,
+        }
+        for e in events
+    ], ensure_ascii=False, indent=2)
+
+
+def planner_path(db, user_id, question):
+    """Planner path: indexed range query + templated answer"""
+    plan = plan_query(question)
+    events, total = execute_plan(db, user_id, plan, TEMPLATE_MAX_EVENTS)
+    return render_answer(plan, events, total)
+
+
+def measure(fn, db, user_id, repeat: int) -> float:
+    """Return average milliseconds per question"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            fn(db, user_id, question)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(QUESTIONS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'events':>8} {'old (ms)':>10} {'planner (ms)':>13} {'old prompt chars':>17}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        db, user_id = seed(size)
+        old_ms = measure(old_path, db, user_id, args.repeat)
+        new_ms = measure(planner_path, db, user_id, args.repeat)
+        prompt_chars = len(old_path(db, user_id, QUESTIONS[0]))
+        print(f"{size:>8} {old_ms:>10.2f} {new_ms:>13.2f} {prompt_chars:>17}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Fake OpenAI-compatible server: replays recorded chat completions for offline load tests
+
+Serves POST /v1/chat/completions with the OpenAI wire format, both as JSON and
+as an SSE stream (text and tool-call answers, usage in the last chunk, cached
+prompt tokens from a simulated prefix cache), so the backend can be driven end
+to end without an API key or credits:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=sk-fake uvicorn main:app
+
+Each request is matched to one of the prompts in services/agent/prompts/intent.py
+and services/prompts/event_extraction.py by its system message. The answer is the
+first recording of that prompt (benchmarks/recordings/openai_responses.json)
+whose "when" text occurs in the last user message; "{today}" / "{tomorrow}" in a
+recording are replaced by the current dates. With --record, requests are
+forwarded to the real API (key from OPENAI_API_KEY) and the answers appended to
+the recordings file.
+
+Latency is sampled per request: time to first token (--ttft) and, for streams,
+the interval between chunks (--token-interval). Distributions are written as
+"0.2", "fixed:0.2", "uniform:0.1,0.5" or "lognormal:<median>,<sigma>". A fraction
+of requests can fail with a 429/5xx (--error-rate) or never answer (--hang-rate).
+
+Usage:
+    cd Backend
+    python -m benchmarks.fake_openai [--port 8001] [--ttft lognormal:0.4,0.5]
+        [--token-interval fixed:0.01] [--error-rate 0.02] [--hang-rate 0] [--record]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("LOG_FILE_ENABLED", "false")
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+
+from services.agent.prompts import intent as intent_prompts  # noqa: E402
+from services.prompt_budget import estimate_tokens  # noqa: E402
+from services.prompts import event_extraction as extraction_prompts  # noqa: E402
+
+RECORDINGS_PATH = Path(__file__).parent / "recordings" / "openai_responses.json"
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+
+
+# ============================================================================
+# Prompt identification
+# ============================================================================
+
+def _prompt_prefixes() -> List[Tuple[str, str]]:
+    """(name, literal prefix) of every system prompt, most specific first
+
+    INTENT_CLASSIFIER_SYSTEM -> "intent_classifier", IMAGE_PARSE_SYSTEM_PROMPT ->
+    "image_parse". The prefix is the template text before its first placeholder.
+    """
+    prefixes = []
+    for module in (intent_prompts, extraction_prompts):
+        for attr, value in vars(module).items():
+            if isinstance(value, str) and re.fullmatch(r"[A-Z_]+_SYSTEM(_PROMPT)?", attr):
+                name = re.sub(r"_SYSTEM(_PROMPT)?$", "", attr).lower()
+                prefixes.append((name, value.split("{")[0]))
+    return sorted(prefixes, key=lambda item: len(item[1]), reverse=True)
+
+
+PROMPT_PREFIXES = _prompt_prefixes()
+
+
+def _text(content) -> str:
+    """Text of a message content (string or list of parts; images are skipped)"""
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.get("text", "") for part in content or [] if part.get("type") == "text")
+
+
+def identify_prompt(messages: List[dict]) -> str:
+    """Name of the prompt a request was built from ("default" if unknown)"""
+    system = next((_text(m.get("content")) for m in messages if m.get("role") in ("system", "developer")), "")
+    for name, prefix in PROMPT_PREFIXES:
+        if system.startswith(prefix):
+            return name
+    return "default"
+
+
+def last_user_text(messages: List[dict]) -> str:
+    return next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+
+
+# ============================================================================
+# Recordings
+# ============================================================================
+
+class Recordings:
+    """Recorded answers per prompt, loaded from (and appended to) a JSON file"""
+
+    def __init__(self, path: Path = RECORDINGS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, List[dict]] = json.loads(path.read_text()) if path.exists() else {}
+
+    def find(self, prompt: str, user_text: str) -> Optional[dict]:
+        """First recording of the prompt whose "when" occurs in the user message"""
+        lowered = user_text.lower()
+        for candidate in (prompt, "default"):
+            for entry in self.entries.get(candidate, []):
+                if entry.get("when", "").lower() in lowered:
+                    return entry
+        return None
+
+    def add(self, prompt: str, entry: dict):
+        """Append a recording (kept before the catch-all entry of the prompt) and save"""
+        with self._lock:
+            entries = self.entries.setdefault(prompt, [])
+            position = next((i for i, e in enumerate(entries) if not e.get("when")), len(entries))
+            entries.insert(position, entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.entries, ensure_ascii=False, indent=2) + "\n")
+
+
+def _fill_dates(text: str) -> str:
+    today = date.today()
+    return text.replace("{today}", today.isoformat()).replace("{tomorrow}", (today + timedelta(days=1)).isoformat())
+
+
+# ============================================================================
+# Latency and faults
+# ============================================================================
+
+class Latency:
+    """Latency distribution: "0.2", "fixed:0.2", "uniform:0.1,0.5" or "lognormal:<median>,<sigma>" """
+
+    def __init__(self, spec: str):
+        kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",")]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return random.uniform(*self.args)
+        if self.kind == "lognormal":
+            median, sigma = self.args
+            return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return self.args[0]
+
+
+class FakeOpenAIConfig:
+    """Behaviour of the fake server"""
+
+    def __init__(
+        self,
+        ttft: str = "0",
+        token_interval: str = "0",
+        error_rate: float = 0.0,
+        error_statuses: Tuple[int, ...] = (429, 500, 503),
+        hang_rate: float = 0.0,
+        record: bool = False,
+        upstream: str = DEFAULT_UPSTREAM,
+    ):
+        self.ttft = Latency(ttft)
+        self.token_interval = Latency(token_interval)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.hang_rate = hang_rate
+        self.record = record
+        self.upstream = upstream
+
+
+# ============================================================================
+# Wire format
+# ============================================================================
+
+def _chunks(text: str) -> List[str]:
+    """Split an answer into word-sized stream chunks"""
+    return re.findall(r"\S+\s*|\s+", text) or [""]
+
+
+class PromptCache:
+    """
+    Simulated provider prompt cache
+
+    Like OpenAI: prompts of 1024+ tokens, cached in 128-token steps, a hit is
+    the longest prefix (tools, then messages) seen before. Tokens are
+    estimated as 4 characters each.
+    """
+
+    MIN_TOKENS = 1024
+    STEP_TOKENS = 128
+
+    def __init__(self, max_prefixes: int = 100_000):
+        self.max_prefixes = max_prefixes
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> int:
+        """Cached tokens for a prompt (and remember its prefixes)"""
+        boundaries = range(self.MIN_TOKENS * 4, len(text) + 1, self.STEP_TOKENS * 4)
+        digests = [(end // 4, hash(text[:end])) for end in boundaries]
+        with self._lock:
+            cached = max((tokens for tokens, digest in digests if digest in self._prefixes), default=0)
+            if len(self._prefixes) > self.max_prefixes:
+                self._prefixes.clear()
+            self._prefixes.update(digest for _, digest in digests)
+        return cached
+
+
+def prompt_usage(body: dict, cache: PromptCache) -> dict:
+    """Prompt token counts of a request, with the tokens served from the prompt cache"""
+    text = json.dumps(body.get("tools") or [], sort_keys=True) + "".join(
+        f"<{m.get('role')}>{json.dumps(m.get('content'), ensure_ascii=False)}" for m in body.get("messages", [])
+    )
+    prompt_tokens = sum(estimate_tokens(_text(m.get("content"))) for m in body.get("messages", []))
+    cached = min(cache.lookup(text), prompt_tokens)
+    return {"prompt_tokens": prompt_tokens, "prompt_tokens_details": {"cached_tokens": cached}}
+
+
+def _usage(prompt: dict, completion: str) -> dict:
+    completion_tokens = estimate_tokens(completion)
+    return {**prompt, "completion_tokens": completion_tokens, "total_tokens": prompt["prompt_tokens"] + completion_tokens}
+
+
+def _answer(entry: dict) -> Tuple[Optional[str], Optional[dict]]:
+    """(content, tool_call) of a recording, with dates filled in"""
+    if "tool_call" in entry:
+        call = entry["tool_call"]
+        arguments = _fill_dates(json.dumps(call["arguments"], ensure_ascii=False))
+        return None, {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": call["name"], "arguments": arguments}}
+    return _fill_dates(entry.get("content", "")), None
+
+
+def completion_body(model: str, prompt: dict, entry: dict) -> dict:
+    """Non-streaming chat.completion response"""
+    content, tool_call = _answer(entry)
+    message = {"role": "assistant", "content": content}
+    if tool_call:
+        message["tool_calls"] = [tool_call]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+        "usage": _usage(prompt, content or tool_call["function"]["arguments"]),
+    }
+
+
+async def stream_body(model: str, prompt: dict, entry: dict, config: FakeOpenAIConfig, include_usage: bool):
+    """chat.completion.chunk SSE events, one chunk per word (or 20 argument characters)"""
+    content, tool_call = _answer(entry)
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    def event(delta: dict, finish_reason: Optional[str] = None, usage: Optional[dict] = None) -> str:
+        body = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            body["usage"] = usage
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+    if tool_call:
+        arguments = tool_call["function"]["arguments"]
+        pieces = [arguments[i:i + 20] for i in range(0, len(arguments), 20)]
+        yield event({"role": "assistant", "content": None, "tool_calls": [{**tool_call, "index": 0, "function": {"name": tool_call["function"]["name"], "arguments": ""}}]})
+        deltas = [{"tool_calls": [{"index": 0, "function": {"arguments": piece}}]} for piece in pieces]
+    else:
+        yield event({"role": "assistant", "content": ""})
+        deltas = [{"content": piece} for piece in _chunks(content)]
+
+    for i, delta in enumerate(deltas):
+        if i:
+            await asyncio.sleep(config.token_interval.sample())
+        yield event(delta)
+    yield event({}, finish_reason="tool_calls" if tool_call else "stop")
+    if include_usage:
+        yield event({}, usage=_usage(prompt, content or tool_call["function"]["arguments"]))
+    yield "data: [DONE]\n\n"
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    kind = "rate_limit_error" if status == 429 else "server_error"
+    return JSONResponse({"error": {"message": message, "type": kind, "code": None}}, status_code=status)
+
+
+# ============================================================================
+# Recording proxy
+# ============================================================================
+
+async def _record(config: FakeOpenAIConfig, recordings: Recordings, prompt: str, body: dict) -> dict:
+    """Forward a request to the real API (non-streaming) and store its answer"""
+    import httpx
+
+    upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+    async with httpx.AsyncClient(timeout=120) as client:
+        response = await client.post(
+            f"{config.upstream.rstrip('/')}/chat/completions",
+            json=upstream_body,
+            headers={"Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}"},
+        )
+    response.raise_for_status()
+    message = response.json()["choices"][0]["message"]
+    # Key on the user's own words, not the history included in the prompt
+    user_text = last_user_text(body["messages"])
+    match = re.search(r"User (?:message|input): *(.+)", user_text)
+    entry = {"when": (match.group(1) if match else user_text).strip()[:200]}
+    if message.get("tool_calls"):
+        function = message["tool_calls"][0]["function"]
+        entry["tool_call"] = {"name": function["name"], "arguments": json.loads(function["arguments"])}
+    else:
+        entry["content"] = message.get("content") or ""
+    recordings.add(prompt, entry)
+    return entry
+
+
+# ============================================================================
+# App
+# ============================================================================
+
+def create_app(config: Optional[FakeOpenAIConfig] = None, recordings: Optional[Recordings] = None) -> FastAPI:
+    """
+    Build the fake server
+
+    Args:
+        config: Latency, fault and recording settings (default: no latency, no faults)
+        recordings: Recorded answers (default: benchmarks/recordings/openai_responses.json)
+
+    Returns:
+        FastAPI app serving /v1/chat/completions, /v1/models and /stats
+    """
+    config = config or FakeOpenAIConfig()
+    recordings = recordings or Recordings()
+    app = FastAPI(title="Fake OpenAI")
+    app.state.stats = {"requests": {}, "prompt_tokens": {}, "cached_tokens": {}}
+    app.state.prompt_cache = PromptCache()
+
+    def count(name: str, prompt: str, value: int = 1):
+        app.state.stats[name][prompt] = app.state.stats[name].get(prompt, 0) + value
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "benchmark"}]}
+
+    @app.get("/stats")
+    async def stats():
+        """Requests, prompt tokens and cached prompt tokens per prompt"""
+        return app.state.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+        prompt = identify_prompt(messages)
+        count("requests", prompt)
+
+        roll = random.random()
+        if roll < config.hang_rate:
+            await asyncio.sleep(3600)
+        if roll < config.hang_rate + config.error_rate:
+            return _error(random.choice(config.error_statuses), "Injected failure")
+
+        entry = recordings.find(prompt, last_user_text(messages))
+        if config.record and (entry is None or not entry.get("when")):
+            entry = await _record(config, recordings, prompt, body)
+        if entry is None:
+            return _error(400, f"No recording for prompt '{prompt}'")
+
+        usage = prompt_usage(body, app.state.prompt_cache)
+        count("prompt_tokens", prompt, usage["prompt_tokens"])
+        count("cached_tokens", prompt, usage["prompt_tokens_details"]["cached_tokens"])
+        await asyncio.sleep(config.ttft.sample())
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(stream_body(model, usage, entry, config, include_usage), media_type="text/event-stream")
+        return completion_body(model, usage, entry)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft", default="lognormal:0.4,0.5", help="time to first token distribution (seconds)")
+    parser.add_argument("--token-interval", default="fixed:0.01", help="interval between stream chunks (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/5xx")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that never answer")
+    parser.add_argument("--record", action="store_true", help="forward unrecorded requests to the real API and save the answers")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        ttft=args.ttft,
+        token_interval=args.token_interval,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        record=args.record,
+        upstream=args.upstream,
+    )
+    print(f"Fake OpenAI on http://{args.host}:{args.port}/v1 (prompts: {', '.join(sorted(n for n, _ in PROMPT_PREFIXES))})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
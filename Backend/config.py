@@ -9,9 +9,11 @@ Environment Variables:
 
     OPENAI_API_KEY: OpenAI API key
     OPENAI_MODEL: Model name to use (default: gpt-5.2)
+    OPENAI_BASE_URL: OpenAI-compatible endpoint (default: api.openai.com)
 """
 import os
 from pathlib import Path
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 
@@ -26,12 +28,137 @@ class Settings(BaseSettings):
     # OpenAI API configuration
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-5.2"  # Default model: GPT-5.2
+    # OpenAI-compatible endpoint (empty = api.openai.com), e.g. the load-test
+    # stand-in: python -m benchmarks.fake_openai -> http://127.0.0.1:8001/v1
+    OPENAI_BASE_URL: str = ""
+    LLM_MAX_CONNECTIONS: int = 100  # Shared HTTP connection pool size for LLM clients
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20  # Idle connections kept open for reuse
+
+    # Images from one message parsed in parallel (vision calls + thumbnails)
+    IMAGE_CONCURRENCY: int = 4
+
+    # Images sent to the Vision API are re-encoded as JPEG, long edge capped
+    IMAGE_MAX_EDGE: int = 1536
+    IMAGE_JPEG_QUALITY: int = 85
+
+    # Image fidelity per LLM call (node names as in PROMPT_BUDGETS):
+    # "thumbnail" (200x200, low detail), "low" (model image, low detail) or
+    # "full" (model image, high detail). Unlisted nodes use "full".
+    IMAGE_STAGE_FIDELITY: Dict[str, str] = {
+        "intent_classifier": "thumbnail",
+        "event_extraction": "full",
+        "image_parse": "full",
+    }
+
+    # CPU-bound image work (decode/resize/encode) runs in a bounded pool:
+    # "process" (falls back to threads if processes cannot start) or "thread"
+    IMAGE_POOL_MODE: str = "process"
+    IMAGE_POOL_WORKERS: int = 0  # 0 = min(4, CPU count)
+    IMAGE_POOL_TIMEOUT_SECONDS: float = 30.0
+
+    # Text-only turns: classify the intent and extract the create/update event
+    # payload in one tool call (the handler then skips its extraction call)
+    ENABLE_COMBINED_EXTRACTION: bool = True
+
+    # Start image extraction alongside intent classification for messages
+    # with images (used if the intent is create_event, cancelled otherwise)
+    ENABLE_SPECULATIVE_IMAGE_PARSE: bool = True
+
+    # Multi-image /api/parse: "per_image" (one Vision call per image) or
+    # "batched" (one call for all images, per-image fallback for images without events)
+    IMAGE_PARSE_MODE: str = "per_image"
+
+    # Parse result cache (parse_text_with_llm / parse_image_with_llm), keyed by
+    # content hash + additional_note + model + date
+    ENABLE_PARSE_CACHE: bool = True
+    PARSE_CACHE_MAX_ENTRIES: int = 512  # In-memory LRU tier
+    PARSE_CACHE_TTL_SECONDS: int = 86400
+    PARSE_CACHE_PERSIST: bool = False  # Also store results in the parse_cache table
+
+    # Coalesce concurrent identical parse / search / search-extraction calls
+    ENABLE_SINGLEFLIGHT: bool = True
+
+    # LLM call resilience (services/llm_resilience.py)
+    ENABLE_LLM_RESILIENCE: bool = True
+    LLM_TURN_BUDGET_SECONDS: float = 90.0  # All LLM calls of one chat turn / parse request
+    LLM_CALL_TIMEOUT_SECONDS: float = 45.0  # Single call, capped by what is left of the turn budget
+    LLM_MAX_RETRIES: int = 2  # Transient errors only; streamed calls are not retried
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 4.0
+    LLM_HEDGE_ENABLED: bool = False  # Duplicate slow non-streamed calls (costs extra tokens)
+    LLM_HEDGE_MIN_DELAY: float = 2.0  # Hedge after max(this, recent p95 latency)
+    LLM_BREAKER_FAILURES: int = 5  # Consecutive failures that open the circuit
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # Open time before a probe call
+
+    # /api/metrics: with several uvicorn workers, each writes its metrics to
+    # <dir>/<pid>.json and a scrape of any worker returns the merged totals
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Prompt token budgets for variable sections (history, event lists, user text)
+    PROMPT_TOKEN_BUDGET: int = 4000  # Default per LLM call
+    PROMPT_BUDGETS: Dict[str, int] = {
+        "intent_classifier": 1500,
+        "chat": 3000,
+        "event_extraction": 3000,
+        "event_match": 3000,
+        "event_update": 1500,
+        "event_query": 6000,
+        "text_parse": 6000,
+        "image_parse": 1000,
+        "search_extraction": 2000,
+    }
+
+    # Intent fast path (local classifier in front of the LLM). Off until the model
+    # is trained and calibrated on logged production samples (INTENT_LOG_PATH)
+    ENABLE_INTENT_FASTPATH: bool = False
+    INTENT_FASTPATH_THRESHOLD: float = 0.85  # Below this confidence, fall back to the LLM
+    INTENT_MODEL_PATH: str = ""  # Trained model JSON (default: services/agent/data/intent_model.json)
+    INTENT_LOG_PATH: str = ""  # If set, append (message, LLM intent) pairs here as JSONL for training
+
+    # Event matching for update/delete/enrich
+    EVENT_MATCH_TOP_K: int = 10  # Candidates sent to the LLM matcher
+    EVENT_MATCH_SKIP_LLM: bool = False  # Skip the LLM when one candidate clearly dominates (never for deletes)
 
     # Web Search Configuration
     SERPAPI_KEY: str = ""  # SerpAPI key for Google Search
     TAVILY_API_KEY: str = ""  # Tavily API key (alternative to SerpAPI)
     ENABLE_WEB_SEARCH: bool = True  # Feature flag to enable/disable web search
-    WEB_SEARCH_TIMEOUT: int = 10  # Timeout in seconds for search requests
+    WEB_SEARCH_TIMEOUT: int = 10  # Timeout in seconds for one search request
+    # Per-provider overrides of WEB_SEARCH_TIMEOUT, e.g. {"serpapi": 5}
+    SEARCH_PROVIDER_TIMEOUTS: Dict[str, float] = {}
+    SEARCH_MAX_CONNECTIONS: int = 20  # Shared connection pool for search providers
+    TAVILY_BASE_URL: str = "https://api.tavily.com"
+    SERPAPI_BASE_URL: str = "https://serpapi.com"
+
+    # Search cache (services/search_cache.py): results keyed by normalized query,
+    # and extract_event_details_from_search output keyed by result set + partial event
+    ENABLE_SEARCH_CACHE: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 1024
+    SEARCH_CACHE_TTL_SECONDS: int = 21600
+    SEARCH_CACHE_NEGATIVE_TTL_SECONDS: int = 900  # Empty results (event pages may appear later)
+    SEARCH_EXTRACTION_CACHE_TTL_SECONDS: int = 21600
+
+    # Search fan-out (services/search_fanout.py): query variants (title, + location,
+    # + date) x all configured providers in parallel, fused with reciprocal rank fusion
+    SEARCH_FANOUT: bool = False
+    SEARCH_FANOUT_MAX_CONCURRENCY: int = 4  # Provider calls in flight per search
+    SEARCH_FANOUT_MAX_RESULTS: int = 8
+    SEARCH_FANOUT_RRF_K: int = 60
+    # Return early once this many URLs appear in SEARCH_FANOUT_MIN_AGREEMENT
+    # result lists (0 = always wait for every call)
+    SEARCH_FANOUT_EARLY_RESULTS: int = 3
+    SEARCH_FANOUT_MIN_AGREEMENT: int = 2
+
+    # Before the search-extraction LLM call, fetch the top result pages and use their
+    # schema.org Event data (JSON-LD / microdata / linked iCal) if present
+    ENABLE_PAGE_FETCH: bool = False
+    PAGE_FETCH_MAX_PAGES: int = 3  # Fetched concurrently
+    PAGE_FETCH_MAX_BYTES: int = 1_000_000  # Larger pages are abandoned
+    PAGE_FETCH_TIMEOUT: float = 3.0  # Seconds per page, including the body
+    PAGE_FETCH_ALLOW_PRIVATE: bool = False  # Allow loopback / private addresses (tests only)
+    PAGE_FETCH_MAX_REDIRECTS: int = 5  # Each hop is checked like the original URL
+    EVENT_TIMEZONE: str = "Europe/Berlin"  # UTC times in page data are converted to this zone
 
     # Read from environment variables, use defaults if not set
     class Config:
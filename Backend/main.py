@@ -4,6 +4,7 @@ FollowUP Backend - FastAPI Application
 路由结构：
 - /api/*   - API（使用数据库 + LLM）
 """
+import asyncio
 import os
 import time
 from pathlib import Path
@@ -22,10 +23,14 @@ logger = get_logger(__name__)
 from routers import api_router
 
 # 初始化数据库
-from database import init_db
+from database import init_db, engine
 from init_db import init_users, init_sample_events
 from database import SessionLocal
 
+# 指标采集（/api/metrics）
+from config import settings
+from services.instrumentation import MetricsMiddleware, install_db_instrumentation
+
 app = FastAPI(
     title="FollowUP API",
     description="智能日程助手 - 从任意输入智能提取日程",
@@ -65,6 +70,36 @@ async def startup_event():
     finally:
         db.close()
 
+    # 预先加载 tiktoken 编码（首次可能需要下载，不放在请求中；失败时使用估算）
+    from services.prompt_budget import preload_encoding
+    await asyncio.to_thread(preload_encoding)
+
+    # 预先启动图片处理进程池
+    from services.image_pool import image_pool
+    image_pool.start()
+
+    # 多 worker 部署：定期写出本 worker 的指标快照
+    if settings.METRICS_MULTIPROC_DIR:
+        from services.metrics_export import flush_periodically
+        app.state.metrics_flush_task = asyncio.create_task(
+            flush_periodically(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_SECONDS)
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止图片处理进程池，关闭搜索 HTTP 连接池"""
+    from services.image_pool import image_pool
+    image_pool.shutdown(wait=False)
+
+    from services.search_service import search_http
+    await search_http.aclose()
+
+
+# 请求延迟、每请求数据库查询次数/耗时
+app.add_middleware(MetricsMiddleware)
+install_db_instrumentation(engine)
+
 # CORS 配置
 app.add_middleware(
     CORSMiddleware,
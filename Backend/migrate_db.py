@@ -6,6 +6,7 @@
 - source_thumbnail 列
 - conversations 表
 - recurrence_rule, recurrence_end, parent_event_id 列（重复事件支持）
+- (user_id, start_time) 复合索引
 """
 from sqlalchemy import text
 from database import engine, SessionLocal
@@ -14,6 +15,9 @@ from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Composite index on events (user_id, start_time), see models.Event
+EVENTS_USER_START_INDEX = "ix_events_user_start_time"
+
 # 检查是否为 PostgreSQL
 def is_postgres() -> bool:
     return settings.DATABASE_URL.startswith("postgresql")
@@ -97,6 +101,10 @@ def migrate_events_table():
                     db.execute(text("CREATE INDEX idx_events_parent_event_id ON events(parent_event_id)"))
                     db.commit()
                     logger.info("Successfully added parent_event_id column")
+                
+                # Composite index for per-user time range queries
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS {EVENTS_USER_START_INDEX} ON events (user_id, start_time)"))
+                db.commit()
             else:
                 logger.debug("events table does not exist yet, will be created by init_db()")
             
@@ -167,6 +175,10 @@ def migrate_events_table():
                     # The constraint will be enforced by SQLAlchemy
                     db.commit()
                     logger.info("Successfully added parent_event_id column")
+                
+                # Composite index for per-user time range queries
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS {EVENTS_USER_START_INDEX} ON events (user_id, start_time)"))
+                db.commit()
             else:
                 logger.debug("events table does not exist yet, will be created by init_db()")
             
@@ -6,7 +6,7 @@
 - PostgreSQL (生产环境)
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -32,6 +32,10 @@ class User(Base):
 class Event(Base):
     """活动模型"""
     __tablename__ = "events"
+    __table_args__ = (
+        # 按用户 + 时间范围查询（Agent 查询规划器、活动列表）
+        Index("ix_events_user_start_time", "user_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -81,3 +85,16 @@ class Conversation(Base):
     
     # 关系
     user = relationship("User", back_populates="conversations")
+
+
+class ParseCacheEntry(Base):
+    """解析结果缓存 - parse_text_with_llm / parse_image_with_llm 的持久化缓存层"""
+    __tablename__ = "parse_cache"
+
+    # sha256(kind, 内容哈希, additional_note, 模型, 日期)
+    key = Column(String(64), primary_key=True)
+    kind = Column(String(10), nullable=False)  # text/image
+    payload = Column(JSON, nullable=False)  # 序列化的 ParseResult
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
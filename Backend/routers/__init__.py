@@ -7,7 +7,7 @@ Route structure:
 from fastapi import APIRouter
 
 # Import API routers
-from . import auth, users, parse, events, chat
+from . import auth, users, parse, events, chat, metrics
 
 # Create API router
 api_router = APIRouter(prefix="/api", tags=["API"])
@@ -17,4 +17,5 @@ api_router.include_router(auth.router)
 api_router.include_router(users.router)
 api_router.include_router(parse.router)
 api_router.include_router(events.router)
-api_router.include_router(chat.router)
\ No newline at end of file
+api_router.include_router(chat.router)
+api_router.include_router(metrics.router)
\ No newline at end of file
@@ -8,6 +8,8 @@ LangGraph-based intelligent Agent supporting:
 - Streaming responses (SSE)
 """
 import json
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
@@ -18,6 +20,7 @@ from database import get_db, SessionLocal
 from models import User
 from logging_config import get_logger
 from services.agent import run_agent, run_agent_stream, ConversationMemory
+from services.metrics import metrics
 
 logger = get_logger(__name__)
 
@@ -80,6 +83,8 @@ async def chat(
         
         async def generate_stream():
             logger.info(f"Starting stream generation for user {user_id}, session {session_id}")
+            stream_started = time.perf_counter()
+            outcome = "error"
             # Create independent database session inside generator
             stream_db = SessionLocal()
             try:
@@ -137,6 +142,7 @@ async def chat(
                         if full_response:
                             stream_memory.add_message("assistant", full_response)
                         logger.info(f"Chat completed: intent={intent}, session_id={stream_memory.conversation_id}, response_len={len(full_response)}")
+                        outcome = "done"
                         yield f"data: {json.dumps({'type': 'done', 'session_id': stream_memory.conversation_id}, ensure_ascii=False)}\n\n"
                         break
                     elif chunk["type"] == "error":
@@ -151,6 +157,8 @@ async def chat(
             finally:
                 # Ensure database session is closed
                 stream_db.close()
+                # Client disconnects end the generator early (GeneratorExit)
+                metrics.histogram("sse_stream_duration_seconds", time.perf_counter() - stream_started, outcome=outcome)
         
         logger.info("Returning StreamingResponse")
         return StreamingResponse(
@@ -178,7 +186,7 @@ async def chat(
         memory.add_message("user", request.message)
         
         try:
-            result = run_agent(
+            result = await run_agent(
                 message=request.message,
                 user_id=current_user.id,
                 db=db,
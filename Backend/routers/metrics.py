@@ -0,0 +1,24 @@
+"""
+Metrics Routes - /api/metrics
+
+Prometheus text exposition of request, graph node, LLM, search, database
+and SSE metrics (aggregated across workers when METRICS_MULTIPROC_DIR is set)
+"""
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.metrics_export import collect, render_prometheus
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    # Reading the other workers' files is blocking I/O
+    snapshot = await asyncio.to_thread(collect)
+    return PlainTextResponse(render_prometheus(snapshot), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -4,24 +4,26 @@ Event Parsing Routes - /api/parse
 Uses LangChain + OpenAI for intelligent event parsing
 Supports single or multiple image batch parsing
 """
+import asyncio
 import uuid
 import os
 import time
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from schemas import ParseRequest, ParseResponse, ParsedEvent
 from auth import get_current_user
+from config import settings
 from models import User
 from logging_config import get_logger
-from services.image_utils import generate_thumbnail
+from services.image_utils import generate_thumbnail_async
+from services.llm_resilience import provider_degraded, turn_budget
 
 logger = get_logger(__name__)
 
 # Try importing LLM service, use fallback if failed
 try:
-    from services.llm_service import parse_text_with_llm, parse_image_with_llm
-    from config import settings
+    from services.llm_service import parse_text_with_llm, parse_image_with_llm, parse_images_with_llm
     # Check API key (check both settings and environment variables)
     LLM_AVAILABLE = bool(settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"))
     if LLM_AVAILABLE:
@@ -124,9 +126,12 @@ def parse_image_fallback(image_base64: str, additional_note: str = None) -> list
 
 
 def is_llm_available() -> bool:
-    """Dynamically check if LLM is available"""
+    """Dynamically check if LLM is available (API key configured and provider not degraded)"""
     try:
         from config import settings
+        if provider_degraded():
+            logger.warning("LLM provider degraded (circuit open), using fallback")
+            return False
         return bool(settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"))
     except Exception:
         return False
@@ -140,7 +145,7 @@ class TextParseResult:
         self.clarification_question = clarification_question
 
 
-def parse_text(text: str, additional_note: str = None) -> TextParseResult:
+async def parse_text(text: str, additional_note: str = None) -> TextParseResult:
     """
     Parse text content
     Prioritizes LLM, falls back to simple keyword parsing if LLM unavailable
@@ -152,7 +157,7 @@ def parse_text(text: str, additional_note: str = None) -> TextParseResult:
     
     if llm_available:
         try:
-            result = parse_text_with_llm(text, additional_note)
+            result = await parse_text_with_llm(text, additional_note)
             elapsed = time.time() - start_time
             logger.info(f"LLM parsed {len(result.events)} event(s) from text in {elapsed:.2f}s")
             return TextParseResult(
@@ -180,7 +185,7 @@ class ImageParseResult:
         self.clarification_question = clarification_question
 
 
-def parse_image(image_base64: str, additional_note: str = None) -> ImageParseResult:
+async def parse_image(image_base64: str, additional_note: str = None) -> ImageParseResult:
     """
     Parse single image content
     Uses LLM Vision to parse event information from image
@@ -188,7 +193,7 @@ def parse_image(image_base64: str, additional_note: str = None) -> ImageParseRes
     Returns event list and possible clarification questions
     """
     # Generate thumbnail
-    thumbnail = generate_thumbnail(image_base64)
+    thumbnail = await generate_thumbnail_async(image_base64)
     if thumbnail:
         logger.debug(f"Generated thumbnail for image, size: {len(thumbnail)} chars")
     
@@ -204,7 +209,7 @@ def parse_image(image_base64: str, additional_note: str = None) -> ImageParseRes
     
     # Parse image
     try:
-        result = parse_image_with_llm(image_base64, additional_note)
+        result = await parse_image_with_llm(image_base64, additional_note)
         logger.info(f"LLM parsed {len(result.events)} event(s) from image")
         
         # Attach thumbnail to each event
@@ -226,14 +231,23 @@ def parse_image(image_base64: str, additional_note: str = None) -> ImageParseRes
         )
 
 
-def parse_images(images_base64: List[str], additional_note: str = None) -> list[ParsedEvent]:
+async def parse_images(
+    images_base64: List[str],
+    additional_note: str = None,
+    mode: Optional[str] = None,
+) -> list[ParsedEvent]:
     """
     Batch parse multiple image contents
-    Processes each image individually to ensure correct thumbnail assignment
-    Each event gets the thumbnail from its corresponding source image
+
+    Modes (default: settings.IMAGE_PARSE_MODE):
+    - per_image: one Vision call per image
+    - batched: one Vision call for all images; events carry source_image_index
+      so each still gets the thumbnail of its own image. Images that yield no
+      events are re-parsed individually.
     """
     llm_available = is_llm_available()
-    logger.debug(f"Parsing {len(images_base64)} images (LLM_AVAILABLE={llm_available})")
+    mode = mode or settings.IMAGE_PARSE_MODE
+    logger.debug(f"Parsing {len(images_base64)} images (LLM_AVAILABLE={llm_available}, mode={mode})")
     start_time = time.time()
     
     if not llm_available:
@@ -243,22 +257,63 @@ def parse_images(images_base64: List[str], additional_note: str = None) -> list[
             detail="Image parsing service is temporarily unavailable. Please contact administrator to configure OpenAI API Key",
         )
     
-    all_events = []
-    
-    # Process each image individually to ensure correct thumbnail assignment
-    # This ensures each event gets the thumbnail from its corresponding source image
-    logger.debug("Processing images individually to assign correct thumbnails")
-    for idx, image_base64 in enumerate(images_base64):
-        try:
-            result = parse_image(image_base64, additional_note)
-            all_events.extend(result.events)
-            logger.debug(f"Parsed image {idx+1}/{len(images_base64)}: {len(result.events)} event(s)")
-        except Exception as e:
-            logger.warning(f"Failed to parse image {idx+1}: {e}")
-            continue
+    if mode == "batched":
+        all_events = await _parse_images_batched(images_base64, additional_note)
+    else:
+        all_events = []
+        # Process each image individually to ensure correct thumbnail assignment
+        # This ensures each event gets the thumbnail from its corresponding source image
+        logger.debug("Processing images individually to assign correct thumbnails")
+        for idx, image_base64 in enumerate(images_base64):
+            try:
+                result = await parse_image(image_base64, additional_note)
+                all_events.extend(result.events)
+                logger.debug(f"Parsed image {idx+1}/{len(images_base64)}: {len(result.events)} event(s)")
+            except Exception as e:
+                logger.warning(f"Failed to parse image {idx+1}: {e}")
+                continue
     
     elapsed = time.time() - start_time
-    logger.info(f"Parsed {len(all_events)} total event(s) from {len(images_base64)} image(s) in {elapsed:.2f}s")
+    logger.info(f"Parsed {len(all_events)} total event(s) from {len(images_base64)} image(s) in {elapsed:.2f}s (mode={mode})")
+    return all_events
+
+
+async def _parse_images_batched(images_base64: List[str], additional_note: str = None) -> list[ParsedEvent]:
+    """
+    Parse all images in one Vision call, attach thumbnails by source_image_index,
+    and fall back to per-image calls only for images that yielded nothing
+    """
+    batch = await parse_images_with_llm(images_base64, additional_note)
+
+    all_events = []
+    empty_indexes = [idx for idx, events in enumerate(batch.events_by_image) if not events]
+    found_indexes = [idx for idx, events in enumerate(batch.events_by_image) if events]
+    thumbnails = await asyncio.gather(*(generate_thumbnail_async(images_base64[idx]) for idx in found_indexes))
+    for idx, thumbnail in zip(found_indexes, thumbnails):
+        events = batch.events_by_image[idx]
+        for event in events:
+            event.source_thumbnail = thumbnail
+        all_events.extend(events)
+    # Events the model could not attribute are kept, without a thumbnail
+    all_events.extend(batch.unattributed)
+
+    if empty_indexes:
+        logger.info(f"Batched parse found no events in image(s) {empty_indexes}, parsing them individually")
+        results = await asyncio.gather(
+            *(parse_image(images_base64[idx], additional_note) for idx in empty_indexes),
+            return_exceptions=True,
+        )
+        seen = {(e.title.strip().lower(), e.start_time) for e in all_events}
+        for idx, result in zip(empty_indexes, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to parse image {idx+1}: {result}")
+                continue
+            for event in result.events:
+                key = (event.title.strip().lower(), event.start_time)
+                if key not in seen:
+                    seen.add(key)
+                    all_events.append(event)
+
     return all_events
 
 
@@ -297,7 +352,8 @@ async def parse_event(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="text_content is required for text input type",
             )
-        result = parse_text(request.text_content, request.additional_note)
+        with turn_budget():
+            result = await parse_text(request.text_content, request.additional_note)
         events = result.events
         needs_clarification = result.needs_clarification
         clarification_question = result.clarification_question
@@ -322,13 +378,15 @@ async def parse_event(
         # Process multiple images
         if len(images_to_parse) == 1:
             # Single image: use existing logic (includes thumbnail generation)
-            result = parse_image(images_to_parse[0], request.additional_note)
+            with turn_budget():
+                result = await parse_image(images_to_parse[0], request.additional_note)
             events = result.events
             needs_clarification = result.needs_clarification
             clarification_question = result.clarification_question
         else:
             # Multiple images: batch processing (clarification not supported yet)
-            events = parse_images(images_to_parse, request.additional_note)
+            with turn_budget():
+                events = await parse_images(images_to_parse, request.additional_note, request.image_parse_mode)
     
     else:
         logger.warning(f"Parse failed: invalid input_type={request.input_type}")
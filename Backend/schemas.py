@@ -37,6 +37,9 @@ class ParseRequest(BaseModel):
     image_base64: Optional[str] = Field(None, description="单张图片 base64 编码（向后兼容）")
     images_base64: Optional[List[str]] = Field(None, description="多张图片 base64 编码列表")
     additional_note: Optional[str] = Field(None, description="补充说明")
+    image_parse_mode: Optional[Literal["per_image", "batched"]] = Field(
+        None, description="多图解析模式: per_image 逐张调用 / batched 单次调用（默认取 IMAGE_PARSE_MODE 配置）"
+    )
 
 
 class ParsedEvent(BaseModel):
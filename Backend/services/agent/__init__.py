@@ -8,11 +8,12 @@ Provides intent recognition and multi-turn conversation capabilities:
 - Delete events
 - Streaming response
 """
-from .graph import create_agent_graph, run_agent, run_agent_stream
+from .graph import create_agent_graph, get_agent_graph, run_agent, run_agent_stream
 from .memory import ConversationMemory
 
 __all__ = [
     "create_agent_graph",
+    "get_agent_graph",
     "run_agent",
     "run_agent_stream",
     "ConversationMemory",
@@ -3,20 +3,42 @@ LangGraph Agent Implementation - Smart Calendar Assistant
 
 Uses LangGraph to build state graph for intent recognition and multi-turn conversation.
 """
+import asyncio
 import json
+import time
 from datetime import datetime
+from functools import lru_cache
 from typing import TypedDict, Optional, List
 
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import HumanMessage
 from sqlalchemy.orm import Session
 
 from config import settings
 from models import Event
+from services.image_utils import image_content_part
+from services.instrumentation import instrument_node
+from services.llm_registry import get_chat_model
+from services.llm_resilience import STREAM_TAG, ResilientChatModel, end_turn, provider_degraded, resilient, start_turn
+from services.prompt_budget import Section, fit_sections, fit_text, encode_events
+from services.prompt_cache import prompt_time
+from .intent_fastpath import classify_fast, log_intent_sample
+from .retrieval import retrieve_candidates, pick_dominant
+from .speculation import SpeculativeImageParse, start_speculative_parse
+from .query_planner import (
+    plan_query,
+    execute_plan,
+    render_answer,
+    TEMPLATE_MAX_EVENTS,
+    LLM_MAX_EVENTS,
+    DESCRIPTION_CHARS,
+)
 from logging_config import get_logger
+from services.prompts import IntentExtraction
 from .prompts.intent import (
     INTENT_CLASSIFIER_PROMPT,
+    INTENT_EXTRACTION_PROMPT,
     CHAT_PROMPT,
     EVENT_EXTRACTION_PROMPT,
     EVENT_MATCH_PROMPT,
@@ -26,6 +48,12 @@ from .prompts.intent import (
 
 logger = get_logger(__name__)
 
+# STREAM_TAG (services.llm_resilience) marks LLM calls whose output is the
+# user-facing answer; run_agent_stream forwards their tokens as they are generated
+
+# Custom graph event carrying progress messages emitted while a node runs
+PROGRESS_EVENT = "progress"
+
 
 # ============================================================================
 # Agent State Definition
@@ -49,6 +77,13 @@ class AgentState(TypedDict):
     # Progress messages for streaming (list of status messages)
     progress_messages: Optional[List[str]]
     
+    # Event payload returned by the combined classify+extract call
+    extracted_event: Optional[dict]  # create_event: fields as in EVENT_EXTRACTION_PROMPT
+    extracted_update: Optional[dict]  # update_event: fields to change
+    
+    # Image extraction started alongside intent classification (not serialized)
+    speculative_parse: Optional[SpeculativeImageParse]
+    
     # Database session (not serialized)
     db: Session
 
@@ -57,96 +92,200 @@ class AgentState(TypedDict):
 # Node Implementation
 # ============================================================================
 
-def get_llm() -> ChatOpenAI:
-    """Get LLM instance"""
-    import os
-    api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-    return ChatOpenAI(
-        model=settings.OPENAI_MODEL,
-        temperature=0.3,
-        api_key=api_key,
-    )
+async def emit_progress(message: str):
+    """Stream a progress message to run_agent_stream while the node is still running"""
+    try:
+        await adispatch_custom_event(PROGRESS_EVENT, {"message": message})
+    except RuntimeError:
+        # Called outside of a graph run (no parent run to attach to)
+        logger.debug(f"Progress (not streamed): {message}")
+
 
+def get_llm() -> ResilientChatModel:
+    """Get LLM instance (shared client from the registry, with deadlines/retries/circuit breaker)"""
+    return resilient(get_chat_model(settings.OPENAI_MODEL, temperature=0.3))
 
-def classify_intent(state: AgentState) -> AgentState:
+
+def extract_json(content: str) -> str:
+    """Strip a ```json fence (or plain ``` fence) around an LLM JSON answer"""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    return content.strip()
+
+
+def parse_intent_extraction(response) -> IntentExtraction:
+    """
+    Validate the combined classify+extract answer
+    
+    Reads the IntentExtraction tool call, or the message content if the
+    model answered with plain JSON instead.
+    
+    Raises:
+        ValueError: If neither validates
+    """
+    for tool_call in getattr(response, "tool_calls", None) or []:
+        if tool_call.get("name") == IntentExtraction.__name__:
+            return IntentExtraction(**tool_call["args"])
+    return IntentExtraction(**json.loads(extract_json(response.content)))
+
+
+async def parse_state_image(state: AgentState, idx: int, image_base64: str):
+    """
+    Extract events from one attached image, using the speculative result
+    started during intent classification when there is one
+    """
+    from services.llm_service import parse_image_with_llm
+    
+    additional_note = state.get("message", "")
+    speculative = state.get("speculative_parse")
+    if speculative is not None:
+        result = await speculative.take(idx, image_base64, additional_note)
+        if result is not None:
+            return result
+    return await parse_image_with_llm(image_base64, additional_note)
+
+
+async def classify_intent(state: AgentState) -> AgentState:
     """Intent classification node"""
     logger.debug(f"Classifying intent for message: {state['message'][:50]}...")
     
+    # Collect attached images
+    images_base64 = []
+    if state.get("images_base64"):
+        images_base64 = state["images_base64"]
+    elif state.get("image_base64"):
+        images_base64 = [state["image_base64"]]
+    
+    # Local fast path: skip the LLM for unambiguous messages; while the LLM
+    # provider is degraded (circuit open), accept the local answer at any confidence
+    degraded = provider_degraded()
+    if settings.ENABLE_INTENT_FASTPATH or degraded:
+        fast_result = classify_fast(
+            state["message"],
+            conversation_history=state.get("conversation_history", ""),
+            has_images=bool(images_base64),
+            threshold=0.0 if degraded else settings.INTENT_FASTPATH_THRESHOLD,
+        )
+        if fast_result:
+            logger.info(f"Intent classified locally: {fast_result.intent} (confidence={fast_result.confidence}, source={fast_result.source})")
+            if state.get("speculative_parse"):
+                state["speculative_parse"].resolve(fast_result.intent)
+            return {
+                **state,
+                "intent": fast_result.intent,
+                "confidence": fast_result.confidence,
+            }
+    
     llm = get_llm()
-    current_time = datetime.now().isoformat()
+    current_time = prompt_time()
+    
+    # Text-only turns: one structured call returns the intent and, for
+    # create/update intents, the event payload the handler would otherwise
+    # extract with a second call
+    combined = settings.ENABLE_COMBINED_EXTRACTION and not images_base64
     
     # Build image note
     image_note = ""
-    images_count = 0
-    if state.get("images_base64"):
-        images_count = len(state["images_base64"])
-        image_note = f"(User attached {images_count} image(s))"
-    elif state.get("image_base64"):
-        images_count = 1
+    if len(images_base64) > 1:
+        image_note = f"(User attached {len(images_base64)} image(s))"
+    elif images_base64:
         image_note = "(User attached an image)"
     
     # Call LLM for intent classification
-    prompt = INTENT_CLASSIFIER_PROMPT.format_messages(
+    sections = fit_sections([
+        Section("message", state["message"], priority=2),
+        Section("conversation_history", state.get("conversation_history", ""), priority=1, keep="tail", line_based=True),
+    ], node="intent_classifier")
+    prompt_template = INTENT_EXTRACTION_PROMPT if combined else INTENT_CLASSIFIER_PROMPT
+    prompt = prompt_template.format_messages(
         current_time=current_time,
-        message=state["message"],
+        message=sections["message"],
         image_note=image_note,
-        conversation_history=state.get("conversation_history", ""),
+        conversation_history=sections["conversation_history"],
     )
     
-    # Use multimodal if image is present
-    if state.get("image_base64"):
-        content = [
-            {"type": "text", "text": prompt[1].content},
-            {
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{state['image_base64']}"},
-            },
-        ]
+    # Use multimodal if images are present
+    if images_base64:
+        # Classification only needs to tell whether the image looks like an
+        # event; fidelity per stage comes from IMAGE_STAGE_FIDELITY
+        image_parts = await asyncio.gather(
+            *(image_content_part(img, "intent_classifier") for img in images_base64)
+        )
+        content = [{"type": "text", "text": prompt[1].content}, *image_parts]
         messages = [prompt[0], HumanMessage(content=content)]
     else:
         messages = prompt
     
-    response = llm.invoke(messages)
+    if combined:
+        llm = llm.bind_tools([IntentExtraction], tool_choice=IntentExtraction.__name__)
+    
+    llm_started = time.perf_counter()
+    response = await llm.ainvoke(messages)
+    llm_latency = time.perf_counter() - llm_started
+    
+    extracted_event = None
+    extracted_update = None
     
-    # Parse JSON result
+    # Parse result
     try:
-        # Try to extract JSON
-        content = response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        result = json.loads(content.strip())
-        intent = result.get("intent", "chat")
-        confidence = result.get("confidence", 0.5)
-        logger.info(f"Intent classified: {intent} (confidence={confidence})")
-    except (json.JSONDecodeError, IndexError) as e:
+        if combined:
+            result = parse_intent_extraction(response)
+            intent = result.intent
+            confidence = result.confidence
+            if intent == "create_event" and result.event and result.event.title:
+                extracted_event = result.event.model_dump()
+            if intent == "update_event" and result.update:
+                extracted_update = {k: v for k, v in result.update.model_dump().items() if v} or None
+        else:
+            result = json.loads(extract_json(response.content))
+            intent = result.get("intent", "chat")
+            confidence = result.get("confidence", 0.5)
+        logger.info(
+            f"Intent classified: {intent} (confidence={confidence}"
+            f"{', with event payload' if extracted_event or extracted_update else ''})"
+        )
+    except (ValueError, IndexError, AttributeError, TypeError) as e:
         logger.warning(f"Failed to parse intent result: {e}, defaulting to chat")
         intent = "chat"
         confidence = 0.5
     
+    # Record text-only turns as training data for the fast-path model
+    if settings.INTENT_LOG_PATH and not images_base64:
+        log_intent_sample(settings.INTENT_LOG_PATH, state["message"], intent, confidence, llm_latency)
+    
+    # Keep or cancel image extraction started alongside this classification
+    if state.get("speculative_parse"):
+        state["speculative_parse"].resolve(intent)
+    
     return {
         **state,
         "intent": intent,
         "confidence": confidence,
+        "extracted_event": extracted_event,
+        "extracted_update": extracted_update,
     }
 
 
-def handle_chat(state: AgentState) -> AgentState:
+async def handle_chat(state: AgentState) -> AgentState:
     """Handle chat conversation"""
     logger.debug("Handling chat...")
     
     llm = get_llm()
-    current_time = datetime.now().isoformat()
+    current_time = prompt_time()
     
+    sections = fit_sections([
+        Section("message", state["message"], priority=2),
+        Section("conversation_history", state.get("conversation_history", ""), priority=1, keep="tail", line_based=True),
+    ], node="chat")
     prompt = CHAT_PROMPT.format_messages(
         current_time=current_time,
-        message=state["message"],
-        conversation_history=state.get("conversation_history", ""),
+        message=sections["message"],
+        conversation_history=sections["conversation_history"],
     )
     
-    response = llm.invoke(prompt)
+    response = await llm.ainvoke(prompt, config={"tags": [STREAM_TAG]})
     
     return {
         **state,
@@ -155,31 +294,6 @@ def handle_chat(state: AgentState) -> AgentState:
     }
 
 
-async def handle_chat_stream(state: AgentState):
-    """Handle chat conversation (streaming)"""
-    logger.debug("Handling chat (streaming)...")
-    
-    llm = get_llm()
-    current_time = datetime.now().isoformat()
-    
-    prompt = CHAT_PROMPT.format_messages(
-        current_time=current_time,
-        message=state["message"],
-        conversation_history=state.get("conversation_history", ""),
-    )
-    
-    # Stream LLM call
-    full_response = ""
-    async for chunk in llm.astream(prompt):
-        if hasattr(chunk, 'content') and chunk.content:
-            full_response += chunk.content
-            yield {"type": "token", "token": chunk.content}
-    
-    # Update state
-    state["response"] = full_response
-    state["action_result"] = None
-
-
 def check_duplicate_event(db: Session, user_id: int, title: str, start_time: datetime) -> Event | None:
     """
     Check if duplicate event exists (same title + same start time)
@@ -201,7 +315,7 @@ def check_duplicate_event(db: Session, user_id: int, title: str, start_time: dat
     return existing
 
 
-def handle_create_event(state: AgentState) -> AgentState:
+async def handle_create_event(state: AgentState) -> AgentState:
     """Handle event creation (supports multiple images)"""
     logger.debug("Handling create event...")
     
@@ -240,16 +354,16 @@ def handle_create_event(state: AgentState) -> AgentState:
             
             try:
                 from services.search_service import (
-                    search_event_info_sync,
-                    extract_event_details_from_search_sync,
+                    search_event_info,
+                    extract_event_details_from_search,
                 )
                 
                 progress_messages.append("Querying search engine...")
-                search_results = search_event_info_sync(query=event_title)
+                search_results = await search_event_info(query=event_title)
                 
                 if search_results:
                     progress_messages.append(f"Found {len(search_results)} results, extracting details...")
-                    completed_info = extract_event_details_from_search_sync(
+                    completed_info = await extract_event_details_from_search(
                         search_results,
                         partial_event={"title": event_title},
                     )
@@ -358,26 +472,42 @@ def handle_create_event(state: AgentState) -> AgentState:
     if len(images_base64) > 1:
         logger.info(f"Processing {len(images_base64)} images for event creation")
         try:
-            from services.llm_service import parse_image_with_llm
-            from services.image_utils import generate_thumbnail
+            from services.image_utils import generate_thumbnail_async
+            
+            # Parse and thumbnail images concurrently (bounded); each image is
+            # still processed individually to assign correct thumbnails
+            semaphore = asyncio.Semaphore(max(1, settings.IMAGE_CONCURRENCY))
+            finished = 0
+            
+            async def process_image(idx: int, image_base64: str):
+                nonlocal finished
+                async with semaphore:
+                    try:
+                        result = await parse_state_image(state, idx, image_base64)
+                        parsed_events = result.events
+                        # Thumbnailing is CPU-bound; runs in the image pool
+                        thumbnail = await generate_thumbnail_async(image_base64) if parsed_events else None
+                    except Exception as img_error:
+                        logger.warning(f"Failed to process image {idx+1}/{len(images_base64)}: {img_error}")
+                        parsed_events, thumbnail = [], None
+                finished += 1
+                await emit_progress(f"Processed image {finished}/{len(images_base64)}")
+                return parsed_events, thumbnail
+            
+            results = await asyncio.gather(*(
+                process_image(idx, image_base64) for idx, image_base64 in enumerate(images_base64)
+            ))
             
-            # Process each image individually to assign correct thumbnails
             created_events = []
             duplicate_events = []
             
-            for idx, image_base64 in enumerate(images_base64):
+            # Create records in image order so results are deterministic
+            for idx, (parsed_events, thumbnail) in enumerate(results):
                 try:
-                    # Parse each image individually
-                    result = parse_image_with_llm(image_base64, state.get("message", ""))
-                    parsed_events = result.events
-                    
                     if not parsed_events:
                         logger.debug(f"No events parsed from image {idx+1}/{len(images_base64)}")
                         continue
                     
-                    # Generate thumbnail for this specific image
-                    thumbnail = generate_thumbnail(image_base64)
-                    
                     # Create database records for each parsed event from this image
                     for parsed_event in parsed_events:
                         # Check for duplicates
@@ -405,7 +535,7 @@ def handle_create_event(state: AgentState) -> AgentState:
                         created_events.append(event)
                         
                 except Exception as img_error:
-                    logger.warning(f"Failed to process image {idx+1}/{len(images_base64)}: {img_error}")
+                    logger.warning(f"Failed to save events from image {idx+1}/{len(images_base64)}: {img_error}")
                     continue
             
             db.commit()
@@ -482,14 +612,10 @@ def handle_create_event(state: AgentState) -> AgentState:
     if images_base64 and len(images_base64) == 1:
         logger.info("Using image parsing service for single image")
         try:
-            from services.llm_service import parse_image_with_llm
-            from services.image_utils import generate_thumbnail
+            from services.image_utils import generate_thumbnail_async
             
             # Use dedicated image parsing service
-            parse_result = parse_image_with_llm(
-                images_base64[0],
-                additional_note=state.get("message", "")
-            )
+            parse_result = await parse_state_image(state, 0, images_base64[0])
             
             # Use parsed events directly if available
             if parse_result.events:
@@ -522,7 +648,7 @@ def handle_create_event(state: AgentState) -> AgentState:
                     location=parsed_event.location,
                     description=parsed_event.description,
                     source_type="image",
-                    source_thumbnail=generate_thumbnail(images_base64[0]),
+                    source_thumbnail=await generate_thumbnail_async(images_base64[0]),
                     is_followed=True,
                 )
                 db.add(event)
@@ -569,8 +695,8 @@ def handle_create_event(state: AgentState) -> AgentState:
                 
                 try:
                     from services.search_service import (
-                        search_event_info_sync,
-                        extract_event_details_from_search_sync,
+                        search_event_info,
+                        extract_event_details_from_search,
                     )
                     
                     # Build search query
@@ -579,14 +705,14 @@ def handle_create_event(state: AgentState) -> AgentState:
                         search_query = " ".join(parse_result.search_keywords)
                     
                     progress_messages.append(f"Searching for: {search_query}")
-                    search_results = search_event_info_sync(
+                    search_results = await search_event_info(
                         query=search_query,
                         location_hint=partial_event.get("location"),
                     )
                     
                     if search_results:
                         progress_messages.append(f"Found {len(search_results)} results, extracting details...")
-                        completed_info = extract_event_details_from_search_sync(
+                        completed_info = await extract_event_details_from_search(
                             search_results,
                             partial_event={"title": event_title, "location_hint": partial_event.get("location")},
                         )
@@ -621,7 +747,7 @@ def handle_create_event(state: AgentState) -> AgentState:
                                     location=location,
                                     description=description,
                                     source_type="image",
-                                    source_thumbnail=generate_thumbnail(images_base64[0]),
+                                    source_thumbnail=await generate_thumbnail_async(images_base64[0]),
                                     is_followed=True,
                                 )
                                 db.add(event)
@@ -706,44 +832,41 @@ def handle_create_event(state: AgentState) -> AgentState:
             # Continue with text extraction logic
     
     # Text extraction logic (fallback when no image or image parsing failed)
-    llm = get_llm()
-    current_time = datetime.now().isoformat()
-    
-    # Build image note
-    image_note = ""
-    if images_base64:
-        image_note = "(User attached image(s), please extract event information from images)"
-    
-    # Extract event information
-    prompt = EVENT_EXTRACTION_PROMPT.format_messages(
-        current_time=current_time,
-        message=state["message"],
-        image_note=image_note,
-    )
-    
-    # Use multimodal if images are present
-    if images_base64:
-        content = [{"type": "text", "text": prompt[1].content}]
-        for img_base64 in images_base64:
-            content.append({
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"},
-            })
-        messages = [prompt[0], HumanMessage(content=content)]
+    # The combined classify+extract call may already have returned the event
+    extracted_event = None if images_base64 else state.get("extracted_event")
+    if extracted_event:
+        logger.info("Using event payload from intent classification, skipping extraction call")
     else:
-        messages = prompt
-    
-    response = llm.invoke(messages)
+        llm = get_llm()
+        current_time = prompt_time()
+        
+        # Build image note
+        image_note = ""
+        if images_base64:
+            image_note = "(User attached image(s), please extract event information from images)"
+        
+        # Extract event information
+        prompt = EVENT_EXTRACTION_PROMPT.format_messages(
+            current_time=current_time,
+            message=fit_text(state["message"], node="event_extraction", name="message"),
+            image_note=image_note,
+        )
+        
+        # Use multimodal if images are present
+        if images_base64:
+            image_parts = await asyncio.gather(
+                *(image_content_part(img, "event_extraction") for img in images_base64)
+            )
+            content = [{"type": "text", "text": prompt[1].content}, *image_parts]
+            messages = [prompt[0], HumanMessage(content=content)]
+        else:
+            messages = prompt
+        
+        response = await llm.ainvoke(messages)
     
     # Parse event information
     try:
-        content = response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        event_data = json.loads(content.strip())
+        event_data = dict(extracted_event) if extracted_event else json.loads(extract_json(response.content))
         
         # Initialize progress messages
         progress_messages = state.get("progress_messages") or []
@@ -773,13 +896,13 @@ def handle_create_event(state: AgentState) -> AgentState:
                     
                     try:
                         from services.search_service import (
-                            search_event_info_sync,
-                            extract_event_details_from_search_sync,
+                            search_event_info,
+                            extract_event_details_from_search,
                         )
                         
                         # Search web
                         progress_messages.append("Querying search engine...")
-                        search_results = search_event_info_sync(
+                        search_results = await search_event_info(
                             query=" ".join(search_keywords),
                             location_hint=location,
                         )
@@ -789,7 +912,7 @@ def handle_create_event(state: AgentState) -> AgentState:
                             logger.info(f"Web search returned {len(search_results)} results")
                             
                             # Extract event details
-                            completed_info = extract_event_details_from_search_sync(
+                            completed_info = await extract_event_details_from_search(
                                 search_results,
                                 partial_event={
                                     "title": title or "",
@@ -1027,7 +1150,62 @@ def handle_create_event(state: AgentState) -> AgentState:
         }
 
 
-def handle_update_event(state: AgentState) -> AgentState:
+async def match_target_event(state: AgentState, events: List[Event], allow_local: bool = True) -> Optional[int]:
+    """
+    Find the event the user is referring to
+    
+    Events are ranked locally first; only the top-k candidates are sent to
+    EVENT_MATCH_PROMPT, and the LLM call is skipped when one candidate
+    clearly dominates (EVENT_MATCH_SKIP_LLM).
+    
+    Args:
+        state: Agent state
+        events: User's events
+        allow_local: Whether a dominant candidate may be picked without the LLM
+            (False for deletes)
+    
+    Returns:
+        Matched event ID, or None if nothing matches
+    """
+    candidates = retrieve_candidates(
+        events,
+        state["message"],
+        conversation_history=state.get("conversation_history", ""),
+        top_k=settings.EVENT_MATCH_TOP_K,
+    )
+    
+    if allow_local and settings.EVENT_MATCH_SKIP_LLM:
+        dominant = pick_dominant(candidates)
+        if dominant:
+            logger.info(f"Matched event locally: {dominant.title} (id={dominant.id})")
+            return dominant.id
+    
+    logger.debug(f"Matching event with LLM over {len(candidates)}/{len(events)} candidates")
+    sections = fit_sections([
+        Section("message", state["message"], priority=3),
+        Section("events_list", encode_events(sorted((c.event for c in candidates), key=lambda e: e.start_time)), priority=2, line_based=True),
+        Section("conversation_history", state.get("conversation_history", ""), priority=1, keep="tail", line_based=True),
+    ], node="event_match")
+    
+    match_prompt = EVENT_MATCH_PROMPT.format_messages(
+        events_list=sections["events_list"],
+        user_description=sections["message"],
+        conversation_history=sections["conversation_history"],
+    )
+    
+    match_response = await get_llm().ainvoke(match_prompt)
+    
+    content = match_response.content
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    
+    match_result = json.loads(content.strip())
+    return match_result.get("matched_event_id")
+
+
+async def handle_update_event(state: AgentState) -> AgentState:
     """Handle event update"""
     logger.debug("Handling update event...")
     
@@ -1044,35 +1222,8 @@ def handle_update_event(state: AgentState) -> AgentState:
             "action_result": {"action": "update_event", "error": "no_events"},
         }
     
-    # Use LLM to match target event
-    llm = get_llm()
-    events_list = json.dumps([
-        {
-            "id": e.id,
-            "title": e.title,
-            "start_time": e.start_time.isoformat(),
-            "location": e.location,
-        }
-        for e in events
-    ], ensure_ascii=False)
-    
-    match_prompt = EVENT_MATCH_PROMPT.format_messages(
-        events_list=events_list,
-        user_description=state["message"],
-        conversation_history=state.get("conversation_history", ""),
-    )
-    
-    match_response = llm.invoke(match_prompt)
-    
     try:
-        content = match_response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        match_result = json.loads(content.strip())
-        matched_id = match_result.get("matched_event_id")
+        matched_id = await match_target_event(state, events)
         
         if not matched_id:
             return {
@@ -1090,29 +1241,35 @@ def handle_update_event(state: AgentState) -> AgentState:
                 "action_result": {"action": "update_event", "error": "event_not_found"},
             }
         
-        # Extract update information
-        original_event = json.dumps({
-            "title": event.title,
-            "start_time": event.start_time.isoformat(),
-            "end_time": event.end_time.isoformat() if event.end_time else None,
-            "location": event.location,
-            "description": event.description,
-        }, ensure_ascii=False)
-        
-        update_prompt = EVENT_UPDATE_PROMPT.format_messages(
-            original_event=original_event,
-            user_message=state["message"],
-        )
-        
-        update_response = llm.invoke(update_prompt)
-        
-        content = update_response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        update_data = json.loads(content.strip())
+        # Extract update information (the combined classify+extract call may
+        # already have returned the fields)
+        update_data = state.get("extracted_update")
+        if update_data:
+            logger.info("Using update fields from intent classification, skipping extraction call")
+        else:
+            original_event = json.dumps({
+                key: value
+                for key, value in {
+                    "title": event.title,
+                    "start_time": event.start_time.isoformat(),
+                    "end_time": event.end_time.isoformat() if event.end_time else None,
+                    "location": event.location,
+                    "description": event.description,
+                }.items()
+                if value
+            }, ensure_ascii=False)
+            
+            sections = fit_sections([
+                Section("user_message", state["message"], priority=2),
+                Section("original_event", original_event, priority=1),
+            ], node="event_update")
+            update_prompt = EVENT_UPDATE_PROMPT.format_messages(
+                original_event=sections["original_event"],
+                user_message=sections["user_message"],
+            )
+            
+            update_response = await get_llm().ainvoke(update_prompt)
+            update_data = json.loads(extract_json(update_response.content))
         
         # Update event
         if "title" in update_data and update_data["title"]:
@@ -1151,7 +1308,7 @@ def handle_update_event(state: AgentState) -> AgentState:
         }
 
 
-def handle_delete_event(state: AgentState) -> AgentState:
+async def handle_delete_event(state: AgentState) -> AgentState:
     """Handle event deletion"""
     logger.debug("Handling delete event...")
     
@@ -1168,35 +1325,8 @@ def handle_delete_event(state: AgentState) -> AgentState:
             "action_result": {"action": "delete_event", "error": "no_events"},
         }
     
-    # Use LLM to match target event
-    llm = get_llm()
-    events_list = json.dumps([
-        {
-            "id": e.id,
-            "title": e.title,
-            "start_time": e.start_time.isoformat(),
-            "location": e.location,
-        }
-        for e in events
-    ], ensure_ascii=False)
-    
-    match_prompt = EVENT_MATCH_PROMPT.format_messages(
-        events_list=events_list,
-        user_description=state["message"],
-        conversation_history=state.get("conversation_history", ""),
-    )
-    
-    match_response = llm.invoke(match_prompt)
-    
     try:
-        content = match_response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        match_result = json.loads(content.strip())
-        matched_id = match_result.get("matched_event_id")
+        matched_id = await match_target_event(state, events, allow_local=False)
         
         if not matched_id:
             return {
@@ -1235,7 +1365,7 @@ def handle_delete_event(state: AgentState) -> AgentState:
         }
 
 
-def handle_query_event(state: AgentState) -> AgentState:
+async def handle_query_event(state: AgentState) -> AgentState:
     """Handle event query"""
     logger.debug("Handling query event...")
     
@@ -1243,48 +1373,44 @@ def handle_query_event(state: AgentState) -> AgentState:
     user_id = state["user_id"]
     message = state["message"]
     
-    # Use regular query
-    events = db.query(Event).filter(Event.user_id == user_id).order_by(Event.start_time).all()
-    
-    if not events:
-        return {
-            **state,
-            "response": "You currently have no events. Would you like me to create one for you?",
-            "action_result": {"action": "query_event", "events_count": 0, "events": []},
-        }
-    
-    # Use LLM to intelligently respond based on user request
-    llm = get_llm()
-    current_time = datetime.now().isoformat()
-    
-    events_list = json.dumps([
-        {
-            "id": e.id,
-            "title": e.title,
-            "start_time": e.start_time.isoformat(),
-            "end_time": e.end_time.isoformat() if e.end_time else None,
-            "location": e.location,
-            "description": e.description,
-        }
-        for e in events
-    ], ensure_ascii=False, indent=2)
-    
-    prompt = EVENT_QUERY_PROMPT.format_messages(
-        current_time=current_time,
-        message=message,
-        events_list=events_list,
-    )
-    
-    response = llm.invoke(prompt)
+    # Turn the question into an indexed SQL filter
+    plan = plan_query(message)
+    max_events = TEMPLATE_MAX_EVENTS if plan.templated else LLM_MAX_EVENTS
+    events, total = execute_plan(db, user_id, plan, max_events)
+    logger.debug(f"Query plan: {plan}, matched {total} events")
+    
+    if plan.templated:
+        # Common shapes (today, tomorrow, this weekend...) need no LLM
+        response_text = render_answer(plan, events, total)
+    elif not events and not db.query(Event.id).filter(Event.user_id == user_id).first():
+        response_text = "You currently have no events. Would you like me to create one for you?"
+    else:
+        # Summarize only the matched events
+        llm = get_llm()
+        current_time = prompt_time()
+        
+        sections = fit_sections([
+            Section("message", message, priority=2),
+            Section("events_list", encode_events(events, description_chars=DESCRIPTION_CHARS), priority=1, line_based=True),
+        ], node="event_query")
+        
+        prompt = EVENT_QUERY_PROMPT.format_messages(
+            current_time=current_time,
+            message=sections["message"],
+            events_list=sections["events_list"],
+        )
+        
+        response = await llm.ainvoke(prompt, config={"tags": [STREAM_TAG]})
+        response_text = response.content
     
-    logger.info(f"Query event completed: found {len(events)} events")
+    logger.info(f"Query event completed: found {total} events (templated={plan.templated})")
     
     return {
         **state,
-        "response": response.content,
+        "response": response_text,
         "action_result": {
             "action": "query_event",
-            "events_count": len(events),
+            "events_count": total,
             "events": [
                 {
                     "id": e.id,
@@ -1299,7 +1425,7 @@ def handle_query_event(state: AgentState) -> AgentState:
     }
 
 
-def handle_enrich_event(state: AgentState) -> AgentState:
+async def handle_enrich_event(state: AgentState) -> AgentState:
     """Handle event enrichment - search for and add more information to existing event"""
     logger.debug("Handling enrich event...")
     
@@ -1324,35 +1450,8 @@ def handle_enrich_event(state: AgentState) -> AgentState:
             "action_result": {"action": "enrich_event", "error": "no_events"},
         }
     
-    # Use LLM to match target event
-    llm = get_llm()
-    events_list = json.dumps([
-        {
-            "id": e.id,
-            "title": e.title,
-            "start_time": e.start_time.isoformat(),
-            "location": e.location,
-        }
-        for e in events
-    ], ensure_ascii=False)
-    
-    match_prompt = EVENT_MATCH_PROMPT.format_messages(
-        events_list=events_list,
-        user_description=state["message"],
-        conversation_history=state.get("conversation_history", ""),
-    )
-    
-    match_response = llm.invoke(match_prompt)
-    
     try:
-        content = match_response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        match_result = json.loads(content.strip())
-        matched_id = match_result.get("matched_event_id")
+        matched_id = await match_target_event(state, events)
         
         if not matched_id:
             return {
@@ -1384,8 +1483,8 @@ def handle_enrich_event(state: AgentState) -> AgentState:
         
         # Search for event information
         from services.search_service import (
-            search_event_info_sync,
-            extract_event_details_from_search_sync,
+            search_event_info,
+            extract_event_details_from_search,
             merge_event_info,
         )
         
@@ -1395,8 +1494,7 @@ def handle_enrich_event(state: AgentState) -> AgentState:
         try:
             progress_messages.append("Querying search engine...")
             
-            # Call sync search function directly
-            search_results = search_event_info_sync(
+            search_results = await search_event_info(
                 query=" ".join(search_keywords),
                 location_hint=event.location,
                 date_hint=event.start_time.strftime("%Y-%m-%d") if event.start_time else None,
@@ -1420,8 +1518,7 @@ def handle_enrich_event(state: AgentState) -> AgentState:
                 "location_hint": event.location or "",
             }
             
-            # Call sync extraction function directly
-            completed_info = extract_event_details_from_search_sync(
+            completed_info = await extract_event_details_from_search(
                 search_results,
                 partial_event=partial_event,
             )
@@ -1533,7 +1630,7 @@ def handle_enrich_event(state: AgentState) -> AgentState:
         }
 
 
-def handle_reject(state: AgentState) -> AgentState:
+async def handle_reject(state: AgentState) -> AgentState:
     """Handle unclear requests - friendly user inquiry"""
     logger.debug("Handling unclear request with friendly response...")
     
@@ -1558,6 +1655,18 @@ def handle_reject(state: AgentState) -> AgentState:
 # Routing Functions
 # ============================================================================
 
+# Intents that map to a handler node
+INTENT_NODES = (
+    "chat",
+    "create_event",
+    "query_event",
+    "update_event",
+    "delete_event",
+    "enrich_event",
+    "reject",
+)
+
+
 def route_by_intent(state: AgentState) -> str:
     """Route to different processing nodes based on intent"""
     intent = state.get("intent", "chat")
@@ -1578,6 +1687,19 @@ def route_by_intent(state: AgentState) -> str:
         return "chat"
 
 
+def route_entry(state: AgentState) -> str:
+    """
+    Choose the graph entry node
+    
+    A state that already carries a classified intent (e.g. from the streaming
+    path, which classifies up front to report the intent early) enters
+    directly at the handler node instead of being classified a second time.
+    """
+    if state.get("intent"):
+        return route_by_intent(state)
+    return "intent_classifier"
+
+
 # ============================================================================
 # Graph Construction
 # ============================================================================
@@ -1588,32 +1710,30 @@ def create_agent_graph() -> StateGraph:
     # Create graph
     graph = StateGraph(AgentState)
     
-    # Add nodes
-    graph.add_node("intent_classifier", classify_intent)
-    graph.add_node("chat", handle_chat)
-    graph.add_node("create_event", handle_create_event)
-    graph.add_node("query_event", handle_query_event)
-    graph.add_node("update_event", handle_update_event)
-    graph.add_node("delete_event", handle_delete_event)
-    graph.add_node("enrich_event", handle_enrich_event)
-    graph.add_node("reject", handle_reject)
-    
-    # Set entry point
-    graph.set_entry_point("intent_classifier")
+    # Add nodes (latency and LLM token usage recorded per node)
+    graph.add_node("intent_classifier", instrument_node("intent_classifier", classify_intent))
+    graph.add_node("chat", instrument_node("chat", handle_chat))
+    graph.add_node("create_event", instrument_node("create_event", handle_create_event))
+    graph.add_node("query_event", instrument_node("query_event", handle_query_event))
+    graph.add_node("update_event", instrument_node("update_event", handle_update_event))
+    graph.add_node("delete_event", instrument_node("delete_event", handle_delete_event))
+    graph.add_node("enrich_event", instrument_node("enrich_event", handle_enrich_event))
+    graph.add_node("reject", instrument_node("reject", handle_reject))
+    
+    # Set entry point (skip classification when intent is already known)
+    graph.set_conditional_entry_point(
+        route_entry,
+        {
+            "intent_classifier": "intent_classifier",
+            **{node: node for node in INTENT_NODES},
+        }
+    )
     
     # Add conditional edges (route based on intent)
     graph.add_conditional_edges(
         "intent_classifier",
         route_by_intent,
-        {
-            "chat": "chat",
-            "create_event": "create_event",
-            "query_event": "query_event",
-            "update_event": "update_event",
-            "delete_event": "delete_event",
-            "enrich_event": "enrich_event",
-            "reject": "reject",
-        }
+        {node: node for node in INTENT_NODES},
     )
     
     # All processing nodes end here
@@ -1628,11 +1748,18 @@ def create_agent_graph() -> StateGraph:
     return graph.compile()
 
 
+@lru_cache(maxsize=None)
+def get_agent_graph():
+    """Get the process-wide compiled Agent graph (compiled once, reused by every run)"""
+    logger.info("Compiling agent graph")
+    return create_agent_graph()
+
+
 # ============================================================================
 # Run Agent
 # ============================================================================
 
-def run_agent(
+async def run_agent(
     message: str,
     user_id: int,
     db: Session,
@@ -1656,8 +1783,8 @@ def run_agent(
     """
     logger.info(f"Running agent for user {user_id}: {message[:50]}...")
     
-    # Create and run graph
-    agent = create_agent_graph()
+    # Get the shared compiled graph
+    agent = get_agent_graph()
     
     initial_state = AgentState(
         message=message,
@@ -1672,8 +1799,20 @@ def run_agent(
         db=db,
     )
     
+    # Deadline shared by all LLM calls of this turn
+    turn = start_turn()
+    
+    # Start image extraction while the graph classifies the intent
+    speculative = start_speculative_parse(images_base64 or ([image_base64] if image_base64 else None), message)
+    initial_state["speculative_parse"] = speculative
+    
     # Run graph
-    result = agent.invoke(initial_state)
+    try:
+        result = await agent.ainvoke(initial_state)
+    finally:
+        if speculative:
+            speculative.close()
+        end_turn(turn)
     
     logger.info(f"Agent completed: intent={result['intent']}")
     
@@ -1706,13 +1845,18 @@ async def run_agent_stream(
         Streaming event dictionary containing type and corresponding data:
         - {"type": "thinking", "message": "Thinking..."} - Thinking state
         - {"type": "intent", "intent": "chat"} - Intent classification completed
-        - {"type": "token", "token": "word"} - Streaming text token (chat intent only)
-        - {"type": "content", "content": "Full response"} - Full response (non-chat intent)
+        - {"type": "token", "token": "word"} - Streaming text token (LLM-generated answers, e.g. chat/query)
+        - {"type": "content", "content": "Full response"} - Full response (template answers, nothing streamed)
+        - {"type": "status", "message": "..."} - Progress message (e.g., search progress)
         - {"type": "action", "action_result": {...}} - Action result (e.g., created events)
         - {"type": "done"} - Done
         - {"type": "error", "error": "Error message"} - Error
     """
     logger.info(f"Running agent (streaming) for user {user_id}: {message[:50]}...")
+    started = time.perf_counter()
+    speculative = None
+    # Deadline shared by all LLM calls of this turn
+    turn = start_turn()
     
     try:
         # Send thinking event - start understanding request
@@ -1731,107 +1875,75 @@ async def run_agent_stream(
             db=db,
         )
         
-        # Step 1: Intent classification (non-streaming, quick judgment)
-        llm = get_llm()
-        current_time = datetime.now().isoformat()
-        
-        image_note = ""
-        if images_base64:
-            image_note = f"(User attached {len(images_base64)} image(s))"
-        elif image_base64:
-            image_note = "(User attached an image)"
-        
-        prompt = INTENT_CLASSIFIER_PROMPT.format_messages(
-            current_time=current_time,
-            message=message,
-            image_note=image_note,
-            conversation_history=conversation_history,
-        )
-        
-        if images_base64:
-            # Multiple images: add all images
-            content = [{"type": "text", "text": prompt[1].content}]
-            for img_base64 in images_base64:
-                content.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"},
-                })
-            messages = [prompt[0], HumanMessage(content=content)]
-        elif image_base64:
-            # Single image (backward compatibility)
-            content = [
-                {"type": "text", "text": prompt[1].content},
-                {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
-                },
-            ]
-            messages = [prompt[0], HumanMessage(content=content)]
-        else:
-            messages = prompt
+        # Start image extraction while the intent is classified; kept if the
+        # intent is create_event, cancelled otherwise
+        speculative = start_speculative_parse(images_base64 or ([image_base64] if image_base64 else None), message)
+        initial_state["speculative_parse"] = speculative
         
-        intent_response = llm.invoke(messages)
-        
-        # Parse intent
-        try:
-            content = intent_response.content
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                json_str = content.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = content.strip()
-            
-            intent_data = json.loads(json_str)
-            intent = intent_data.get("intent", "chat")
-            logger.info(f"Intent classified: {intent}")
-        except Exception as e:
-            logger.warning(f"Failed to parse intent, defaulting to chat: {e}")
-            intent = "chat"
+        # Step 1: Intent classification (non-streaming, quick judgment)
+        # The classified state is handed to the graph below, which then enters
+        # directly at the handler node instead of classifying again
+        initial_state = await instrument_node("intent_classifier", classify_intent)(initial_state)
+        intent = initial_state["intent"]
         
         yield {"type": "intent", "intent": intent}
         
-        # Step 2: Generate response based on intent
-        if intent == "chat":
-            # Chat: send thinking event, then stream response
-            yield {"type": "thinking", "message": "Thinking of a response..."}
-            async for chunk in handle_chat_stream(initial_state):
-                yield chunk
-        else:
-            # Other intents (create_event/query_event/update_event/delete_event/reject)
-            # Send thinking event indicating operation in progress
-            thinking_messages = {
-                "create_event": "Creating event...",
-                "query_event": "Querying events...",
-                "update_event": "Updating event...",
-                "delete_event": "Deleting event...",
-                "reject": "Understanding your needs...",
-                "enrich_event": "Searching for event information...",
-            }
-            yield {"type": "thinking", "message": thinking_messages.get(intent, "Processing...")}
-            
-            # Add progress_messages to initial state
-            initial_state["progress_messages"] = []
-            
-            agent = create_agent_graph()
-            result = agent.invoke(initial_state)
-            
-            # Send progress messages (e.g., search progress)
-            progress_messages = result.get("progress_messages", [])
-            for msg in progress_messages:
-                yield {"type": "status", "message": msg}
-            
-            # Send action result if available
-            if result.get("action_result"):
-                yield {"type": "action", "action_result": result.get("action_result")}
-            
-            # Send full response directly (non-streaming operations, direct result is clearer)
-            full_response = result.get("response", "")
-            if full_response:
-                yield {"type": "content", "content": full_response}
+        # Step 2: Run the handler node, forwarding tokens from user-facing LLM calls
+        thinking_messages = {
+            "chat": "Thinking of a response...",
+            "create_event": "Creating event...",
+            "query_event": "Querying events...",
+            "update_event": "Updating event...",
+            "delete_event": "Deleting event...",
+            "reject": "Understanding your needs...",
+            "enrich_event": "Searching for event information...",
+        }
+        yield {"type": "thinking", "message": thinking_messages.get(intent, "Processing...")}
+        
+        # Add progress_messages to initial state
+        initial_state["progress_messages"] = []
+        
+        agent = get_agent_graph()
+        result = None
+        streamed_tokens = False
+        async for event in agent.astream_events(initial_state, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream" and STREAM_TAG in event.get("tags", []):
+                token = event["data"]["chunk"].content
+                if token:
+                    if not streamed_tokens:
+                        streamed_tokens = True
+                        logger.info(f"Time to first token: {time.perf_counter() - started:.2f}s (intent={intent})")
+                    yield {"type": "token", "token": token}
+            elif kind == "on_custom_event" and event["name"] == PROGRESS_EVENT:
+                yield {"type": "status", "message": event["data"]["message"]}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Top-level graph run finished: final state
+                result = event["data"]["output"]
+        
+        result = result or {}
+        
+        # Send progress messages (e.g., search progress)
+        progress_messages = result.get("progress_messages") or []
+        for msg in progress_messages:
+            yield {"type": "status", "message": msg}
+        
+        # Send action result if available
+        if result.get("action_result"):
+            yield {"type": "action", "action_result": result.get("action_result")}
+        
+        # Template responses (nothing streamed) are sent in one piece
+        full_response = result.get("response", "")
+        if full_response and not streamed_tokens:
+            logger.info(f"Time to first token: {time.perf_counter() - started:.2f}s (intent={intent})")
+            yield {"type": "content", "content": full_response}
         
         yield {"type": "done"}
         
     except Exception as e:
         logger.error(f"Stream agent error: {e}", exc_info=True)
         yield {"type": "error", "error": str(e)}
+    finally:
+        if speculative:
+            speculative.close()
+        end_turn(turn)
@@ -0,0 +1,402 @@
+"""
+Local Fast-Path Intent Classifier
+
+Answers unambiguous messages locally so the INTENT_CLASSIFIER_PROMPT LLM call
+can be skipped. Two tiers, both in-process and sub-millisecond:
+
+1. Keyword rules (English / German / Chinese)
+2. Hashed n-gram multinomial logistic regression trained on logged
+   (message, LLM intent) pairs (see scripts/train_intent_model.py)
+
+A result is only returned when its confidence reaches the configured
+threshold; otherwise the caller falls back to the LLM. update_event and
+delete_event are never decided locally: they change stored events, so a
+misread message must not move or delete anything without the LLM.
+"""
+import json
+import math
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_MODEL_PATH = DATA_DIR / "intent_model.json"
+SEED_PATH = DATA_DIR / "intent_seed.jsonl"
+
+INTENTS = (
+    "chat",
+    "create_event",
+    "query_event",
+    "update_event",
+    "delete_event",
+    "enrich_event",
+)
+
+# Number of hash buckets for n-gram features
+NUM_FEATURES = 2 ** 18
+
+# Intents that modify stored events: always classified by the LLM
+DESTRUCTIVE_INTENTS = frozenset({"update_event", "delete_event"})
+
+# Rule confidence when no seed samples are available (below the default threshold)
+DEFAULT_RULE_CONFIDENCE = 0.8
+
+
+class FastPathResult(NamedTuple):
+    """Locally classified intent"""
+    intent: str
+    confidence: float
+    source: str  # "rules" or "model"
+
+
+# ============================================================================
+# Tier 1: Keyword Rules
+# ============================================================================
+
+# Verb, then an optional determiner and at most two modifiers, then the event noun
+# ("delete my dentist appointment", not "remove the notes from my ... appointment")
+_EVENT_NOUN = r"(?:events?|meetings?|appointments?|sessions?|dinner|lunch|call|class|reservation|termin\w*)"
+_NEXT_TO_NOUN = r"\s+(?:(?:my|the|this|that|our|\w+'s)\s+)?(?:[\w-]+\s+){0,2}?" + _EVENT_NOUN + r"\b"
+_DE_EVENT_NOUN = r"(?:\w*termin\w*|treffen|meeting|veranstaltung)"
+_ZH_EVENT_NOUN = r"(?:日程|活动|会议|预约|安排)"
+
+INTENT_RULES: Dict[str, List[re.Pattern]] = {
+    "delete_event": [
+        re.compile(r"\b(?:delete|remove|cancel)" + _NEXT_TO_NOUN, re.I),
+        re.compile(r"\b(?:lösch\w*|entfern\w*|stornier\w*)\s+(?:(?:den|die|das|meinen|meine|mein)\s+)?(?:\w+\s+)?" + _DE_EVENT_NOUN, re.I),
+        re.compile(r"(?:删除|删掉|取消)\S{0,4}?" + _ZH_EVENT_NOUN),
+    ],
+    "query_event": [
+        re.compile(r"\bwhat(?:'s| is)\s+(?:on|planned|scheduled|happening|coming up)\b", re.I),
+        re.compile(r"\bwhat (?:do i have|have i got)\b", re.I),
+        re.compile(r"\b(show|list|view|see)\b.*\b(my )?(events|schedule|calendar|agenda|appointments)\b", re.I),
+        re.compile(r"\b(am i free|do i have anything)\b", re.I),
+        re.compile(r"\b(was habe ich|was steht|zeig\w*.*\btermine|meine termine|habe ich .*\btermin)", re.I),
+        re.compile(r"查看.*(日程|安排|活动)|有什么(安排|日程|活动)|我的日程|日程表"),
+    ],
+    "update_event": [
+        re.compile(r"\b(?:reschedule|postpone|move|push|change|shift)" + _NEXT_TO_NOUN, re.I),
+        re.compile(r"\b(?:verschieb\w*|änder\w*|verleg\w*)\s+(?:(?:den|die|das|meinen|meine|mein)\s+)?(?:\w+\s+)?" + _DE_EVENT_NOUN, re.I),
+        re.compile(_ZH_EVENT_NOUN + r".{0,6}?(?:改到|改成|推迟|提前到|挪到)|修改\S{0,4}?(?:时间|地点|日程)"),
+    ],
+    "create_event": [
+        re.compile(r"\b(add|create|schedule|book|put|set up)\b.*\b(event|meeting|appointment|call|dinner|lunch|reminder|calendar)\b", re.I),
+        re.compile(r"\bremind me\b", re.I),
+        re.compile(r"\b(erstell\w*|trag\w*\b.*\bein|erinner\w* mich|füg\w*.*hinzu)\b", re.I),
+        re.compile(r"创建|新建|添加.*(日程|活动|会议|提醒)|提醒我|帮我(加|安排|记)"),
+    ],
+    "enrich_event": [
+        re.compile(r"\b(find|search|look up)\b.*\b(more )?(info|information|details)\b.*\b(about|for|on)\b", re.I),
+        re.compile(r"\bmehr (infos?|informationen|details)\b", re.I),
+        re.compile(r"搜索更多|补充.*(信息|详情)|查.*更多(信息|详情)"),
+    ],
+    "chat": [
+        re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|evening|night)|hallo|servus|moin|danke|你好|您好|谢谢|嗨)[\s!.,~。！]*$", re.I),
+    ],
+}
+
+
+def _matching_intents(message: str) -> set:
+    return {
+        intent
+        for intent, patterns in INTENT_RULES.items()
+        if any(p.search(message) for p in patterns)
+    }
+
+
+def load_samples(path: Path) -> List[Tuple[str, str]]:
+    """Read labelled (message, intent) pairs from a JSONL file (missing file: none)"""
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    samples = []
+    for line in lines:
+        if line.strip():
+            row = json.loads(line)
+            samples.append((row["message"], row["intent"]))
+    return samples
+
+
+def compute_rule_precision(samples: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+    """
+    Calibrated rule confidence per intent: Laplace-smoothed precision of the
+    intent's rules on labelled samples, (correct + 1) / (matched + 2)
+
+    Args:
+        samples: (message, intent) pairs; must not include evaluation samples
+
+    Returns:
+        Confidence per intent; intents without matches get DEFAULT_RULE_CONFIDENCE
+    """
+    matched: Dict[str, int] = {}
+    correct: Dict[str, int] = {}
+    for message, label in samples:
+        intents = _matching_intents(message)
+        if len(intents) == 1:
+            intent = intents.pop()
+            matched[intent] = matched.get(intent, 0) + 1
+            correct[intent] = correct.get(intent, 0) + (intent == label)
+    return {
+        intent: (correct.get(intent, 0) + 1) / (matched[intent] + 2) if intent in matched else DEFAULT_RULE_CONFIDENCE
+        for intent in INTENTS
+    }
+
+
+_rule_precision: Optional[Dict[str, float]] = None
+
+
+def rule_precision() -> Dict[str, float]:
+    """Rule confidence used at runtime: compute_rule_precision over the seed samples (computed once)"""
+    global _rule_precision
+    if _rule_precision is None:
+        _rule_precision = compute_rule_precision(load_samples(SEED_PATH))
+    return _rule_precision
+
+
+def classify_by_rules(message: str, precision: Optional[Dict[str, float]] = None) -> Optional[Tuple[str, float]]:
+    """
+    Match message against keyword rules
+
+    Args:
+        message: User message
+        precision: Rule confidence per intent (default: rule_precision())
+
+    Returns:
+        (intent, calibrated confidence) if exactly one intent matches, otherwise None
+    """
+    matched = _matching_intents(message)
+    if len(matched) == 1:
+        intent = matched.pop()
+        return intent, round((precision or rule_precision())[intent], 3)
+    return None
+
+
+# ============================================================================
+# Tier 2: Hashed N-gram Logistic Regression
+# ============================================================================
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CJK_RE = re.compile(r"[一-鿿]")
+
+
+def extract_features(text: str) -> List[int]:
+    """
+    Hash word unigrams/bigrams and CJK character bigrams into feature buckets
+    """
+    words = _WORD_RE.findall(text.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        if _CJK_RE.search(word):
+            grams += [f"c:{word[i:i + 2]}" for i in range(len(word) - 1)]
+    return sorted({zlib.crc32(g.encode("utf-8")) % NUM_FEATURES for g in grams})
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    peak = max(scores)
+    exps = [math.exp(s - peak) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+class IntentModel:
+    """Multinomial logistic regression over hashed n-gram features"""
+
+    def __init__(
+        self,
+        labels: Iterable[str] = INTENTS,
+        weights: Optional[Dict[int, List[float]]] = None,
+        bias: Optional[List[float]] = None,
+    ):
+        self.labels = list(labels)
+        self.weights: Dict[int, List[float]] = weights or {}
+        self.bias = bias or [0.0] * len(self.labels)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Return probability per intent"""
+        scores = list(self.bias)
+        for feature in extract_features(text):
+            row = self.weights.get(feature)
+            if row:
+                for k, w in enumerate(row):
+                    scores[k] += w
+        return dict(zip(self.labels, _softmax(scores)))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (intent, probability) of the most likely intent"""
+        proba = self.predict_proba(text)
+        intent = max(proba, key=proba.get)
+        return intent, proba[intent]
+
+    def fit(
+        self,
+        samples: List[Tuple[str, str]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+    ) -> "IntentModel":
+        """
+        Train with plain SGD on (message, intent) pairs
+
+        Args:
+            samples: Training pairs; unknown intents are skipped
+            epochs: Passes over the data
+            learning_rate: Initial step size (decays per epoch)
+            l2: L2 regularization strength
+        """
+        index = {label: k for k, label in enumerate(self.labels)}
+        data = [(extract_features(text), index[intent]) for text, intent in samples if intent in index]
+        n = len(self.labels)
+
+        for epoch in range(epochs):
+            lr = learning_rate / (1 + epoch * 0.1)
+            for features, target in data:
+                scores = list(self.bias)
+                for f in features:
+                    row = self.weights.get(f)
+                    if row:
+                        for k in range(n):
+                            scores[k] += row[k]
+                proba = _softmax(scores)
+                for k in range(n):
+                    grad = proba[k] - (1.0 if k == target else 0.0)
+                    self.bias[k] -= lr * grad
+                    for f in features:
+                        row = self.weights.setdefault(f, [0.0] * n)
+                        row[k] -= lr * (grad + l2 * row[k])
+        return self
+
+    def save(self, path: Path):
+        """Save weights as sparse JSON (near-zero weights are pruned)"""
+        weights = {
+            str(f): [round(w, 4) for w in row]
+            for f, row in self.weights.items()
+            if any(abs(w) >= 1e-3 for w in row)
+        }
+        Path(path).write_text(json.dumps({
+            "labels": self.labels,
+            "num_features": NUM_FEATURES,
+            "bias": [round(b, 4) for b in self.bias],
+            "weights": weights,
+        }, separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: Path) -> "IntentModel":
+        """Load a model saved with save()"""
+        data = json.loads(Path(path).read_text())
+        if data.get("num_features") != NUM_FEATURES:
+            raise ValueError(f"Model was trained with {data.get('num_features')} features, expected {NUM_FEATURES}")
+        return cls(
+            labels=data["labels"],
+            weights={int(f): row for f, row in data["weights"].items()},
+            bias=data["bias"],
+        )
+
+
+_model: Optional[IntentModel] = None
+_model_loaded = False
+
+
+def get_intent_model() -> Optional[IntentModel]:
+    """Load the trained model once (None if no model file exists)"""
+    global _model, _model_loaded
+    if not _model_loaded:
+        from config import settings
+
+        _model_loaded = True
+        path = Path(settings.INTENT_MODEL_PATH) if settings.INTENT_MODEL_PATH else DEFAULT_MODEL_PATH
+        if path.exists():
+            try:
+                _model = IntentModel.load(path)
+                logger.info(f"Loaded intent fast-path model from {path} ({len(_model.weights)} features)")
+            except (ValueError, KeyError, json.JSONDecodeError) as e:
+                logger.warning(f"Failed to load intent model {path}: {e}")
+        else:
+            logger.info(f"No intent fast-path model at {path}, using rules only")
+    return _model
+
+
+# ============================================================================
+# Fast Path Entry
+# ============================================================================
+
+def _awaits_answer(conversation_history: str) -> bool:
+    """Whether the last assistant turn asked the user a question"""
+    for line in reversed((conversation_history or "").strip().splitlines()):
+        if line.startswith("Assistant:"):
+            return "?" in line or "？" in line
+        if line.startswith("User:"):
+            return False
+    return False
+
+
+def classify_fast(
+    message: str,
+    conversation_history: str = "",
+    has_images: bool = False,
+    threshold: float = 0.85,
+    model: Optional[IntentModel] = None,
+    precision: Optional[Dict[str, float]] = None,
+) -> Optional[FastPathResult]:
+    """
+    Classify intent locally
+
+    Declines (returns None) when the turn needs the LLM: images attached, the
+    message answers a question from the previous turn, the intent would
+    modify stored events (update_event / delete_event), or confidence is
+    below the threshold. A rule match's confidence is its calibrated precision,
+    averaged with the model's probability for the same intent when a model
+    is loaded.
+
+    Args:
+        message: User message
+        conversation_history: Formatted conversation history
+        has_images: Whether images are attached
+        threshold: Minimum confidence to accept a local result
+        model: Model to use (default: the trained model from get_intent_model())
+        precision: Rule confidence per intent (default: rule_precision())
+
+    Returns:
+        FastPathResult or None
+    """
+    if has_images or not message.strip() or _awaits_answer(conversation_history):
+        return None
+
+    model = model or get_intent_model()
+
+    rule = classify_by_rules(message, precision)
+    if rule:
+        intent, confidence = rule
+        if intent in DESTRUCTIVE_INTENTS:
+            return None
+        if model is not None:
+            confidence = (confidence + model.predict_proba(message)[intent]) / 2
+        if confidence >= threshold:
+            return FastPathResult(intent=intent, confidence=round(confidence, 3), source="rules")
+
+    if model is not None:
+        intent, confidence = model.predict(message)
+        if intent not in DESTRUCTIVE_INTENTS and confidence >= threshold:
+            return FastPathResult(intent=intent, confidence=round(confidence, 3), source="model")
+
+    return None
+
+
+def log_intent_sample(path: str, message: str, intent: str, confidence: float, latency: float):
+    """Append a (message, LLM intent) pair for training the fast-path model"""
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "message": message,
+                "intent": intent,
+                "confidence": confidence,
+                "llm_latency": round(latency, 3),
+            }, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to log intent sample: {e}")
@@ -3,6 +3,7 @@ Agent Prompts Module
 """
 from .intent import (
     INTENT_CLASSIFIER_PROMPT,
+    INTENT_EXTRACTION_PROMPT,
     CHAT_PROMPT,
     EVENT_MATCH_PROMPT,
     EVENT_EXTRACTION_PROMPT,
@@ -11,6 +12,7 @@ from .intent import (
 
 __all__ = [
     "INTENT_CLASSIFIER_PROMPT",
+    "INTENT_EXTRACTION_PROMPT",
     "CHAT_PROMPT",
     "EVENT_MATCH_PROMPT",
     "EVENT_EXTRACTION_PROMPT",
@@ -7,7 +7,7 @@ from langchain_core.prompts import ChatPromptTemplate
 # Intent Classification Prompt
 # ============================================================================
 
-INTENT_CLASSIFIER_SYSTEM = """You are an intent classifier for a smart calendar assistant. Your task is to analyze user input and determine which category the user's intent belongs to:
+INTENT_RULES = """You are an intent classifier for a smart calendar assistant. Your task is to analyze user input and determine which category the user's intent belongs to:
 
 1. **chat** - Chat/inquiry/uncertain: User greets, chats, or intent is unclear and needs clarification
 2. **create_event** - Create event: User wants to create a new event/activity/meeting/appointment, etc.
@@ -32,19 +32,23 @@ Classification rules:
 - User explicitly mentions "delete", "cancel", "don't want", "not going" → delete_event
 - User mentions "search", "find more info", "add details", "enrich" about an **existing saved event** (not during creation) → enrich_event
 - Other cases (greetings, chat, uncertain, needs clarification) → chat
+"""
 
+INTENT_CLASSIFIER_SYSTEM = INTENT_RULES + """
 Please return only one JSON object in the following format:
 {{"intent": "intent_type", "confidence": 0.0-1.0, "reason": "brief explanation of judgment"}}
-
-Current time: {current_time}
 """
 
-INTENT_CLASSIFIER_USER = """User message: {message}
-{image_note}
+# Per-call values follow the static system prompt, least volatile first
+# (see services/prompt_cache.py)
+INTENT_CLASSIFIER_USER = """Current time: {current_time}
 
 Conversation history:
 {conversation_history}
 
+User message: {message}
+{image_note}
+
 Please analyze user intent and return JSON result."""
 
 INTENT_CLASSIFIER_PROMPT = ChatPromptTemplate.from_messages([
@@ -53,6 +57,36 @@ INTENT_CLASSIFIER_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 
+# ============================================================================
+# Combined Intent Classification + Event Extraction Prompt
+# ============================================================================
+
+# Used with the IntentExtraction tool schema (services/prompts/event_extraction.py):
+# one call returns the intent and, for create/update intents, the event payload
+INTENT_EXTRACTION_SYSTEM = INTENT_RULES + """
+Call the IntentExtraction tool exactly once with intent, confidence and reason.
+
+If intent is create_event, also fill `event` (be DECISIVE, use sensible defaults):
+- "tomorrow" with no time → 09:00; "next week" → next Monday 09:00
+- "dinner" → 19:00; "meeting" → 10:00; "lunch" → 12:00
+- end_time: assume 1 hour duration if not specified
+- Set complete=false only if the time is completely unknown; then provide search_keywords
+  if you have an event title, otherwise a clarification_question
+- When the message only continues an earlier creation dialog (e.g. "yes", "search"), leave `event` null
+
+If intent is update_event, fill `update` only with the new values the user states explicitly
+as absolute values (e.g. "move the dentist to Friday 3pm"). Leave `update` null for relative
+changes ("one hour later", "push it back a day").
+
+For all other intents leave `event` and `update` null.
+"""
+
+INTENT_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", INTENT_EXTRACTION_SYSTEM),
+    ("user", INTENT_CLASSIFIER_USER),
+])
+
+
 # ============================================================================
 # Chat Conversation Prompt
 # ============================================================================
@@ -69,15 +103,15 @@ Important behaviors:
 - If user uploads an image but you're unsure of its purpose, you can ask "What information would you like me to extract from this image? Would you like to create an event?"
 - If user's request seems unrelated to events, respond friendly and remind them you can help manage events
 - Never say things like "I cannot handle this", "out of scope", instead find ways to help users
-
-Current time: {current_time}
 """
 
-CHAT_USER = """User message: {message}
+CHAT_USER = """Current time: {current_time}
 
 Conversation history:
 {conversation_history}
 
+User message: {message}
+
 Please reply to the user in a friendly and positive way. If user needs are uncertain, ask friendly questions."""
 
 CHAT_PROMPT = ChatPromptTemplate.from_messages([
@@ -98,23 +132,25 @@ Examples:
 - If the assistant previously mentioned "2/7 outing conflicts with tech sharing session", and user replies "resolve the conflict" or "adjust it", the target is one of these two events
 - If the assistant previously mentioned a duplicate event, and user replies "delete the duplicate", the target is the event mentioned before
 
-Existing event list (JSON format):
+The user message lists the existing events, the conversation history and the user's current message.
+Please analyze user's intent by combining conversation history, find the best matching event. Return JSON format:
+{{"matched_event_id": event_id_or_null, "confidence": 0.0-1.0, "reason": "matching reason (explain how you inferred the target event from context)"}}
+
+If no matching event is found, matched_event_id should be null.
+"""
+
+EVENT_MATCH_USER = """Existing events (one per line: #id | start–end | title | @location):
 {events_list}
 
 Conversation history (please read carefully to understand context):
 {conversation_history}
 
 User's current message:
-{user_description}
-
-Please analyze user's intent by combining conversation history, find the best matching event. Return JSON format:
-{{"matched_event_id": event_id_or_null, "confidence": 0.0-1.0, "reason": "matching reason (explain how you inferred the target event from context)"}}
-
-If no matching event is found, matched_event_id should be null.
-"""
+{user_description}"""
 
 EVENT_MATCH_PROMPT = ChatPromptTemplate.from_messages([
     ("system", EVENT_MATCH_SYSTEM),
+    ("user", EVENT_MATCH_USER),
 ])
 
 
@@ -124,8 +160,6 @@ EVENT_MATCH_PROMPT = ChatPromptTemplate.from_messages([
 
 EVENT_EXTRACTION_SYSTEM = """You are a smart calendar assistant. User wants to create a new event, please extract event information from user input.
 
-Current time: {current_time}
-
 Please analyze user input (including text and possible image content), extract the following information:
 - title: Event title (REQUIRED - what is the event about)
 - start_time: Start time in ISO 8601 format (REQUIRED - when does it happen)
@@ -179,7 +213,7 @@ BE BOLD: It's better to create an event with reasonable defaults than to keep as
 
 EVENT_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
     ("system", EVENT_EXTRACTION_SYSTEM),
-    ("user", "User input: {message}\n{image_note}"),
+    ("user", "Current time: {current_time}\n\nUser input: {message}\n{image_note}"),
 ])
 
 
@@ -189,20 +223,22 @@ EVENT_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
 
 EVENT_UPDATE_SYSTEM = """You are a smart calendar assistant. User wants to update an existing event, please extract the fields to be modified from user input.
 
-Original event information:
-{original_event}
-
-User's update request:
-{user_message}
-
+The user message contains the original event information and the user's update request.
 Please analyze which fields the user wants to modify, only return fields that need to be modified. Return JSON format:
 {{"title": "...", "start_time": "...", "end_time": "...", "location": "...", "description": "..."}}
 
 Only include fields that user explicitly wants to modify, don't include other fields.
 """
 
+EVENT_UPDATE_USER = """Original event information:
+{original_event}
+
+User's update request:
+{user_message}"""
+
 EVENT_UPDATE_PROMPT = ChatPromptTemplate.from_messages([
     ("system", EVENT_UPDATE_SYSTEM),
+    ("user", EVENT_UPDATE_USER),
 ])
 
 
@@ -212,13 +248,6 @@ EVENT_UPDATE_PROMPT = ChatPromptTemplate.from_messages([
 
 EVENT_QUERY_SYSTEM = """You are a smart calendar assistant. User wants to view their schedule.
 
-Current time: {current_time}
-
-User request: {message}
-
-User's event list (JSON format):
-{events_list}
-
 Please organize and display relevant event information based on user's query needs.
 
 Output requirements:
@@ -229,6 +258,14 @@ Output requirements:
 - Answer should be concise and friendly
 """
 
+EVENT_QUERY_USER = """Current time: {current_time}
+
+User's events (one per line: #id | start–end | title | @location | description):
+{events_list}
+
+User request: {message}"""
+
 EVENT_QUERY_PROMPT = ChatPromptTemplate.from_messages([
     ("system", EVENT_QUERY_SYSTEM),
+    ("user", EVENT_QUERY_USER),
 ])
@@ -0,0 +1,360 @@
+"""
+Event Query Planner
+
+Turns a schedule question into a structured filter (date range, followed-only,
+keyword, location) and runs it as an indexed SQL query, so only matching
+events reach EVENT_QUERY_PROMPT. Common shapes ("today", "tomorrow",
+"this weekend", "next week", ...) are answered from a template without any
+LLM call.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import Event
+from .retrieval import MONTHS, WEEKDAYS, extract_date_hints
+
+# Events rendered in a templated answer before "...and N more"
+TEMPLATE_MAX_EVENTS = 20
+
+# Events sent to the LLM when the question needs summarization
+LLM_MAX_EVENTS = 50
+
+# Description characters kept per event in the LLM prompt
+DESCRIPTION_CHARS = 200
+
+# Words that carry no filter information in a schedule question
+QUERY_STOPWORDS = {
+    # English
+    "what", "whats", "s", "do", "does", "did", "i", "have", "has", "got", "is", "are", "am",
+    "there", "any", "anything", "my", "me", "the", "a", "an", "on", "in", "at", "for", "to",
+    "of", "show", "list", "view", "see", "tell", "give", "please", "can", "you", "could",
+    "events", "event", "schedule", "scheduled", "calendar", "agenda", "plans", "planned",
+    "appointments", "plan", "free", "busy", "all", "upcoming", "next", "this", "coming",
+    "today", "tonight", "tomorrow", "week", "weekend", "month", "day", "after", "and",
+    "when", "which", "how", "many", "much", "followed", "following", "starred", "favorite",
+    "favourite", "happening", "going", "on", "up", "with", "about", "would", "like", "know",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "last", "yesterday", "had", "were", "during", "happened", "happen",
+    # German
+    "was", "habe", "ich", "hab", "steht", "an", "zeig", "zeige", "mir", "meine", "meinen",
+    "mein", "termine", "termin", "kalender", "heute", "morgen", "übermorgen", "woche",
+    "wochenende", "diese", "dieses", "diesen", "nächste", "nächsten", "nächstes", "am", "im",
+    "alle", "gibt", "es", "bin", "frei", "welche", "wann", "ist", "und", "der", "die", "das",
+    "monat", "montag", "dienstag", "mittwoch", "donnerstag", "freitag", "samstag", "sonntag",
+    "gestern", "letzte", "letzten", "vorige", "vorigen", "hatte", "war",
+} | set(MONTHS)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_ORDINAL_RE = re.compile(r"\d+(?:st|nd|rd|th)")
+_CJK_RE = re.compile(r"[一-鿿]")
+_LOCATION_RE = re.compile(r"\b(?:at|in|im|in der|at the)\s+([A-ZÄÖÜ][\w-]+(?:\s+[A-ZÄÖÜ][\w-]+)*)")
+
+# Chinese question words and time expressions that carry no filter information
+_CN_FILLER_RE = re.compile(
+    r"(?:周|星期|礼拜)[一二三四五六日天]|\d+月\d+[日号]|所有|全部|关注的?|收藏的?|下一个|"
+    r"我|的|是|这|没有|有|什么|哪些|几个|安排|日程|活动|吗|呢|查看|显示|看看|[？?！!。，,\s]"
+)
+
+_FOLLOWED_RE = re.compile(r"\b(followed|following|starred|favou?rites?|favoriten|gefolgt)\b|关注|收藏", re.I)
+_ALL_RE = re.compile(r"\b(all|alle)\b.*\b(events|termine|appointments)\b|所有|全部", re.I)
+_PAST_RE = re.compile(
+    r"\b(did|were|had|last|ago|hatte|hatten|war|waren|letzte[nmrs]?|vorige[nmrs]?|gestern)\b|上周|上个月|昨天|了",
+    re.I,
+)
+_NEXT_EVENT_RE = re.compile(r"\bwhat'?s next\b|\bnext (event|appointment|meeting)\b|\bnächste[rn]? termin\b|下一个", re.I)
+
+
+
+def _month_pattern(month: int) -> re.Pattern:
+    """ "in May", "im Mai", "5月" (without a day) """
+    names = sorted((name for name, number in MONTHS.items() if number == month), key=len, reverse=True)
+    return re.compile(
+        rf"\b(?:in|im|during|for)\s+(?:{'|'.join(names)})\b|(?<!\d){month}月(?![\d日号])",
+        re.I,
+    )
+
+
+# (pattern, range name) checked in order; the first match wins
+RANGE_PATTERNS = [
+    (re.compile(r"\byesterday\b|\bgestern\b|昨天", re.I), "yesterday"),
+    (re.compile(r"\blast weekend\b|(?:letzte|vorige)[ns]? wochenende|上周末", re.I), "last_weekend"),
+    (re.compile(r"\blast week\b|(?:letzte|vorige)[n]? woche|上周|上星期", re.I), "last_week"),
+    (re.compile(r"\blast month\b|(?:letzte|vorige)[nm]? monat|上个月", re.I), "last_month"),
+    (re.compile(r"day after tomorrow|übermorgen|后天", re.I), "day_after_tomorrow"),
+    (re.compile(r"\btonight\b|heute abend|今晚", re.I), "tonight"),
+    (re.compile(r"\btoday\b|\bheute\b|今天|今日", re.I), "today"),
+    (re.compile(r"\btomorrow\b|\bmorgen\b|明天", re.I), "tomorrow"),
+    (re.compile(r"\bweekend\b|wochenende|周末", re.I), "weekend"),
+    (re.compile(r"\bnext week\b|nächste[n]? woche|下周|下星期", re.I), "next_week"),
+    (re.compile(r"\bthis week\b|diese woche|这周|本周|这星期", re.I), "this_week"),
+    (re.compile(r"\bnext month\b|nächste[n]? monat|下个月", re.I), "next_month"),
+    (re.compile(r"\bthis month\b|diese[nm]? monat|这个月|本月", re.I), "this_month"),
+] + [(_month_pattern(month), f"month_{month}") for month in range(1, 13)]
+
+
+class QueryPlan(NamedTuple):
+    """Structured filter for an event query"""
+    start: Optional[datetime]
+    end: Optional[datetime]
+    label: str  # Human-readable range, e.g. "tomorrow"
+    followed_only: bool = False
+    keywords: Tuple[str, ...] = ()
+    location: Optional[str] = None
+    limit: Optional[int] = None
+    templated: bool = False  # Answer without the LLM
+    past: bool = False  # The range ended before the question was asked
+
+
+# ============================================================================
+# Planning
+# ============================================================================
+
+def _day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(value: datetime, months_ahead: int = 0) -> datetime:
+    month = value.month - 1 + months_ahead
+    return _day_start(value).replace(year=value.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def resolve_range(name: str, now: datetime, past: bool = False) -> Tuple[datetime, datetime, str]:
+    """
+    Resolve a named range to [start, end) and a label
+
+    Month names resolve to the next such month, or to the last one for
+    past-tense questions ("what did I have in January").
+    """
+    today = _day_start(now)
+    if name == "yesterday":
+        return today - timedelta(days=1), today, "yesterday"
+    if name == "last_weekend":
+        # On a weekend day, the weekend before this one
+        days_back = (today.weekday() - 5) % 7 + (7 if today.weekday() >= 5 else 0)
+        saturday = today - timedelta(days=days_back)
+        return saturday, saturday + timedelta(days=2), "last weekend"
+    if name == "last_week":
+        monday = today - timedelta(days=today.weekday() + 7)
+        return monday, monday + timedelta(days=7), "last week"
+    if name == "last_month":
+        return _month_start(now, -1), _month_start(now), "last month"
+    if name.startswith("month_"):
+        month = int(name[len("month_"):])
+        year = now.year
+        if past and month > now.month:
+            year -= 1
+        elif not past and month < now.month:
+            year += 1
+        start = datetime(year, month, 1)
+        return start, _month_start(start, 1), f"in {start.strftime('%B')}"
+    if name == "today":
+        return today, today + timedelta(days=1), "today"
+    if name == "tonight":
+        return max(now, today.replace(hour=17)), today + timedelta(days=1), "tonight"
+    if name == "tomorrow":
+        return today + timedelta(days=1), today + timedelta(days=2), "tomorrow"
+    if name == "day_after_tomorrow":
+        return today + timedelta(days=2), today + timedelta(days=3), "the day after tomorrow"
+    if name == "weekend":
+        if today.weekday() == 6:
+            return today, today + timedelta(days=1), "this weekend"
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        return max(saturday, today), saturday + timedelta(days=2), "this weekend"
+    if name == "this_week":
+        return today, today + timedelta(days=7 - today.weekday()), "this week"
+    if name == "next_week":
+        monday = today + timedelta(days=7 - today.weekday())
+        return monday, monday + timedelta(days=7), "next week"
+    if name == "this_month":
+        return today, _month_start(now, 1), "this month"
+    if name == "next_month":
+        return _month_start(now, 1), _month_start(now, 2), "next month"
+    raise ValueError(f"Unknown range: {name}")
+
+
+def _keywords(message: str, location: Optional[str]) -> Tuple[str, ...]:
+    """Content words left after removing question and time words"""
+    text = message
+    if location:
+        text = text.replace(location, " ")
+    for pattern, _ in RANGE_PATTERNS:
+        text = pattern.sub(" ", text)
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if _CJK_RE.search(word) or word.isdigit() or _ORDINAL_RE.fullmatch(word) or len(word) < 3:
+            # Chinese questions are not segmented; they go to the LLM as-is
+            continue
+        if word not in QUERY_STOPWORDS:
+            # Plural to singular so "meetings" matches "Team meeting"
+            words.append(word[:-1] if len(word) > 4 and word.endswith("s") else word)
+    return tuple(dict.fromkeys(words))
+
+
+def plan_query(message: str, now: Optional[datetime] = None) -> QueryPlan:
+    """
+    Build a structured filter from a schedule question
+
+    Args:
+        message: User's question
+        now: Reference time (default: now)
+
+    Returns:
+        QueryPlan; templated=True when the question is fully covered by the
+        filter and can be answered without the LLM
+    """
+    now = now or datetime.now()
+    followed_only = bool(_FOLLOWED_RE.search(message))
+    location_match = _LOCATION_RE.search(message)
+    location = location_match.group(1) if location_match else None
+    if location and location.lower() in {**MONTHS, **WEEKDAYS}:
+        location = None
+    keywords = _keywords(message, location)
+    has_cjk_content = bool(_CJK_RE.search(message))
+
+    start = end = None
+    label = ""
+    limit = None
+    recognized = False
+
+    for pattern, name in RANGE_PATTERNS:
+        if pattern.search(message):
+            start, end, label = resolve_range(name, now, past=bool(_PAST_RE.search(message)))
+            recognized = True
+            break
+
+    if not recognized:
+        dates = extract_date_hints(message, now)
+        if dates:
+            day = datetime.combine(min(dates), datetime.min.time())
+            start, end = day, day + timedelta(days=1)
+            label = f"on {day.strftime('%a, %b %d')}"
+            recognized = True
+        elif _NEXT_EVENT_RE.search(message):
+            start, label, limit = now, "next", 1
+            recognized = True
+        elif _ALL_RE.search(message) or followed_only:
+            start, label = now, "upcoming"
+            recognized = True
+
+    # Chinese questions are only templated when the patterns cover the whole
+    # question; anything else (unsegmented content words) goes to the LLM
+    templated = recognized and not keywords and not location
+    if has_cjk_content and templated:
+        residue = message
+        for pattern, _ in RANGE_PATTERNS:
+            residue = pattern.sub("", residue)
+        residue = _CN_FILLER_RE.sub("", residue)
+        templated = not residue
+
+    if not recognized:
+        # Open-ended questions ("show my calendar") list upcoming events from
+        # the template; keyword lookups ("when was my dentist appointment")
+        # search the whole calendar
+        label = "upcoming"
+        templated = not keywords and not location and not has_cjk_content
+        if templated:
+            start = _day_start(now)
+
+    return QueryPlan(
+        start=start,
+        end=end,
+        label=label,
+        followed_only=followed_only,
+        keywords=keywords,
+        location=location,
+        limit=limit,
+        templated=templated,
+        past=end is not None and end <= now,
+    )
+
+
+# ============================================================================
+# Execution
+# ============================================================================
+
+def build_query(db: Session, user_id: int, plan: QueryPlan, use_text_filters: bool = True):
+    """Translate a plan into a SQL query over the (user_id, start_time) index"""
+    query = db.query(Event).filter(Event.user_id == user_id)
+    if plan.start is not None:
+        query = query.filter(Event.start_time >= plan.start)
+    if plan.end is not None:
+        query = query.filter(Event.start_time < plan.end)
+    if plan.followed_only:
+        query = query.filter(Event.is_followed == True)  # noqa: E712
+    if use_text_filters:
+        if plan.location:
+            query = query.filter(Event.location.ilike(f"%{plan.location}%"))
+        if plan.keywords:
+            query = query.filter(or_(*(
+                column.ilike(f"%{keyword}%")
+                for keyword in plan.keywords
+                for column in (Event.title, Event.location, Event.description)
+            )))
+    return query.order_by(Event.start_time)
+
+
+def execute_plan(db: Session, user_id: int, plan: QueryPlan, max_events: int) -> Tuple[List[Event], int]:
+    """
+    Run the plan
+
+    When the keyword or location filter matches nothing in the date range,
+    the text filters are tried without the dates, then the date/followed
+    filters alone, so the LLM can still explain what is (or isn't) on the
+    calendar.
+
+    Returns:
+        (events, total_count) with at most max_events events
+    """
+    limit = min(plan.limit or max_events, max_events)
+    query = build_query(db, user_id, plan)
+    total = query.count()
+    if total == 0 and (plan.keywords or plan.location):
+        fallbacks = [plan._replace(start=None, end=None)] if plan.start or plan.end else []
+        for fallback, use_text_filters in [*((f, True) for f in fallbacks), (plan, False)]:
+            query = build_query(db, user_id, fallback, use_text_filters=use_text_filters)
+            total = query.count()
+            if total:
+                break
+    return query.limit(limit).all(), total
+
+
+# ============================================================================
+# Templated Answers
+# ============================================================================
+
+def _format_event(event: Event, show_date: bool) -> str:
+    when = event.start_time.strftime("%a, %b %d %H:%M" if show_date else "%H:%M")
+    if event.end_time:
+        when += f"–{event.end_time.strftime('%H:%M')}"
+    line = f"**{event.title}** — {when}"
+    if event.location:
+        line += f" 📍 {event.location}"
+    return line
+
+
+def render_answer(plan: QueryPlan, events: List[Event], total: int) -> str:
+    """Render a templated answer for the plan's results"""
+    what = "followed events" if plan.followed_only else "events"
+    verb = "had" if plan.past else "have"
+
+    if not events:
+        if plan.label in ("upcoming", "next"):
+            return f"You have no upcoming {what}."
+        return f"You {verb} no {what} {plan.label}."
+
+    if plan.label == "next":
+        return f"Your next event: {_format_event(events[0], show_date=True)}"
+
+    single_day = plan.start is not None and plan.end is not None and plan.end - plan.start <= timedelta(days=1)
+    count = f"{total} {what[:-1] if total == 1 else what}"
+    heading = f"You {verb} {count} {plan.label}:" if plan.label != "upcoming" else f"You have {count} coming up:"
+
+    lines = [heading, ""]
+    lines += [f"{i}. {_format_event(e, show_date=not single_day)}" for i, e in enumerate(events, 1)]
+    if total > len(events):
+        lines.append(f"...and {total - len(events)} more.")
+    return "\n".join(lines)
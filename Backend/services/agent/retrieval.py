@@ -0,0 +1,274 @@
+"""
+Candidate Event Retrieval
+
+Scores a user's events against the message (and recent conversation history)
+before EVENT_MATCH_PROMPT, so the LLM only sees the top-k candidates instead
+of the whole calendar. Signals:
+
+- Title / location token overlap (English, German, Chinese)
+- Date expressions in the message (today, tomorrow, weekdays, explicit dates)
+- Recency (upcoming events rank above distant or past ones)
+
+When one candidate scores far above the rest, the LLM match call can be
+skipped for updates (see pick_dominant); deletes always go through the LLM.
+"""
+import math
+import re
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+from models import Event
+
+# Score weights
+TITLE_WEIGHT = 3.0
+LOCATION_WEIGHT = 1.5
+HISTORY_WEIGHT = 1.0
+DATE_WEIGHT = 2.0
+RECENCY_WEIGHT = 0.5
+
+# Recency decay (days)
+RECENCY_DAYS = 30
+
+# Dominance: the top candidate must reach MIN_DOMINANT_SCORE, share at least
+# MIN_DOMINANT_TITLE_TOKENS title words with the message and lead the runner-up
+# by DOMINANCE_MARGIN
+MIN_DOMINANT_SCORE = 3.0
+MIN_DOMINANT_TITLE_TOKENS = 2
+DOMINANCE_MARGIN = 2.0
+
+# Conversation history lines considered
+HISTORY_LINES = 6
+
+STOPWORDS = {
+    # English
+    "a", "an", "the", "my", "me", "i", "to", "for", "of", "on", "at", "in", "and", "or",
+    "it", "that", "this", "is", "with", "please", "can", "you", "event", "events",
+    "delete", "remove", "cancel", "change", "move", "update", "reschedule", "find",
+    "search", "more", "info", "information", "details", "about",
+    # German
+    "der", "die", "das", "den", "dem", "ein", "eine", "mein", "meine", "meinen", "am",
+    "um", "im", "mit", "und", "bitte", "termin", "lösche", "verschiebe", "ändere",
+}
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+    "montag": 0, "dienstag": 1, "mittwoch": 2, "donnerstag": 3, "freitag": 4, "samstag": 5, "sonntag": 6,
+}
+CN_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+
+MONTHS = {
+    "jan": 1, "january": 1, "januar": 1, "feb": 2, "february": 2, "februar": 2,
+    "mar": 3, "march": 3, "mär": 3, "märz": 3, "apr": 4, "april": 4, "may": 5, "mai": 5,
+    "jun": 6, "june": 6, "juni": 6, "jul": 7, "july": 7, "juli": 7, "aug": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10, "okt": 10, "oktober": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12, "dez": 12, "dezember": 12,
+}
+
+RELATIVE_DAYS = [
+    (re.compile(r"day after tomorrow|übermorgen|后天", re.I), 2),
+    (re.compile(r"\b(today|tonight|heute)\b|今天|今晚", re.I), 0),
+    (re.compile(r"\b(tomorrow|morgen)\b|明天", re.I), 1),
+    (re.compile(r"\b(yesterday|gestern)\b|昨天", re.I), -1),
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CJK_RE = re.compile(r"[一-鿿]+")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_DOT_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{2,4})?")
+_MONTH_DAY_RE = re.compile(r"\b([a-zä]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b", re.I)
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th|\.)?\s+([a-zä]{3,9})\b", re.I)
+_CN_DATE_RE = re.compile(r"(\d{1,2})月(\d{1,2})[日号]")
+_CN_WEEKDAY_RE = re.compile(r"(?:周|星期|礼拜)([一二三四五六日天])")
+
+
+class ScoredEvent(NamedTuple):
+    """Event with its retrieval score"""
+    event: Event
+    score: float
+    relevance: float  # Score without the recency prior
+    title_matches: int = 0  # Title tokens found in the message
+
+
+# ============================================================================
+# Text Features
+# ============================================================================
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """
+    Lowercase word tokens without stopwords, plus CJK character bigrams
+    """
+    if not text:
+        return set()
+    tokens = set()
+    for word in _WORD_RE.findall(text.lower()):
+        if _CJK_RE.search(word):
+            for run in _CJK_RE.findall(word):
+                tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+                if len(run) == 1:
+                    tokens.add(run)
+        elif len(word) > 1 and word not in STOPWORDS and not word.isdigit():
+            tokens.add(word[:-1] if len(word) > 3 and word.endswith("s") else word)
+    return tokens
+
+
+def _token_matches(token: str, query_tokens: Set[str]) -> bool:
+    """Exact match, or prefix match for compound words (Zahnarzt / Zahnarzttermin)"""
+    if token in query_tokens:
+        return True
+    if len(token) < 4:
+        return False
+    return any(
+        len(q) >= 4 and (q.startswith(token) or token.startswith(q))
+        for q in query_tokens
+    )
+
+
+def overlap(field_tokens: Set[str], query_tokens: Set[str]) -> float:
+    """Fraction of field tokens found in the query"""
+    if not field_tokens or not query_tokens:
+        return 0.0
+    return sum(_token_matches(t, query_tokens) for t in field_tokens) / len(field_tokens)
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _upcoming(today: date, month: int, day: int, year: Optional[int] = None) -> Optional[date]:
+    """Resolve a day/month to the next occurrence on or after today (unless the year is given)"""
+    if year is not None:
+        return _safe_date(year + 2000 if year < 100 else year, month, day)
+    found = _safe_date(today.year, month, day)
+    if found and found < today:
+        found = _safe_date(today.year + 1, month, day)
+    return found
+
+
+def extract_date_hints(text: str, now: Optional[datetime] = None) -> Set[date]:
+    """
+    Dates referred to in the text
+
+    Weekday names resolve to both the coming occurrence and the one a week
+    later, since "next Friday" is ambiguous.
+    """
+    today = (now or datetime.now()).date()
+    hints: Set[date] = set()
+
+    for pattern, offset in RELATIVE_DAYS:
+        if pattern.search(text):
+            hints.add(today + timedelta(days=offset))
+            break
+
+    weekdays = [WEEKDAYS[w] for w in _WORD_RE.findall(text.lower()) if w in WEEKDAYS]
+    weekdays += [CN_WEEKDAYS[m] for m in _CN_WEEKDAY_RE.findall(text)]
+    for weekday in weekdays:
+        ahead = (weekday - today.weekday()) % 7
+        hints.add(today + timedelta(days=ahead))
+        hints.add(today + timedelta(days=ahead + 7))
+
+    for y, m, d in _ISO_DATE_RE.findall(text):
+        hints.add(_safe_date(int(y), int(m), int(d)))
+    for d, m, y in _DOT_DATE_RE.findall(text):
+        hints.add(_upcoming(today, int(m), int(d), int(y) if y else None))
+    for m, d in _CN_DATE_RE.findall(text):
+        hints.add(_upcoming(today, int(m), int(d)))
+    for name, d in _MONTH_DAY_RE.findall(text):
+        if name.lower() in MONTHS:
+            hints.add(_upcoming(today, MONTHS[name.lower()], int(d)))
+    for d, name in _DAY_MONTH_RE.findall(text):
+        if name.lower() in MONTHS:
+            hints.add(_upcoming(today, MONTHS[name.lower()], int(d)))
+
+    hints.discard(None)
+    return hints
+
+
+# ============================================================================
+# Scoring
+# ============================================================================
+
+def _recent_history(conversation_history: str) -> str:
+    lines = (conversation_history or "").strip().splitlines()
+    return "\n".join(lines[-HISTORY_LINES:])
+
+
+def score_event(
+    event: Event,
+    query_tokens: Set[str],
+    history_tokens: Set[str],
+    date_hints: Set[date],
+    now: datetime,
+) -> ScoredEvent:
+    """Score one event against the query signals"""
+    title_tokens = tokenize(event.title)
+    title_matches = sum(_token_matches(t, query_tokens) for t in title_tokens)
+    relevance = TITLE_WEIGHT * overlap(title_tokens, query_tokens)
+    relevance += LOCATION_WEIGHT * overlap(tokenize(event.location), query_tokens)
+    relevance += HISTORY_WEIGHT * overlap(title_tokens, history_tokens)
+    if date_hints and event.start_time and event.start_time.date() in date_hints:
+        relevance += DATE_WEIGHT
+
+    recency = 0.0
+    if event.start_time:
+        days = (event.start_time - now).total_seconds() / 86400
+        # Past events decay twice as fast as upcoming ones
+        recency = math.exp(-(days if days >= 0 else -2 * days) / RECENCY_DAYS)
+
+    return ScoredEvent(
+        event=event,
+        score=relevance + RECENCY_WEIGHT * recency,
+        relevance=relevance,
+        title_matches=title_matches,
+    )
+
+
+def retrieve_candidates(
+    events: Iterable[Event],
+    message: str,
+    conversation_history: str = "",
+    top_k: int = 10,
+    now: Optional[datetime] = None,
+) -> List[ScoredEvent]:
+    """
+    Rank events by how well they match the user's description
+
+    Args:
+        events: User's events
+        message: User's current message
+        conversation_history: Formatted conversation history
+        top_k: Number of candidates to return
+        now: Reference time (default: now)
+
+    Returns:
+        Top-k candidates, best first
+    """
+    now = now or datetime.now()
+    query_tokens = tokenize(message)
+    history_tokens = tokenize(_recent_history(conversation_history))
+    date_hints = extract_date_hints(message, now)
+
+    scored = [score_event(e, query_tokens, history_tokens, date_hints, now) for e in events]
+    scored.sort(key=lambda s: s.score, reverse=True)
+    return scored[:top_k]
+
+
+def pick_dominant(candidates: List[ScoredEvent]) -> Optional[Event]:
+    """
+    Return the top candidate if it clearly beats the rest, otherwise None
+
+    A single shared title word ("cancel the concert") is never enough.
+    """
+    if not candidates:
+        return None
+    top = candidates[0]
+    runner_up = candidates[1].score if len(candidates) > 1 else 0.0
+    if (
+        top.relevance >= MIN_DOMINANT_SCORE
+        and top.title_matches >= MIN_DOMINANT_TITLE_TOKENS
+        and top.score - runner_up >= DOMINANCE_MARGIN
+    ):
+        return top.event
+    return None
@@ -0,0 +1,134 @@
+"""
+Speculative Image Extraction
+
+Messages with images are classified by a vision LLM call and then almost
+always routed to create_event, which runs parse_image_with_llm on the same
+images. SpeculativeImageParse starts that extraction while the intent is
+still being classified:
+
+- intent is create_event: the handler takes the (possibly finished) results
+- any other intent: the extraction is cancelled
+
+Outcomes are recorded in services.metrics:
+- speculative_parse_total{outcome="hit"|"miss"|"unused"}
+- speculative_parse_saved_seconds: extraction time overlapped with classification (hits)
+- speculative_parse_wasted_seconds: extraction time spent before cancelling (misses)
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from config import settings
+from logging_config import get_logger
+from services import llm_service
+from services.llm_service import ParseResult
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class SpeculativeImageParse:
+    """Image extraction started alongside intent classification"""
+
+    def __init__(self, images_base64: List[str], additional_note: str):
+        self.images_base64 = list(images_base64)
+        self.additional_note = additional_note
+        self.started = time.perf_counter()
+        self.outcome: Optional[str] = None
+        self.taken = False
+        self._finished: Dict[int, float] = {}
+        semaphore = asyncio.Semaphore(max(1, settings.IMAGE_CONCURRENCY))
+        self.tasks = [
+            asyncio.create_task(self._parse(semaphore, idx, image_base64))
+            for idx, image_base64 in enumerate(self.images_base64)
+        ]
+        logger.debug(f"Started speculative extraction for {len(self.tasks)} image(s)")
+
+    async def _parse(self, semaphore: asyncio.Semaphore, idx: int, image_base64: str) -> ParseResult:
+        async with semaphore:
+            result = await llm_service.parse_image_with_llm(image_base64, self.additional_note)
+        self._finished[idx] = time.perf_counter()
+        return result
+
+    def resolve(self, intent: str):
+        """Record the classified intent; cancel the extraction unless it is create_event"""
+        if self.outcome is not None:
+            return
+        now = time.perf_counter()
+        if intent == "create_event":
+            self.outcome = "hit"
+            # Extraction work already done when the handler can start
+            done = max(self._finished.values()) if len(self._finished) == len(self.tasks) else now
+            saved = min(done, now) - self.started
+            metrics.inc("speculative_parse_total", outcome="hit")
+            metrics.observe("speculative_parse_saved_seconds", saved)
+            logger.info(f"Speculative extraction hit: {saved:.2f}s overlapped with intent classification")
+        else:
+            self.outcome = "miss"
+            self.cancel()
+            metrics.inc("speculative_parse_total", outcome="miss")
+            metrics.observe("speculative_parse_wasted_seconds", now - self.started)
+            logger.info(f"Speculative extraction cancelled (intent={intent})")
+
+    async def take(self, idx: int, image_base64: str, additional_note: str) -> Optional[ParseResult]:
+        """
+        Result for one image, or None if the speculation does not cover this call
+
+        Args:
+            idx: Image position in the message
+            image_base64: Image the caller wants parsed
+            additional_note: Note the caller would pass to parse_image_with_llm
+        """
+        if (
+            self.outcome == "miss"
+            or idx >= len(self.tasks)
+            or self.images_base64[idx] != image_base64
+            or self.additional_note != additional_note
+        ):
+            return None
+        try:
+            result = await self.tasks[idx]
+        except asyncio.CancelledError:
+            return None
+        self.taken = True
+        return result
+
+    def cancel(self):
+        """Cancel unfinished extraction tasks"""
+        for task in self.tasks:
+            if not task.done():
+                task.cancel()
+
+    def close(self):
+        """End of the agent run: cancel leftovers and count hits whose results were never used"""
+        self.cancel()
+        if self.outcome == "hit" and not self.taken:
+            metrics.inc("speculative_parse_total", outcome="unused")
+
+
+def start_speculative_parse(
+    images_base64: Optional[List[str]],
+    additional_note: str,
+) -> Optional[SpeculativeImageParse]:
+    """Start speculative extraction if enabled and images are attached"""
+    if not images_base64 or not settings.ENABLE_SPECULATIVE_IMAGE_PARSE:
+        return None
+    return SpeculativeImageParse(images_base64, additional_note)
+
+
+def speculation_stats() -> dict:
+    """Hit rate and latency saved so far"""
+    hits = metrics.counter("speculative_parse_total", outcome="hit")
+    misses = metrics.counter("speculative_parse_total", outcome="miss")
+    saved_count, saved_sum = metrics.summary("speculative_parse_saved_seconds")
+    _, wasted_sum = metrics.summary("speculative_parse_wasted_seconds")
+    total = hits + misses
+    return {
+        "hits": int(hits),
+        "misses": int(misses),
+        "unused": int(metrics.counter("speculative_parse_total", outcome="unused")),
+        "hit_rate": hits / total if total else 0.0,
+        "saved_seconds_total": saved_sum,
+        "saved_seconds_avg": saved_sum / saved_count if saved_count else 0.0,
+        "wasted_seconds_total": wasted_sum,
+    }
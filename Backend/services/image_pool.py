@@ -0,0 +1,125 @@
+"""
+Image Pool - Run CPU-bound image work (Pillow decode/resize/encode) off the event loop
+
+Responsibilities:
+- Dispatch image functions to a bounded process pool, so resampling and JPEG
+  encoding neither hold the event loop nor compete for the GIL
+- Fall back to a thread pool when processes cannot be started (sandboxed
+  hosts) or the process pool breaks
+- Apply a per-task timeout and count task outcomes in services.metrics
+
+Functions passed to run() must be picklable (module-level) in process mode.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from config import settings
+from logging_config import get_logger
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class ImagePool:
+    """Lazily created executor for image work, process-based with a thread fallback"""
+
+    def __init__(self, mode: str = "process", max_workers: int = 0, timeout: float = 30.0):
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _create(self) -> Executor:
+        if self.mode == "process":
+            try:
+                # spawn: forking a process that runs uvicorn threads is unsafe
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"Image pool started: {self.max_workers} processes")
+                return executor
+            except (OSError, NotImplementedError, ValueError) as e:
+                self._fall_back(f"cannot start processes: {e}")
+        logger.info(f"Image pool started: {self.max_workers} threads")
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+
+    def _fall_back(self, reason: str):
+        logger.warning(f"Image pool falling back to threads ({reason})")
+        metrics.inc("image_pool_fallback_total")
+        self.mode = "thread"
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create()
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) in the pool
+
+        Args:
+            fn: Picklable function (module-level in process mode)
+            *args: Arguments (pickled when sent to a worker process)
+            timeout: Seconds before asyncio.TimeoutError (default: pool timeout)
+
+        Returns:
+            fn's return value
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        mode = self.mode
+        try:
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, fn, *args),
+                    timeout=timeout or self.timeout,
+                )
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a huge image): retry once on threads
+                self.shutdown(wait=False)
+                self._fall_back("process pool broken")
+                mode = self.mode
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, fn, *args),
+                    timeout=timeout or self.timeout,
+                )
+        except asyncio.TimeoutError:
+            # The worker keeps running; the caller stops waiting for it
+            metrics.inc("image_pool_tasks_total", mode=mode, result="timeout")
+            logger.warning(f"Image task {getattr(fn, '__name__', fn)} timed out after {timeout or self.timeout}s")
+            raise
+        except Exception:
+            metrics.inc("image_pool_tasks_total", mode=mode, result="error")
+            raise
+        metrics.inc("image_pool_tasks_total", mode=mode, result="ok")
+        metrics.observe("image_pool_task_seconds", time.perf_counter() - start, mode=mode)
+        return result
+
+    def start(self):
+        """Start the workers now instead of on the first image (spawn takes ~0.5s)"""
+        self.executor.submit(os.getpid)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers; the next run() starts a new pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global pool instance
+image_pool = ImagePool(
+    mode=settings.IMAGE_POOL_MODE,
+    max_workers=settings.IMAGE_POOL_WORKERS,
+    timeout=settings.IMAGE_POOL_TIMEOUT_SECONDS,
+)
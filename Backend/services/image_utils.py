@@ -1,13 +1,19 @@
 """
 图片处理工具
 
-提供缩略图生成等功能
+提供图片预处理（一次解码：模型用图、缩略图、内容哈希）、缩略图生成等功能
 """
 import base64
+import hashlib
 import io
-from typing import Optional
+import math
+from typing import NamedTuple, Optional
 
+from config import settings
 from logging_config import get_logger
+from services.cache import TTLCache
+from services.image_pool import image_pool
+from services.metrics import metrics
 
 logger = get_logger(__name__)
 
@@ -15,6 +21,193 @@ logger = get_logger(__name__)
 THUMBNAIL_SIZE = (200, 200)
 THUMBNAIL_QUALITY = 85
 
+# 最近预处理过的图片（按原图字节的 sha256），同一张图片的解析与缩略图只解码一次
+_prepared_cache = TTLCache(max_entries=32, ttl=300)
+
+
+class PreparedImage(NamedTuple):
+    """预处理后的图片"""
+    model_base64: str  # 发送给 Vision 模型的 JPEG（长边不超过 IMAGE_MAX_EDGE）
+    thumbnail: str  # 200x200 以内的缩略图 JPEG
+    digest: str  # 原图字节的 sha256
+    original_size: tuple  # 原图尺寸 (宽, 高)
+    model_size: tuple  # 模型用图尺寸 (宽, 高)
+    original_bytes: int
+    model_bytes: int
+
+
+def _strip_data_url(image_base64: str) -> str:
+    """去除可能的 data URL 前缀"""
+    if "," in image_base64:
+        return image_base64.split(",", 1)[1]
+    return image_base64
+
+
+def _encode_jpeg(image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image(
+    image_base64: str,
+    max_edge: Optional[int] = None,
+    quality: Optional[int] = None,
+) -> Optional[PreparedImage]:
+    """
+    一次解码生成模型用图、缩略图和内容哈希
+
+    JPEG 使用 draft 模式按缩小比例解码；应用 EXIF 方向；模型用图长边不超过
+    max_edge。如果原图本身已足够小且无需旋转，重新编码后反而更大时直接使用原图。
+
+    Args:
+        image_base64: 原图的 base64 编码（可能包含 data:image/... 前缀）
+        max_edge: 模型用图最长边（默认 settings.IMAGE_MAX_EDGE）
+        quality: 模型用图 JPEG 质量（默认 settings.IMAGE_JPEG_QUALITY）
+
+    Returns:
+        PreparedImage，失败返回 None
+    """
+    max_edge = max_edge or settings.IMAGE_MAX_EDGE
+    quality = quality or settings.IMAGE_JPEG_QUALITY
+    try:
+        from PIL import Image, ImageOps
+
+        raw = base64.b64decode(_strip_data_url(image_base64))
+        digest = hashlib.sha256(raw).hexdigest()
+
+        image = Image.open(io.BytesIO(raw))
+        original_size = image.size
+        source_format = image.format
+        orientation = image.getexif().get(0x0112, 1)
+
+        # JPEG: 按 1/2、1/4、1/8 比例解码，长边仍不小于 max_edge
+        if source_format == "JPEG" and max(original_size) > max_edge:
+            scale = max_edge / max(original_size)
+            image.draft("RGB", tuple(math.ceil(side * scale) for side in original_size))
+
+        if orientation != 1:
+            image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        model_image = image
+        if max(image.size) > max_edge:
+            model_image = image.copy()
+            # BILINEAR + reducing_gap: 接近 LANCZOS 的清晰度，耗时约一半
+            model_image.thumbnail((max_edge, max_edge), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        buffer = io.BytesIO()
+        model_image.save(buffer, format="JPEG", quality=quality)
+        model_data = buffer.getvalue()
+
+        # 原图已是足够小、方向正确的 JPEG：保留原图
+        if (
+            source_format == "JPEG"
+            and orientation == 1
+            and max(original_size) <= max_edge
+            and len(model_data) >= len(raw)
+        ):
+            model_data = raw
+
+        thumbnail_image = model_image.copy()
+        thumbnail_image.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        thumbnail = base64.b64encode(_encode_jpeg(thumbnail_image, THUMBNAIL_QUALITY)).decode("utf-8")
+
+        prepared = PreparedImage(
+            model_base64=base64.b64encode(model_data).decode("utf-8"),
+            thumbnail=thumbnail,
+            digest=digest,
+            original_size=original_size,
+            model_size=model_image.size,
+            original_bytes=len(raw),
+            model_bytes=len(model_data),
+        )
+        logger.debug(
+            f"Preprocessed image: {original_size} {len(raw)}B -> {model_image.size} {len(model_data)}B"
+        )
+        return prepared
+
+    except ImportError:
+        logger.warning("Pillow not installed, cannot preprocess image")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to preprocess image: {e}")
+        return None
+
+
+def _prepared_key(image_base64: str) -> Optional[tuple]:
+    try:
+        digest = hashlib.sha256(base64.b64decode(_strip_data_url(image_base64))).hexdigest()
+    except Exception:
+        return None
+    return (digest, settings.IMAGE_MAX_EDGE, settings.IMAGE_JPEG_QUALITY)
+
+
+def prepare_image(image_base64: str) -> Optional[PreparedImage]:
+    """
+    按当前配置预处理图片（按内容哈希缓存最近的结果）
+
+    同一张图片的 Vision 调用与缩略图共用一次解码。
+
+    Args:
+        image_base64: 原图的 base64 编码
+
+    Returns:
+        PreparedImage，失败返回 None
+    """
+    key = _prepared_key(image_base64)
+    if key is None:
+        return None
+    prepared = _prepared_cache.get(key)
+    if prepared is None:
+        prepared = preprocess_image(image_base64)
+        if prepared is not None:
+            _prepared_cache.set(key, prepared)
+    return prepared
+
+
+async def prepare_image_async(image_base64: str) -> Optional[PreparedImage]:
+    """
+    prepare_image() 的异步版本：解码、缩放、编码在图片进程池中执行，不阻塞事件循环
+
+    Args:
+        image_base64: 原图的 base64 编码
+
+    Returns:
+        PreparedImage，失败或超时返回 None
+    """
+    key = _prepared_key(image_base64)
+    if key is None:
+        return None
+    prepared = _prepared_cache.get(key)
+    if prepared is None:
+        try:
+            prepared = await image_pool.run(
+                preprocess_image, image_base64, settings.IMAGE_MAX_EDGE, settings.IMAGE_JPEG_QUALITY
+            )
+        except Exception as e:
+            logger.error(f"Failed to preprocess image in pool: {e!r}")
+            return None
+        if prepared is not None:
+            _prepared_cache.set(key, prepared)
+    return prepared
+
+
+def vision_tokens(width: int, height: int, detail: str = "high") -> int:
+    """
+    OpenAI Vision 输入 token 估算
+
+    high: 缩放到 2048x2048 以内、短边不超过 768 后，按 512x512 分块，每块 170 + 基础 85
+    low: 固定 85
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
 
 def generate_thumbnail(
     image_base64: str,
@@ -30,12 +223,16 @@ def generate_thumbnail(
     Returns:
         缩略图的 base64 编码（不含前缀），失败返回 None
     """
+    # 默认尺寸：与 Vision 调用共用一次预处理
+    if tuple(size) == THUMBNAIL_SIZE:
+        prepared = prepare_image(image_base64)
+        return prepared.thumbnail if prepared else None
+
     try:
         from PIL import Image
 
         # 去除可能的 data URL 前缀
-        if "," in image_base64:
-            image_base64 = image_base64.split(",", 1)[1]
+        image_base64 = _strip_data_url(image_base64)
 
         # 解码 base64
         image_data = base64.b64decode(image_base64)
@@ -72,6 +269,59 @@ def generate_thumbnail(
         return None
 
 
+async def generate_thumbnail_async(image_base64: str) -> Optional[str]:
+    """
+    generate_thumbnail() 的异步版本（默认尺寸，在图片进程池中执行）
+
+    Args:
+        image_base64: 原图的 base64 编码
+
+    Returns:
+        缩略图的 base64 编码（不含前缀），失败返回 None
+    """
+    prepared = await prepare_image_async(image_base64)
+    return prepared.thumbnail if prepared else None
+
+
+async def image_content_part(image_base64: str, stage: str) -> dict:
+    """
+    按调用阶段所需的清晰度构建多模态消息中的图片部分，并记录发送的字节数和 token 估算
+
+    清晰度由 settings.IMAGE_STAGE_FIDELITY[stage] 决定：
+    - thumbnail: 缩略图，detail=low（意图分类只需判断是否像活动海报）
+    - low: 模型用图，detail=low
+    - full: 模型用图，detail=high（提取活动信息）
+
+    Args:
+        image_base64: 原图的 base64 编码
+        stage: 调用阶段（节点名，如 intent_classifier、image_parse）
+
+    Returns:
+        {"type": "image_url", "image_url": {...}}
+    """
+    fidelity = settings.IMAGE_STAGE_FIDELITY.get(stage, "full")
+    prepared = await prepare_image_async(image_base64)
+
+    if prepared is None:
+        # 预处理失败：发送原图
+        data, detail, tokens = _strip_data_url(image_base64), "auto", None
+    elif fidelity == "thumbnail":
+        data, detail, tokens = prepared.thumbnail, "low", vision_tokens(*THUMBNAIL_SIZE, detail="low")
+    else:
+        detail = "low" if fidelity == "low" else "high"
+        data, tokens = prepared.model_base64, vision_tokens(*prepared.model_size, detail=detail)
+
+    metrics.inc("vision_image_bytes_total", len(data) * 3 // 4, stage=stage)
+    metrics.inc("vision_images_total", stage=stage, fidelity=fidelity if prepared else "original")
+    if tokens is not None:
+        metrics.inc("vision_image_tokens_total", tokens, stage=stage)
+
+    return {
+        "type": "image_url",
+        "image_url": {"url": f"data:image/jpeg;base64,{data}", "detail": detail},
+    }
+
+
 def get_thumbnail_data_url(thumbnail_base64: str) -> str:
     """
     将缩略图 base64 转换为 data URL 格式
@@ -0,0 +1,212 @@
+"""
+Instrumentation - Request, graph node, LLM token and database metrics
+
+Responsibilities:
+- MetricsMiddleware (pure ASGI): latency histogram per route template and
+  status, plus database query count and time per request
+- instrument_node(): latency histogram per agent graph node; the node name is
+  kept in a context variable so LLM token usage is attributed to it
+- llm_node() / llm_stage(): the same attribution for LLM calls outside the
+  graph (parsing, search extraction)
+- record_llm_usage(): prompt/completion/cached token counters per node and
+  model, and the cached share of each prompt
+- install_db_instrumentation(): SQLAlchemy cursor events feeding the
+  per-request database statistics
+
+All hooks only add numbers to pre-existing objects on the hot path; metrics
+are aggregated in services.metrics and exported by services.metrics_export.
+"""
+import contextvars
+import functools
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+from logging_config import get_logger
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Buckets for per-request database query counts
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Buckets for fractions (e.g. cached share of a prompt)
+RATIO_BUCKETS = (0.0, 0.25, 0.5, 0.75, 0.9, 1.0)
+
+# Graph node (or parse/search stage) currently running, for LLM token attribution
+_current_node: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_node", default="other")
+
+# [query count, seconds] of the current HTTP request (None outside requests)
+_db_stats: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("metrics_db_stats", default=None)
+
+
+# ============================================================================
+# Graph nodes and LLM usage
+# ============================================================================
+
+def current_node() -> str:
+    """Name of the graph node / stage making LLM calls"""
+    return _current_node.get()
+
+
+@contextmanager
+def llm_node(name: str):
+    """Attribute LLM calls made in this block to a stage (e.g. text_parse)"""
+    token = _current_node.set(name)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+def llm_stage(name: str):
+    """Decorator form of llm_node() for async functions that call the LLM"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with llm_node(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_node(name: str, fn: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """Wrap an async graph node: latency histogram and LLM token attribution"""
+
+    @functools.wraps(fn)
+    async def node(state):
+        token = _current_node.set(name)
+        started = time.perf_counter()
+        try:
+            return await fn(state)
+        finally:
+            metrics.histogram("graph_node_duration_seconds", time.perf_counter() - started, node=name)
+            _current_node.reset(token)
+
+    return node
+
+
+def record_llm_usage(response: Any, model: str):
+    """Count prompt/completion tokens reported by the provider (AIMessage.usage_metadata)"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    node = _current_node.get()
+    metrics.inc("llm_tokens_total", usage.get("input_tokens", 0), node=node, model=model, type="prompt")
+    metrics.inc("llm_tokens_total", usage.get("output_tokens", 0), node=node, model=model, type="completion")
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    if cached:
+        metrics.inc("llm_tokens_total", cached, node=node, model=model, type="prompt_cached")
+    # Per call: share of the prompt served from the provider's prompt cache
+    if usage.get("input_tokens"):
+        metrics.histogram("llm_prompt_cached_ratio", cached / usage["input_tokens"], buckets=RATIO_BUCKETS, node=node)
+
+
+# ============================================================================
+# Database
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _record_query(conn, result: str):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    metrics.inc("db_queries_total", result=result)
+    metrics.histogram("db_query_duration_seconds", elapsed)
+    stats = _db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn, "ok")
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements; pop their start time here
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        _record_query(conn, "error")
+
+
+def install_db_instrumentation(engine):
+    """Time every statement executed on an engine (idempotent)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+def route_template(scope) -> str:
+    """
+    Route label of a handled request, e.g. /api/events/{event_id}
+
+    Built from the request path by putting the path parameters back as
+    placeholders, so it includes router prefixes however routers are nested.
+    Requests that matched no route are labelled "unmatched".
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    template = scope["path"]
+    for name, value in (scope.get("path_params") or {}).items():
+        template = re.sub("/" + re.escape(str(value)) + "(?=/|$)", f"/{{{name}}}", template, count=1)
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or body buffering)
+
+    Records http_request_duration_seconds{method, route, status} until the
+    response body is complete (for SSE: the whole stream), and
+    db_queries_per_request / db_time_per_request_seconds{route} for the
+    queries executed while handling the request. Routes are labelled by
+    their template (e.g. /api/events/{event_id}) to bound cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = [0, 0.0]
+        token = _db_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _db_stats.reset(token)
+            path = route_template(scope)
+            metrics.histogram(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=path,
+                status=status_code,
+            )
+            metrics.histogram("db_queries_per_request", stats[0], buckets=QUERY_COUNT_BUCKETS, route=path)
+            metrics.histogram("db_time_per_request_seconds", stats[1], route=path)
@@ -0,0 +1,125 @@
+"""
+LLM Client Registry - Process-wide shared chat model clients
+
+Responsibilities:
+- Hand out one ChatOpenAI instance per (model, temperature, timeout)
+- Share a single connection-pooled HTTP client (sync + async) across all instances
+- Report pool hit/miss statistics
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from langchain_openai import ChatOpenAI
+
+from config import settings
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ClientKey = Tuple[str, float, Optional[float]]
+
+
+class LLMRegistry:
+    """Thread-safe registry of shared, connection-pooled ChatOpenAI clients"""
+
+    def __init__(self):
+        self._clients: Dict[ClientKey, ChatOpenAI] = {}
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._http_async_client = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get_http_clients(self):
+        """Create the shared HTTP clients on first use"""
+        if self._http_client is None:
+            from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+
+            try:
+                import httpx2 as httpx  # openai>=3 ships its own httpx fork
+            except ImportError:
+                import httpx
+
+            limits = httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            )
+            self._http_client = DefaultHttpxClient(limits=limits)
+            self._http_async_client = DefaultAsyncHttpxClient(limits=limits)
+            logger.debug(f"Created pooled LLM HTTP clients (max_connections={settings.LLM_MAX_CONNECTIONS})")
+        return self._http_client, self._http_async_client
+
+    def get(
+        self,
+        model: str,
+        temperature: float = 0.3,
+        timeout: Optional[float] = None,
+    ) -> ChatOpenAI:
+        """
+        Get the shared client for (model, temperature, timeout)
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            timeout: Request timeout in seconds (None = client default)
+
+        Returns:
+            Shared ChatOpenAI instance
+        """
+        key = (model, temperature, timeout)
+        with self._lock:
+            llm = self._clients.get(key)
+            if llm is not None:
+                self.hits += 1
+                return llm
+
+            self.misses += 1
+            http_client, http_async_client = self._get_http_clients()
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                timeout=timeout,
+                # Retries (with jitter and a deadline) are done by services.llm_resilience
+                max_retries=0 if settings.ENABLE_LLM_RESILIENCE else 2,
+                # Report token usage for streamed answers too (llm_tokens_total)
+                stream_usage=True,
+                api_key=settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"),
+                base_url=settings.OPENAI_BASE_URL or None,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            self._clients[key] = llm
+            logger.info(f"Registered LLM client: model={model}, temperature={temperature}, timeout={timeout}")
+            return llm
+
+    def stats(self) -> dict:
+        """Return pool statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "clients": len(self._clients),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        """Drop all clients (e.g. after the API key changed)"""
+        with self._lock:
+            self._clients.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Global registry instance
+llm_registry = LLMRegistry()
+
+
+def get_chat_model(
+    model: Optional[str] = None,
+    temperature: float = 0.3,
+    timeout: Optional[float] = None,
+) -> ChatOpenAI:
+    """Get a shared ChatOpenAI client (defaults to settings.OPENAI_MODEL)"""
+    return llm_registry.get(model or settings.OPENAI_MODEL, temperature, timeout)
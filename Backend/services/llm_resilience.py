@@ -0,0 +1,359 @@
+"""
+LLM Resilience - Deadlines, retries, hedging and a circuit breaker for chat model calls
+
+Responsibilities:
+- Bound every call by min(LLM_CALL_TIMEOUT_SECONDS, what is left of the
+  per-turn budget set with turn_budget())
+- Retry transient provider errors (connection errors, timeouts, 429, 5xx)
+  with full-jitter exponential backoff, never past the deadline
+- Optionally hedge: fire a duplicate request once the primary has run longer
+  than the recent p95 latency and take whichever answers first
+- Open a per-model circuit breaker after consecutive failures, so callers
+  fail fast and use their local fallbacks while the provider is degraded
+- Count outcomes in services.metrics, and token usage per node and model
+
+Calls tagged STREAM_TAG stream tokens to the user through callbacks; they are
+neither hedged nor retried, since a second attempt would repeat the tokens.
+"""
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import Runnable
+
+from config import settings
+from logging_config import get_logger
+from services.instrumentation import record_llm_usage
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+# LLM calls whose tokens are streamed to the user (see agent.graph.run_agent_stream)
+STREAM_TAG = "stream_to_user"
+
+# Absolute time.monotonic() deadline of the current turn (None = no turn budget)
+_turn_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_turn_deadline", default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider is considered degraded; the call was not attempted"""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The per-turn budget is used up"""
+
+
+# ============================================================================
+# Deadlines
+# ============================================================================
+
+def start_turn(seconds: Optional[float] = None) -> contextvars.Token:
+    """
+    Start the deadline for all LLM calls of one chat turn or parse request
+
+    Tasks created afterwards (graph nodes, speculative parses) inherit it.
+
+    Args:
+        seconds: Budget (default: settings.LLM_TURN_BUDGET_SECONDS)
+
+    Returns:
+        Token for end_turn()
+    """
+    return _turn_deadline.set(time.monotonic() + (seconds or settings.LLM_TURN_BUDGET_SECONDS))
+
+
+def end_turn(token: contextvars.Token):
+    """Restore the deadline that was active before start_turn()"""
+    try:
+        _turn_deadline.reset(token)
+    except ValueError:
+        # Async generator finalized in another context
+        pass
+
+
+@contextmanager
+def turn_budget(seconds: Optional[float] = None):
+    """Context manager form of start_turn() / end_turn()"""
+    token = start_turn(seconds)
+    try:
+        yield
+    finally:
+        end_turn(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current turn (None outside turn_budget())"""
+    deadline = _turn_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout() -> float:
+    """Timeout for the next call: per-call limit capped by the turn budget"""
+    timeout = settings.LLM_CALL_TIMEOUT_SECONDS
+    remaining = remaining_budget()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM turn budget exhausted")
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+# ============================================================================
+# Transient errors and backoff
+# ============================================================================
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth retrying: timeouts, connection errors, rate limits, 5xx"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform(0, base * 2^attempt), capped at LLM_RETRY_MAX_DELAY"""
+    cap = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+# ============================================================================
+# Circuit breaker
+# ============================================================================
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"LLM circuit '{self.name}': {self.state} -> {state}")
+            metrics.inc("llm_circuit_transitions_total", model=self.name, state=state)
+            self.state = state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition("half_open")
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """Open and not yet due for a probe"""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def release_probe(self):
+        """A half-open probe ended without an answer either way (cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model: Optional[str] = None) -> CircuitBreaker:
+    """Circuit breaker for a model (default: settings.OPENAI_MODEL)"""
+    name = model or settings.OPENAI_MODEL
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.LLM_BREAKER_FAILURES,
+                reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def provider_degraded(model: Optional[str] = None) -> bool:
+    """True while the model's circuit is open (callers should use local fallbacks)"""
+    return settings.ENABLE_LLM_RESILIENCE and get_breaker(model).is_open()
+
+
+def reset_breakers():
+    """Close all circuits (tests, or after a provider incident)"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+# ============================================================================
+# Latency tracking (hedge delay)
+# ============================================================================
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-quantile of the window (None until 20 samples are recorded)"""
+        with self._lock:
+            if len(self._samples) < 20:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def hedge_delay() -> float:
+    """Delay before a hedged request: recent p95, at least LLM_HEDGE_MIN_DELAY"""
+    p95 = latency_tracker.percentile(0.95)
+    return max(settings.LLM_HEDGE_MIN_DELAY, p95 or 0.0)
+
+
+# ============================================================================
+# Wrapper
+# ============================================================================
+
+class ResilientChatModel(Runnable):
+    """Chat model wrapper applying deadlines, retries, hedging and the circuit breaker to ainvoke()"""
+
+    def __init__(self, llm: Runnable, model: Optional[str] = None):
+        self.llm = llm
+        self.model = model or getattr(llm, "model_name", None) or settings.OPENAI_MODEL
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def bind_tools(self, *args, **kwargs) -> "ResilientChatModel":
+        return ResilientChatModel(self.llm.bind_tools(*args, **kwargs), self.model)
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.llm.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if not settings.ENABLE_LLM_RESILIENCE:
+            response = await self.llm.ainvoke(input, config, **kwargs)
+            record_llm_usage(response, self.model)
+            return response
+
+        streamed = STREAM_TAG in ((config or {}).get("tags") or [])
+        breaker = get_breaker(self.model)
+        attempts = 1 if streamed else settings.LLM_MAX_RETRIES + 1
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                metrics.inc("llm_requests_total", model=self.model, result="circuit_open")
+                raise CircuitOpenError(f"LLM provider degraded (circuit open for {self.model})")
+
+            timeout = call_timeout()
+            started = time.perf_counter()
+            try:
+                if streamed or not settings.LLM_HEDGE_ENABLED:
+                    response = await asyncio.wait_for(self.llm.ainvoke(input, config, **kwargs), timeout)
+                else:
+                    response = await self._hedged(input, config, timeout, **kwargs)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The provider answered (e.g. 400): not a sign of degradation
+                    breaker.record_success()
+                    metrics.inc("llm_requests_total", model=self.model, result="error")
+                    raise
+                breaker.record_failure()
+                result = "timeout" if isinstance(e, asyncio.TimeoutError) else "transient_error"
+                metrics.inc("llm_requests_total", model=self.model, result=result)
+
+                remaining = remaining_budget()
+                delay = backoff_delay(attempt)
+                if attempt + 1 >= attempts or (remaining is not None and remaining <= delay):
+                    raise
+                logger.warning(f"LLM call failed ({e!r}), retry {attempt + 1}/{attempts - 1} in {delay:.2f}s")
+                metrics.inc("llm_retries_total", model=self.model)
+                await asyncio.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - started
+            breaker.record_success()
+            latency_tracker.record(elapsed)
+            metrics.inc("llm_requests_total", model=self.model, result="ok")
+            metrics.observe("llm_request_seconds", elapsed, model=self.model)
+            record_llm_usage(response, self.model)
+            return response
+
+    async def _hedged(self, input, config, timeout: float, **kwargs):
+        """Primary request, plus a duplicate if the primary is slower than the hedge delay"""
+        deadline = time.perf_counter() + timeout
+        primary = asyncio.ensure_future(self.llm.ainvoke(input, config, **kwargs))
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait([primary], timeout=min(hedge_delay(), timeout))
+            if not done:
+                metrics.inc("llm_hedged_requests_total", model=self.model, outcome="sent")
+                hedge = asyncio.ensure_future(self.llm.ainvoke(input, config, **kwargs))
+                tasks[hedge] = "hedge"
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            metrics.inc("llm_hedged_requests_total", model=self.model, outcome=f"{tasks[task]}_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def resilient(llm: Runnable) -> ResilientChatModel:
+    """Wrap a chat model (idempotent)"""
+    return llm if isinstance(llm, ResilientChatModel) else ResilientChatModel(llm)
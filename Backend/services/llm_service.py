@@ -8,27 +8,38 @@ Responsibilities:
 - Ask user when information is incomplete
 - Complete incomplete information via web search
 """
+import asyncio
 import os
 import time
-import asyncio
 from typing import List, Optional, NamedTuple
 from datetime import datetime
 
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.messages import HumanMessage
 
 from schemas import ParsedEvent
 from config import settings
 from logging_config import get_logger
+from services.image_utils import image_content_part
+from services.instrumentation import llm_stage
+from services.llm_registry import get_chat_model
+from services.llm_resilience import ResilientChatModel, resilient
+from services.parse_cache import make_key, parse_cache
+from services.singleflight import SingleFlight
+from services.prompt_budget import Section, fit_sections, fit_text
+from services.prompt_cache import prompt_time
 from services.prompts import (
     TEXT_PARSE_PROMPT,
     IMAGE_PARSE_SYSTEM_PROMPT,
+    BATCH_IMAGE_PARSE_INSTRUCTION,
     EventExtractionList,
 )
 
 logger = get_logger(__name__)
 
+# Concurrent identical parse calls (double taps, client retries) share one LLM call
+_parse_flight = SingleFlight("parse")
+
 
 class ParseResult(NamedTuple):
     """Parse result containing event list and possible clarification questions"""
@@ -40,16 +51,23 @@ class ParseResult(NamedTuple):
     partial_events: Optional[List[dict]] = None  # Events with title but no time
 
 
+class BatchImageParseResult(NamedTuple):
+    """Batched multi-image parse result with per-image attribution"""
+    events_by_image: List[List[ParsedEvent]]  # Same order as the input images
+    unattributed: List[ParsedEvent]  # Events without a valid source_image_index
+
+
 # ============================================================================
 # LLM Initialization
 # ============================================================================
 
-def get_llm() -> ChatOpenAI:
+def get_llm() -> ResilientChatModel:
     """
     Get OpenAI LLM instance
 
     Returns:
-        Configured ChatOpenAI instance
+        Shared ChatOpenAI instance from the client registry, wrapped with
+        deadlines, retries and the circuit breaker (services.llm_resilience)
 
     Raises:
         ValueError: If API Key is not configured
@@ -59,19 +77,46 @@ def get_llm() -> ChatOpenAI:
         logger.error("OPENAI_API_KEY is not configured")
         raise ValueError("OPENAI_API_KEY is not configured. Set it in .env file or environment variable.")
 
-    logger.debug(f"Initializing LLM: model={settings.OPENAI_MODEL}, temperature=0.3")
-    return ChatOpenAI(
-        model=settings.OPENAI_MODEL,
-        temperature=0.3,  # Lower temperature for more consistent results
-        api_key=api_key,
-    )
+    # Lower temperature for more consistent results
+    return resilient(get_chat_model(settings.OPENAI_MODEL, temperature=0.3))
 
 
 # ============================================================================
 # Text Parsing
 # ============================================================================
 
-def parse_text_with_llm(
+async def parse_text_with_llm(
+    text: str,
+    additional_note: Optional[str] = None,
+) -> ParseResult:
+    """
+    Parse event information from text, served from the parse cache when the
+    same (normalized) text and note were parsed today; concurrent identical
+    calls share one LLM call
+
+    Args:
+        text: Input text
+        additional_note: Additional note
+
+    Returns:
+        ParseResult: Contains event list and possible clarification questions
+    """
+    key = make_key("text", text, additional_note)
+    cached = parse_cache.get(key, kind="text")
+    if cached is not None:
+        logger.info(f"Parse cache hit (text): {len(cached.events)} event(s)")
+        return cached
+
+    async def parse_and_store():
+        result = await _parse_text_with_llm(text, additional_note)
+        parse_cache.put(key, result, kind="text")
+        return result
+
+    return await _parse_flight.do(key, parse_and_store)
+
+
+@llm_stage("text_parse")
+async def _parse_text_with_llm(
     text: str,
     additional_note: Optional[str] = None,
 ) -> ParseResult:
@@ -93,16 +138,20 @@ def parse_text_with_llm(
         parser = JsonOutputParser(pydantic_object=EventExtractionList)
 
         # Build prompt
-        current_time = datetime.now().isoformat()
+        current_time = prompt_time()
 
         logger.debug(f"Calling LLM API (model={settings.OPENAI_MODEL})")
 
         # Call LLM
         chain = TEXT_PARSE_PROMPT | llm | parser
-        result = chain.invoke({
+        sections = fit_sections([
+            Section("text", text, priority=2),
+            Section("additional_note", additional_note or "", priority=1),
+        ], node="text_parse")
+        result = await chain.ainvoke({
             "current_time": current_time,
-            "text": text,
-            "additional_note": additional_note or "",
+            "text": sections["text"],
+            "additional_note": sections["additional_note"],
         })
 
         elapsed = time.time() - start_time
@@ -134,24 +183,24 @@ def parse_text_with_llm(
                     if result.get("events") and len(result["events"]) > 0:
                         location_hint = result["events"][0].get("location")
                     
-                    # Search web (run async in sync context)
-                    search_results = asyncio.run(search_event_info(
+                    # Search web
+                    search_results = await search_event_info(
                         query=" ".join(search_keywords),
                         location_hint=location_hint or result.get("location_hint"),
                         date_hint=result.get("date_hint"),
-                    ))
+                    )
                     
                     if search_results:
                         # Extract details from search results
                         first_event = result.get("events", [{}])[0] if result.get("events") else {}
-                        completed_info = asyncio.run(extract_event_details_from_search(
+                        completed_info = await extract_event_details_from_search(
                             search_results,
                             partial_event={
                                 "title": first_event.get("title", ""),
                                 "date_hint": result.get("date_hint"),
                                 "location_hint": first_event.get("location", ""),
                             },
-                        ))
+                        )
                         
                         if completed_info:
                             # Merge with original result
@@ -185,7 +234,38 @@ def parse_text_with_llm(
 # Image Parsing
 # ============================================================================
 
-def parse_image_with_llm(
+async def parse_image_with_llm(
+    image_base64: str,
+    additional_note: Optional[str] = None,
+) -> ParseResult:
+    """
+    Parse event information from image, served from the parse cache when the
+    same image bytes and note were parsed today; concurrent identical calls
+    share one LLM call
+
+    Args:
+        image_base64: Base64 encoded image
+        additional_note: Additional note
+
+    Returns:
+        ParseResult: Contains event list and possible clarification questions
+    """
+    key = make_key("image", image_base64, additional_note)
+    cached = parse_cache.get(key, kind="image")
+    if cached is not None:
+        logger.info(f"Parse cache hit (image): {len(cached.events)} event(s)")
+        return cached
+
+    async def parse_and_store():
+        result = await _parse_image_with_llm(image_base64, additional_note)
+        parse_cache.put(key, result, kind="image")
+        return result
+
+    return await _parse_flight.do(key, parse_and_store)
+
+
+@llm_stage("image_parse")
+async def _parse_image_with_llm(
     image_base64: str,
     additional_note: Optional[str] = None,
 ) -> ParseResult:
@@ -206,34 +286,28 @@ def parse_image_with_llm(
         llm = get_llm()
         parser = JsonOutputParser(pydantic_object=EventExtractionList)
 
-        # Build system message
-        current_time = datetime.now().isoformat()
-        system_message = IMAGE_PARSE_SYSTEM_PROMPT.format(current_time=current_time)
-
-        # Build user message (multimodal)
+        # Build user message (multimodal); the system message is static so
+        # that it stays a cacheable prefix
+        note = fit_text(additional_note, node="image_parse", name="additional_note") if additional_note else "None"
         user_content = [
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{image_base64}",
-                },
-            },
+            {"type": "text", "text": f"Current time: {prompt_time()}"},
+            await image_content_part(image_base64, "image_parse"),
             {
                 "type": "text",
-                "text": f"Additional note: {additional_note or 'None'}",
+                "text": f"Additional note: {note}",
             },
         ]
 
         # Create messages
         messages = [
-            ("system", system_message),
+            ("system", IMAGE_PARSE_SYSTEM_PROMPT),
             HumanMessage(content=user_content),
         ]
 
         logger.debug(f"Calling LLM Vision API (model={settings.OPENAI_MODEL})")
 
         # Call LLM (supports Vision)
-        response = llm.invoke(messages)
+        response = await llm.ainvoke(messages)
 
         elapsed = time.time() - start_time
         logger.info(f"LLM Vision API call completed in {elapsed:.2f}s")
@@ -270,8 +344,8 @@ def parse_image_with_llm(
             
             try:
                 from services.search_service import (
-                    search_event_info_sync,
-                    extract_event_details_from_search_sync,
+                    search_event_info,
+                    extract_event_details_from_search,
                     merge_event_info,
                 )
                 
@@ -280,8 +354,8 @@ def parse_image_with_llm(
                 if events_raw:
                     location_hint = events_raw[0].get("location")
                 
-                logger.info(f"[LLM-IMAGE] Calling search_event_info_sync...")
-                search_results = search_event_info_sync(
+                logger.info("[LLM-IMAGE] Calling search_event_info...")
+                search_results = await search_event_info(
                     query=" ".join(search_keywords),
                     location_hint=location_hint,
                     date_hint=result.get("date_hint"),
@@ -292,7 +366,7 @@ def parse_image_with_llm(
                 if search_results:
                     logger.info(f"[LLM-IMAGE] Extracting event details from search results...")
                     first_event = events_raw[0] if events_raw else {}
-                    completed_info = extract_event_details_from_search_sync(
+                    completed_info = await extract_event_details_from_search(
                         search_results,
                         partial_event={
                             "title": first_event.get("title", ""),
@@ -347,50 +421,51 @@ def parse_image_with_llm(
         return ParseResult(events=[], needs_clarification=False, clarification_question=None, search_keywords=None, partial_events=None)
 
 
-def parse_images_with_llm(
+@llm_stage("image_parse")
+async def parse_images_with_llm(
     images_base64: List[str],
     additional_note: Optional[str] = None,
-) -> List[ParsedEvent]:
+) -> BatchImageParseResult:
     """
-    Batch parse event information from multiple images using LangChain + OpenAI Vision
+    Batch parse event information from multiple images in one LangChain + OpenAI Vision call
+
+    Images are labelled "Image 0".."Image N-1" and the model returns a
+    source_image_index per event, so callers can attach each event to the
+    image it came from (thumbnails). Images that yield no events are left
+    empty for the caller to re-parse individually.
 
     Args:
         images_base64: List of base64 encoded images
         additional_note: Additional note
 
     Returns:
-        List of parsed events (merged from all images)
+        BatchImageParseResult: Events grouped by source image
     """
+    events_by_image: List[List[ParsedEvent]] = [[] for _ in images_base64]
     if not images_base64:
-        return []
+        return BatchImageParseResult(events_by_image=events_by_image, unattributed=[])
 
     start_time = time.time()
     logger.debug(f"Starting LLM batch image parsing ({len(images_base64)} images)")
 
-    all_events = []
-
     try:
         llm = get_llm()
         parser = JsonOutputParser(pydantic_object=EventExtractionList)
-        current_time = datetime.now().isoformat()
-        system_message = IMAGE_PARSE_SYSTEM_PROMPT.format(current_time=current_time)
-
-        # Build multimodal messages for each image
-        user_content = []
 
-        # Add all images
-        for img_base64 in images_base64:
-            user_content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{img_base64}",
-                },
-            })
+        # Build multimodal message: each image preceded by its label
+        user_content = [{"type": "text", "text": f"Current time: {prompt_time()}"}]
+        image_parts = await asyncio.gather(
+            *(image_content_part(img, "image_parse") for img in images_base64)
+        )
+        for idx, image_part in enumerate(image_parts):
+            user_content.append({"type": "text", "text": f"Image {idx}:"})
+            user_content.append(image_part)
 
         # Add text instruction
-        note_text = f"Please analyze the above {len(images_base64)} image(s) and extract all event information."
+        note_text = BATCH_IMAGE_PARSE_INSTRUCTION.format(count=len(images_base64), last=len(images_base64) - 1)
         if additional_note:
-            note_text += f"\nAdditional note: {additional_note}"
+            note = fit_text(additional_note, node="image_parse", name="additional_note")
+            note_text += f"\nAdditional note: {note}"
         user_content.append({
             "type": "text",
             "text": note_text,
@@ -398,14 +473,14 @@ def parse_images_with_llm(
 
         # Create messages
         messages = [
-            ("system", system_message),
+            ("system", IMAGE_PARSE_SYSTEM_PROMPT),
             HumanMessage(content=user_content),
         ]
 
         logger.debug(f"Calling LLM Vision API with {len(images_base64)} images (model={settings.OPENAI_MODEL})")
 
         # Call LLM (supports multiple images Vision)
-        response = llm.invoke(messages)
+        response = await llm.ainvoke(messages)
 
         elapsed = time.time() - start_time
         logger.info(f"LLM batch Vision API call completed in {elapsed:.2f}s")
@@ -413,27 +488,31 @@ def parse_images_with_llm(
         # Parse JSON response
         result = parser.parse(response.content)
 
-        # Convert to ParsedEvent
-        events = _convert_to_parsed_events(result, source_type="image")
-
-        logger.info(f"LLM batch image parsing completed: {len(events)} event(s) extracted from {len(images_base64)} image(s)")
-        return events
-
     except Exception as e:
         elapsed = time.time() - start_time
         logger.error(f"LLM batch image parsing failed after {elapsed:.2f}s: {e}", exc_info=True)
-        # If batch processing fails, try individual processing
-        logger.info("Falling back to individual image parsing...")
-        for idx, img_base64 in enumerate(images_base64):
-            try:
-                events = parse_image_with_llm(img_base64, additional_note)
-                all_events.extend(events)
-                logger.debug(f"Parsed image {idx+1}/{len(images_base64)}: {len(events)} event(s)")
-            except Exception as img_error:
-                logger.warning(f"Failed to parse image {idx+1}: {img_error}")
-                continue
-
-        return all_events
+        return BatchImageParseResult(events_by_image=events_by_image, unattributed=[])
+
+    # Group raw events by source image, then convert (only events with valid start_time)
+    grouped: List[List[dict]] = [[] for _ in images_base64]
+    unattributed_raw: List[dict] = []
+    for event_data in result.get("events", []):
+        index = event_data.get("source_image_index")
+        if isinstance(index, int) and 0 <= index < len(images_base64):
+            grouped[index].append(event_data)
+        else:
+            unattributed_raw.append(event_data)
+
+    events_by_image = [_convert_to_parsed_events({"events": raw}, source_type="image") for raw in grouped]
+    unattributed = _convert_to_parsed_events({"events": unattributed_raw}, source_type="image")
+    if unattributed:
+        logger.warning(f"{len(unattributed)} event(s) returned without a valid source_image_index")
+
+    logger.info(
+        f"LLM batch image parsing completed: {sum(len(e) for e in events_by_image) + len(unattributed)} event(s) "
+        f"from {len(images_base64)} image(s), per image: {[len(e) for e in events_by_image]}"
+    )
+    return BatchImageParseResult(events_by_image=events_by_image, unattributed=unattributed)
 
 
 # ============================================================================
@@ -0,0 +1,116 @@
+"""
+Metrics - Process-wide in-memory counters, summaries and histograms
+
+Responsibilities:
+- Count events by name and labels (e.g. speculation outcomes)
+- Record observed values as count/sum summaries (e.g. seconds saved)
+- Record latencies and sizes in fixed-bucket histograms (e.g. per-route latency)
+- Report a snapshot for logging, inspection and export (services.metrics_export)
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, LabelSet]
+
+# Default histogram buckets (seconds): sub-millisecond DB queries up to slow LLM turns
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _key(name: str, labels: Dict[str, str]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, summaries and histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = {}
+        self._summaries: Dict[MetricKey, List[float]] = {}  # [count, sum]
+        self._histograms: Dict[MetricKey, list] = {}  # [bucket counts..., +Inf count, sum]
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increment a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a summary"""
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    def histogram(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        """Record one observation in a histogram (buckets are fixed by the first call per name)"""
+        key = _key(name, labels)
+        with self._lock:
+            bounds = self._buckets.get(name)
+            if bounds is None:
+                bounds = self._buckets[name] = tuple(buckets)
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(bounds) + 1) + [0.0]
+            # Per-bucket (non-cumulative) count; the last slot before the sum is +Inf
+            counts[bisect_left(bounds, value)] += 1
+            counts[-1] += value
+
+    def counter(self, name: str, **labels) -> float:
+        """Current value of a counter"""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0.0)
+
+    def summary(self, name: str, **labels) -> Tuple[int, float]:
+        """(count, sum) of a summary"""
+        with self._lock:
+            count, total = self._summaries.get(_key(name, labels), [0, 0.0])
+            return int(count), total
+
+    def histogram_count(self, name: str, **labels) -> Tuple[int, float]:
+        """(count, sum) of a histogram"""
+        with self._lock:
+            counts = self._histograms.get(_key(name, labels))
+            if counts is None:
+                return 0, 0.0
+            return int(sum(counts[:-1])), counts[-1]
+
+    def snapshot(self) -> dict:
+        """Return all metrics as {"counters": [...], "summaries": [...], "histograms": [...]}"""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "summaries": [
+                    {"name": name, "labels": dict(labels), "count": int(count), "sum": total}
+                    for (name, labels), (count, total) in sorted(self._summaries.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": list(self._buckets[name]),
+                        "counts": [int(c) for c in counts[:-1]],
+                        "sum": counts[-1],
+                    }
+                    for (name, labels), counts in sorted(self._histograms.items())
+                ],
+            }
+
+    def clear(self):
+        """Reset all metrics"""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+            self._histograms.clear()
+            self._buckets.clear()
+
+
+# Global metrics instance
+metrics = MetricsRegistry()
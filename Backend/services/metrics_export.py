@@ -0,0 +1,167 @@
+"""
+Metrics Export - Prometheus text format, aggregated across uvicorn workers
+
+Responsibilities:
+- Render a metrics snapshot in the Prometheus text exposition format
+- Multi-worker deployments (METRICS_MULTIPROC_DIR set): every worker writes
+  its snapshot to <dir>/<pid>.json periodically and when it serves a scrape;
+  the scraped worker merges all files, so any worker returns the totals
+- Files of workers that are no longer running are dropped on collection;
+  Prometheus treats the resulting drop in a counter as a reset
+"""
+import asyncio
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import settings
+from logging_config import get_logger
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# Multi-worker aggregation
+# ============================================================================
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(directory: str):
+    """Write this worker's snapshot to <directory>/<pid>.json (atomic replace)"""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    target = path / f"{os.getpid()}.json"
+    tmp = path / f".{os.getpid()}.json.tmp"
+    tmp.write_text(json.dumps(metrics.snapshot()))
+    os.replace(tmp, target)
+
+
+def read_snapshots(directory: str) -> List[dict]:
+    """Snapshots of all live workers (files of exited workers are removed)"""
+    snapshots = []
+    for file in Path(directory).glob("*.json"):
+        try:
+            pid = int(file.stem)
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            file.unlink(missing_ok=True)
+            continue
+        try:
+            snapshots.append(json.loads(file.read_text()))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics file {file}: {e}")
+    return snapshots
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Sum counters, summaries and histograms with the same name and labels"""
+    counters: Dict[tuple, dict] = {}
+    summaries: Dict[tuple, dict] = {}
+    histograms: Dict[tuple, dict] = {}
+    for snapshot in snapshots:
+        for item in snapshot.get("counters", []):
+            key = (item["name"], tuple(sorted(item["labels"].items())))
+            merged = counters.setdefault(key, {**item, "value": 0.0})
+            merged["value"] += item["value"]
+        for item in snapshot.get("summaries", []):
+            key = (item["name"], tuple(sorted(item["labels"].items())))
+            merged = summaries.setdefault(key, {**item, "count": 0, "sum": 0.0})
+            merged["count"] += item["count"]
+            merged["sum"] += item["sum"]
+        for item in snapshot.get("histograms", []):
+            key = (item["name"], tuple(sorted(item["labels"].items())))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {**item, "counts": list(item["counts"])}
+            elif merged["buckets"] == item["buckets"]:
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], item["counts"])]
+                merged["sum"] += item["sum"]
+    return {
+        "counters": [counters[k] for k in sorted(counters)],
+        "summaries": [summaries[k] for k in sorted(summaries)],
+        "histograms": [histograms[k] for k in sorted(histograms)],
+    }
+
+
+def collect() -> dict:
+    """Current metrics: this process, or all workers when METRICS_MULTIPROC_DIR is set"""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return metrics.snapshot()
+    write_snapshot(directory)
+    return merge_snapshots(read_snapshots(directory))
+
+
+async def flush_periodically(directory: str, interval: float):
+    """Background task: keep this worker's file fresh between scrapes"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(write_snapshot, directory)
+        except Exception as e:
+            logger.warning(f"Failed to write metrics snapshot: {e}")
+
+
+# ============================================================================
+# Prometheus text format
+# ============================================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict, extra: Optional[dict] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """Render a snapshot (from collect()) in the Prometheus text exposition format"""
+    lines: List[str] = []
+    declared = set()
+
+    def declare(name: str, kind: str):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for item in snapshot.get("counters", []):
+        declare(item["name"], "counter")
+        lines.append(f"{item['name']}{_labels(item['labels'])} {_number(item['value'])}")
+
+    for item in snapshot.get("summaries", []):
+        declare(item["name"], "summary")
+        lines.append(f"{item['name']}_count{_labels(item['labels'])} {item['count']}")
+        lines.append(f"{item['name']}_sum{_labels(item['labels'])} {_number(item['sum'])}")
+
+    for item in snapshot.get("histograms", []):
+        name = item["name"]
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(list(item["buckets"]) + [math.inf], item["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(item['labels'], {'le': _number(bound)})} {cumulative}")
+        lines.append(f"{name}_count{_labels(item['labels'])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(item['labels'])} {_number(item['sum'])}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,222 @@
+"""
+Parse Result Cache - Content-addressed cache for parse_text_with_llm / parse_image_with_llm
+
+Responsibilities:
+- Key results on a hash of the normalized text or decoded image bytes, plus
+  additional_note, the model name and the current date (relative dates such
+  as "tomorrow" depend on current_time)
+- In-memory LRU tier (TTLCache) with an optional persistent tier in the
+  parse_cache table
+- Count hits and misses per tier in services.metrics
+"""
+import base64
+import binascii
+import hashlib
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+from config import settings
+from logging_config import get_logger
+from services.cache import TTLCache
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# Keys
+# ============================================================================
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalize and collapse whitespace (forwarded copies differ only in spacing)"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def image_digest(image_base64: str) -> str:
+    """sha256 of the decoded image bytes (data: URL prefix and line breaks ignored)"""
+    data = image_base64.split(",", 1)[1] if image_base64.startswith("data:") else image_base64
+    try:
+        raw = base64.b64decode("".join(data.split()), validate=True)
+    except (binascii.Error, ValueError):
+        raw = data.encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def make_key(
+    kind: str,
+    content: str,
+    additional_note: Optional[str] = None,
+    model: Optional[str] = None,
+    day: Optional[date] = None,
+) -> str:
+    """
+    Cache key for one parse call
+
+    Args:
+        kind: "text" or "image"
+        content: Text, or base64 image
+        additional_note: Additional note passed to the parser
+        model: Model name (default: settings.OPENAI_MODEL)
+        day: Date bucket (default: today)
+    """
+    digest = image_digest(content) if kind == "image" else hashlib.sha256(
+        normalize_text(content).encode("utf-8")
+    ).hexdigest()
+    parts = [
+        kind,
+        digest,
+        normalize_text(additional_note or ""),
+        model or settings.OPENAI_MODEL,
+        (day or date.today()).isoformat(),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# Serialization
+# ============================================================================
+
+def serialize_result(result) -> dict:
+    """ParseResult -> JSON-compatible dict (thumbnails are not cached)"""
+    payload = result._asdict()
+    payload["events"] = [
+        event.model_dump(mode="json", exclude={"source_thumbnail"}) for event in result.events
+    ]
+    return payload
+
+
+def deserialize_result(payload: dict):
+    """JSON-compatible dict -> fresh ParseResult (callers may mutate it)"""
+    from schemas import ParsedEvent
+    from services.llm_service import ParseResult
+
+    return ParseResult(**{
+        **payload,
+        "events": [ParsedEvent(**event) for event in payload.get("events", [])],
+    })
+
+
+def is_cacheable(result) -> bool:
+    """Empty results are not cached: they are also what a failed LLM call returns"""
+    return bool(result.events or result.partial_events or result.needs_clarification)
+
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+class ParseCache:
+    """Two-tier parse result cache: in-memory LRU, optionally backed by the database"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 86400.0,
+        session_factory: Optional[Callable] = None,
+    ):
+        self.memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def get(self, key: str, kind: str = "text"):
+        """Return a cached ParseResult or None"""
+        if not settings.ENABLE_PARSE_CACHE:
+            return None
+
+        payload = self.memory.get(key)
+        if payload is not None:
+            metrics.inc("parse_cache_requests_total", kind=kind, result="hit_memory")
+            return deserialize_result(payload)
+
+        if settings.PARSE_CACHE_PERSIST:
+            payload = self._get_persistent(key)
+            if payload is not None:
+                self.memory.set(key, payload)
+                metrics.inc("parse_cache_requests_total", kind=kind, result="hit_db")
+                return deserialize_result(payload)
+
+        metrics.inc("parse_cache_requests_total", kind=kind, result="miss")
+        return None
+
+    def put(self, key: str, result, kind: str = "text"):
+        """Store a ParseResult (empty results are skipped)"""
+        if not settings.ENABLE_PARSE_CACHE or not is_cacheable(result):
+            return
+        payload = serialize_result(result)
+        self.memory.set(key, payload)
+        if settings.PARSE_CACHE_PERSIST:
+            self._put_persistent(key, kind, payload)
+
+    def _get_persistent(self, key: str) -> Optional[dict]:
+        from models import ParseCacheEntry
+
+        db = self._session()
+        try:
+            entry = db.query(ParseCacheEntry).filter(ParseCacheEntry.key == key).first()
+            if entry is None:
+                return None
+            if entry.expires_at <= datetime.utcnow():
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.payload
+        except Exception as e:
+            logger.warning(f"Parse cache read failed: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _put_persistent(self, key: str, kind: str, payload: dict):
+        from models import ParseCacheEntry
+
+        db = self._session()
+        try:
+            db.merge(ParseCacheEntry(
+                key=key,
+                kind=kind,
+                payload=payload,
+                created_at=datetime.utcnow(),
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+            ))
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Parse cache write failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the persistent tier; returns the number removed"""
+        from models import ParseCacheEntry
+
+        db = self._session()
+        try:
+            removed = db.query(ParseCacheEntry).filter(ParseCacheEntry.expires_at <= datetime.utcnow()).delete()
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        """Return in-memory tier statistics"""
+        return self.memory.stats()
+
+    def clear(self):
+        """Drop the in-memory tier"""
+        self.memory.clear()
+
+
+# Global cache instance
+parse_cache = ParseCache(
+    max_entries=settings.PARSE_CACHE_MAX_ENTRIES,
+    ttl=settings.PARSE_CACHE_TTL_SECONDS,
+)
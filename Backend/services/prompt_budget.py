@@ -0,0 +1,255 @@
+"""
+Prompt Token Budget
+
+Responsibilities:
+- Count tokens per model (tiktoken when its encoding is available, a
+  character-based estimate otherwise)
+- Encode event lists compactly (one line per event, nulls omitted)
+- Fit variable prompt sections (history, event lists, user text) into a
+  per-node budget by trimming the lowest-priority sections first
+- Log the tokens spent per section
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from config import settings
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_CJK_RE = re.compile(r"[一-鿿぀-ヿ가-힯]")
+
+# Marker appended/prepended when a section is cut
+TRUNCATION_MARK = "…"
+
+
+# ============================================================================
+# Token Counting
+# ============================================================================
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    """tiktoken encoding for the model, or None if unavailable (e.g. offline)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.info(f"tiktoken encoding unavailable for {model} ({type(e).__name__}), using estimate")
+        return None
+
+
+def preload_encoding(model: Optional[str] = None) -> bool:
+    """
+    Load the model's tiktoken encoding (app startup)
+
+    The first load may download the BPE file; doing it at startup keeps that
+    out of requests. A failure is cached, so requests use the estimate.
+
+    Returns:
+        Whether tiktoken counting is available
+    """
+    model = model or settings.OPENAI_MODEL
+    available = _get_encoding(model) is not None
+    logger.info(f"Prompt token counting for {model}: {'tiktoken' if available else 'estimate'}")
+    return available
+
+
+def estimate_tokens(text: str) -> int:
+    """Character-based estimate: ~1 token per CJK character, ~4 characters per token otherwise"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """
+    Count tokens of text for a model
+
+    Args:
+        text: Text to count
+        model: Model name (default: settings.OPENAI_MODEL)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# ============================================================================
+# Compact Event Encoding
+# ============================================================================
+
+def _get(event, field: str):
+    return event.get(field) if isinstance(event, dict) else getattr(event, field, None)
+
+
+def _format_time(value) -> Optional[str]:
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value[:16].replace("T", " ")
+    return value.strftime("%Y-%m-%d %H:%M")
+
+
+def encode_event(event, description_chars: int = 120) -> str:
+    """
+    Encode one event as a single line: `#id | start–end | title | @location | description`
+
+    Accepts Event models or dicts; empty fields are omitted.
+    """
+    parts = []
+    event_id = _get(event, "id")
+    if event_id is not None:
+        parts.append(f"#{event_id}")
+
+    start = _format_time(_get(event, "start_time"))
+    end = _format_time(_get(event, "end_time"))
+    if start:
+        if end and end[:10] == start[:10]:
+            end = end[11:]
+        parts.append(f"{start}–{end}" if end else start)
+
+    parts.append(_get(event, "title") or "(untitled)")
+
+    location = _get(event, "location")
+    if location:
+        parts.append(f"@{location}")
+
+    description = _get(event, "description")
+    if description and description_chars:
+        description = " ".join(description.split())
+        if len(description) > description_chars:
+            description = description[:description_chars].rstrip() + TRUNCATION_MARK
+        parts.append(description)
+
+    return " | ".join(parts)
+
+
+def encode_events(events: Iterable, description_chars: int = 0) -> str:
+    """Encode events one per line (descriptions omitted unless description_chars > 0)"""
+    lines = [encode_event(e, description_chars) for e in events]
+    return "\n".join(lines) if lines else "(no events)"
+
+
+# ============================================================================
+# Budget Fitting
+# ============================================================================
+
+class Section(NamedTuple):
+    """A variable part of a prompt"""
+    name: str
+    text: str
+    priority: int  # Higher priority sections are trimmed last
+    keep: str = "head"  # "head" keeps the beginning, "tail" keeps the end (recent history)
+    line_based: bool = False  # Drop whole lines (event lists, history) instead of characters
+
+
+def get_budget(node: str) -> int:
+    """Token budget for a node's variable sections"""
+    return settings.PROMPT_BUDGETS.get(node, settings.PROMPT_TOKEN_BUDGET)
+
+
+def _trim(section: Section, max_tokens: int, model: str) -> str:
+    """Trim a section to at most max_tokens"""
+    text = section.text
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    if section.line_based:
+        lines = text.splitlines()
+        kept: List[str] = []
+        used = 0
+        ordered = reversed(lines) if section.keep == "tail" else lines
+        for line in ordered:
+            cost = count_tokens(line, model) + 1
+            if used + cost > max_tokens - 8:
+                break
+            kept.append(line)
+            used += cost
+        omitted = len(lines) - len(kept)
+        if section.keep == "tail":
+            return "\n".join([f"({omitted} earlier lines omitted)"] + kept[::-1])
+        return "\n".join(kept + [f"({omitted} more lines omitted)"])
+
+    # Character trimming, shrinking proportionally until it fits
+    ratio = max_tokens / max(count_tokens(text, model), 1)
+    length = int(len(text) * ratio)
+    while length > 0:
+        cut = text[-length:] if section.keep == "tail" else text[:length]
+        candidate = TRUNCATION_MARK + cut if section.keep == "tail" else cut + TRUNCATION_MARK
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        length = int(length * 0.9)
+    return ""
+
+
+def fit_sections(
+    sections: List[Section],
+    node: str,
+    budget: Optional[int] = None,
+    model: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Fit prompt sections into a token budget
+
+    Sections are trimmed lowest priority first; a section is only cut as far
+    as needed to bring the total under budget.
+
+    Args:
+        sections: Variable prompt sections
+        node: Agent node / call site name (for budget lookup and logging)
+        budget: Token budget (default: get_budget(node))
+        model: Model name for token counting
+
+    Returns:
+        Mapping of section name to (possibly trimmed) text
+    """
+    model = model or settings.OPENAI_MODEL
+    budget = budget if budget is not None else get_budget(node)
+    tokens = {s.name: count_tokens(s.text, model) for s in sections}
+    texts = {s.name: s.text for s in sections}
+    total = sum(tokens.values())
+
+    if total > budget:
+        for section in sorted(sections, key=lambda s: s.priority):
+            excess = total - budget
+            if excess <= 0:
+                break
+            allowed = max(tokens[section.name] - excess, 0)
+            texts[section.name] = _trim(section, allowed, model)
+            new_tokens = count_tokens(texts[section.name], model)
+            total -= tokens[section.name] - new_tokens
+            tokens[section.name] = new_tokens
+
+    log_budget(node, tokens, budget)
+    return texts
+
+
+def log_budget(node: str, tokens: Dict[str, int], budget: int):
+    """Log tokens per prompt section"""
+    breakdown = " ".join(f"{name}={count}" for name, count in tokens.items())
+    logger.info(f"Prompt tokens [{node}]: {breakdown} total={sum(tokens.values())}/{budget}")
+
+
+def fit_text(
+    text: str,
+    node: str,
+    name: str = "text",
+    keep: str = "head",
+    line_based: bool = False,
+    budget: Optional[int] = None,
+) -> str:
+    """Fit a single section into a node's budget"""
+    return fit_sections([Section(name, text, 0, keep, line_based)], node, budget)[name]
+
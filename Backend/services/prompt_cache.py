@@ -0,0 +1,34 @@
+"""
+Prompt Caching - Byte-stable prompt prefixes for provider-side prompt caching
+
+OpenAI caches the longest prompt prefix it has seen recently (prompts of
+1024+ tokens, in 128-token steps, tools and images included); the first byte
+that differs ends the cached part. Prompt templates are therefore laid out
+static-first:
+
+- System messages hold only fixed instructions, examples and output formats
+- Per-call values go in the user message, least volatile first: current
+  time (minute precision), event lists, conversation history, then the
+  user's own message
+
+Cached prompt tokens are counted per node and model in llm_tokens_total
+(type="prompt_cached") and per call in llm_prompt_cached_ratio
+(services.instrumentation.record_llm_usage).
+"""
+from datetime import datetime
+from typing import Optional
+
+
+def prompt_time(now: Optional[datetime] = None) -> str:
+    """
+    Current time as put in prompts: ISO 8601, rounded down to the minute
+
+    Seconds are irrelevant for scheduling and would make every prompt unique.
+
+    Args:
+        now: Time to format (default: datetime.now())
+
+    Returns:
+        e.g. "2026-02-01T14:05"
+    """
+    return (now or datetime.now()).strftime("%Y-%m-%dT%H:%M")
@@ -6,13 +6,21 @@ Prompts 模块 - 管理 LLM 提示词
 from .event_extraction import (
     TEXT_PARSE_PROMPT,
     IMAGE_PARSE_SYSTEM_PROMPT,
+    BATCH_IMAGE_PARSE_INSTRUCTION,
     EventExtraction,
     EventExtractionList,
+    AgentEventExtraction,
+    EventUpdateFields,
+    IntentExtraction,
 )
 
 __all__ = [
     "TEXT_PARSE_PROMPT",
     "IMAGE_PARSE_SYSTEM_PROMPT",
+    "BATCH_IMAGE_PARSE_INSTRUCTION",
     "EventExtraction",
     "EventExtractionList",
+    "AgentEventExtraction",
+    "EventUpdateFields",
+    "IntentExtraction",
 ]
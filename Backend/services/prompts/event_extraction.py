@@ -3,7 +3,7 @@ Event Extraction Prompts
 
 Contains prompt templates for text parsing and image parsing.
 """
-from typing import List, Optional
+from typing import List, Literal, Optional
 from langchain_core.prompts import ChatPromptTemplate
 
 try:
@@ -23,6 +23,7 @@ class EventExtraction(BaseModel):
     end_time: Optional[str] = Field(None, description="End time, ISO 8601 format, optional")
     location: Optional[str] = Field(None, description="Location")
     description: Optional[str] = Field(None, description="Event description")
+    source_image_index: Optional[int] = Field(None, description="Index of the image the event was found in (batched multi-image parsing only)")
 
 
 class EventExtractionList(BaseModel):
@@ -50,6 +51,41 @@ class EventExtractionList(BaseModel):
     )
 
 
+class AgentEventExtraction(BaseModel):
+    """Event to create, extracted from a chat message"""
+    complete: bool = Field(True, description="True if the event can be created; false ONLY if the time is completely unknown")
+    title: Optional[str] = Field(None, description="Event title")
+    start_time: Optional[str] = Field(None, description="Start time, ISO 8601 format (use reasonable defaults)")
+    end_time: Optional[str] = Field(None, description="End time, ISO 8601 format (assume 1 hour if not specified)")
+    location: Optional[str] = Field(None, description="Location")
+    description: Optional[str] = Field(None, description="Event description")
+    recurrence_rule: Optional[str] = Field(None, description="RRULE if the event is recurring")
+    recurrence_end: Optional[str] = Field(None, description="Recurrence end date, ISO 8601 format")
+    search_keywords: Optional[List[str]] = Field(None, description="Keywords to search for the event time/details if unknown")
+    missing_info: Optional[List[str]] = Field(None, description="Missing required fields")
+    clarification_question: Optional[str] = Field(None, description="Only if complete=false and no search_keywords")
+
+
+class EventUpdateFields(BaseModel):
+    """Fields to change on an existing event (only those the user states explicitly)"""
+    title: Optional[str] = Field(None, description="New title")
+    start_time: Optional[str] = Field(None, description="New start time, ISO 8601 format")
+    end_time: Optional[str] = Field(None, description="New end time, ISO 8601 format")
+    location: Optional[str] = Field(None, description="New location")
+    description: Optional[str] = Field(None, description="New description")
+
+
+class IntentExtraction(BaseModel):
+    """Intent of a chat message, with the event payload for create/update intents"""
+    intent: Literal[
+        "chat", "create_event", "query_event", "update_event", "delete_event", "enrich_event",
+    ] = Field(description="Intent type")
+    confidence: float = Field(description="Confidence (0.0-1.0)")
+    reason: Optional[str] = Field(None, description="Brief explanation of the judgment")
+    event: Optional[AgentEventExtraction] = Field(None, description="Event to create (create_event only)")
+    update: Optional[EventUpdateFields] = Field(None, description="Fields to change (update_event only, explicit absolute values only)")
+
+
 # ============================================================================
 # Text Parsing Prompt
 # ============================================================================
@@ -63,8 +99,6 @@ Please carefully analyze the user's input text and extract all possible event in
 4. Extract location information (if available)
 5. Extract event description
 
-Current time: {current_time}
-
 **Important: Ask user when information is incomplete**
 If the following key information is missing or ambiguous, set needs_clarification=true and ask a clarification question:
 - Time is unclear (e.g., "next week" but no specific day, "evening" but no specific hour)
@@ -90,7 +124,7 @@ Example 2 - Needs clarification:
 Example 3 - Partial information extractable, but still needs clarification:
 {{"events": [{{"title": "Meeting", "start_time": "2026-02-03T14:00:00", ...}}], "needs_clarification": true, "clarification_question": "I'm assuming it's next Monday at 2 PM, is that correct?", "search_keywords": ["meeting", "next week"], "confidence": 0.6, "date_hint": "next week"}}"""
 
-TEXT_PARSE_USER = "User input: {text}\nAdditional note: {additional_note}"
+TEXT_PARSE_USER = "Current time: {current_time}\nUser input: {text}\nAdditional note: {additional_note}"
 
 TEXT_PARSE_PROMPT = ChatPromptTemplate.from_messages([
     ("system", TEXT_PARSE_SYSTEM),
@@ -102,6 +136,7 @@ TEXT_PARSE_PROMPT = ChatPromptTemplate.from_messages([
 # Image Parsing Prompt
 # ============================================================================
 
+# Static system message (not a template); the current time is sent in the user message
 IMAGE_PARSE_SYSTEM_PROMPT = """You are a smart calendar assistant, skilled at recognizing event information from images (such as posters, flyers, screenshots).
 
 Please carefully analyze the image content and extract all possible event information. For each event, you need to:
@@ -111,8 +146,6 @@ Please carefully analyze the image content and extract all possible event inform
 4. Extract location information
 5. Extract event description and other relevant information
 
-Current time: {current_time}
-
 **IMPORTANT: Be DECISIVE and always extract what you can see**
 
 1. ALWAYS extract the event title if you can see any event name/title in the image
@@ -130,10 +163,15 @@ Please return results in JSON format:
 - date_hint: Any partial date information (e.g., "February 15-16", "next month", "2026")
 
 Example 1 - Complete information:
-{{"events": [{{"title": "Cursor AI Hackathon", "start_time": "2026-02-15T09:00:00", "end_time": "2026-02-16T18:00:00", "location": "Hamburg", "description": "2-day AI coding hackathon"}}], "needs_clarification": false, "clarification_question": null, "search_keywords": null, "confidence": 0.9, "date_hint": null}}
+{"events": [{"title": "Cursor AI Hackathon", "start_time": "2026-02-15T09:00:00", "end_time": "2026-02-16T18:00:00", "location": "Hamburg", "description": "2-day AI coding hackathon"}], "needs_clarification": false, "clarification_question": null, "search_keywords": null, "confidence": 0.9, "date_hint": null}
 
 Example 2 - Event found but time unknown (we will search):
-{{"events": [{{"title": "Berlin Tech Meetup", "start_time": null, "end_time": null, "location": "Berlin", "description": "Monthly tech meetup"}}], "needs_clarification": false, "clarification_question": null, "search_keywords": ["Berlin Tech Meetup", "2026", "date time"], "confidence": 0.4, "date_hint": null}}
+{"events": [{"title": "Berlin Tech Meetup", "start_time": null, "end_time": null, "location": "Berlin", "description": "Monthly tech meetup"}], "needs_clarification": false, "clarification_question": null, "search_keywords": ["Berlin Tech Meetup", "2026", "date time"], "confidence": 0.4, "date_hint": null}
 
 Example 3 - Event found with partial date:
-{{"events": [{{"title": "Hamburg Marathon", "start_time": null, "end_time": null, "location": "Hamburg", "description": "Annual marathon"}}], "needs_clarification": false, "clarification_question": null, "search_keywords": ["Hamburg Marathon", "April 2026"], "confidence": 0.6, "date_hint": "April 2026"}}"""
+{"events": [{"title": "Hamburg Marathon", "start_time": null, "end_time": null, "location": "Hamburg", "description": "Annual marathon"}], "needs_clarification": false, "clarification_question": null, "search_keywords": ["Hamburg Marathon", "April 2026"], "confidence": 0.6, "date_hint": "April 2026"}"""
+
+# Appended to the user message when several images are sent in one Vision call
+BATCH_IMAGE_PARSE_INSTRUCTION = """The {count} images above are labelled "Image 0" to "Image {last}".
+Extract the events from every image. For each event, set source_image_index to the number of the image it appears in.
+If the same event appears on several images, return it once, with the index of the image that shows it most completely."""
@@ -0,0 +1,188 @@
+"""
+Search Cache - Cache web search results and search-based event extraction
+
+Responsibilities:
+- Key searches on a normalized query: NFKC + case-folded words, punctuation
+  and stop words dropped, word order ignored, date hints canonicalized to
+  ISO dates ("15.02.2026" / "Feb 15, 2026" -> "2026-02-15")
+- Cache empty results for a shorter TTL (negative caching); failed provider
+  calls are not cached
+- Cache extract_event_details_from_search output per (result set hash,
+  partial event, model)
+- Count hits and misses in services.metrics
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from dateutil.parser import ParserError, isoparse, parse as parse_date
+
+from config import settings
+from services.cache import TTLCache
+from services.metrics import metrics
+
+# Words that do not change what a search engine returns for an event query
+STOP_WORDS = frozenset({
+    # English
+    "a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with",
+    # German
+    "am", "an", "auf", "bei", "das", "dem", "den", "der", "des", "die", "ein", "eine", "im",
+    "in", "mit", "und", "vom", "von", "zum", "zur",
+})
+
+# Only the first results go into the extraction prompt
+EXTRACTION_RESULTS = 5
+
+_DEFAULT_A = datetime(2000, 1, 1)
+_DEFAULT_B = datetime(2001, 2, 2)
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?!\d)")
+
+
+# ============================================================================
+# Keys
+# ============================================================================
+
+def query_terms(text: Optional[str]) -> List[str]:
+    """Case-folded words of a query without punctuation and stop words"""
+    words = re.findall(r"\w+", unicodedata.normalize("NFKC", text or "").casefold())
+    return [word for word in words if word not in STOP_WORDS]
+
+
+def canonical_date(hint: Optional[str]) -> Optional[str]:
+    """
+    ISO form of a date hint, or None if it is not a recognizable date
+
+    Args:
+        hint: e.g. "2026-02-15", "15.02.2026", "February 15, 2026", "Feb 2026"
+
+    Returns:
+        "2026-02-15", or "2026-02" when the hint has no day
+    """
+    if not hint or not hint.strip():
+        return None
+    hint = hint.strip()
+    # ISO dates are year-month-day; dayfirst is only for "15.02.2026" style hints
+    iso = bool(_ISO_DATE_RE.match(hint))
+    if iso:
+        try:
+            return isoparse(hint).date().isoformat()
+        except (ValueError, OverflowError):
+            pass
+    try:
+        # Parse with two different defaults: fields that differ were not in the hint
+        a = parse_date(hint, default=_DEFAULT_A, dayfirst=not iso)
+        b = parse_date(hint, default=_DEFAULT_B, dayfirst=not iso)
+    except (ParserError, ValueError, OverflowError):
+        return None
+    if a.year != b.year or a.month != b.month:
+        return None
+    if a.day != b.day:
+        return f"{a.year:04d}-{a.month:02d}"
+    return a.date().isoformat()
+
+
+def search_key(
+    query: str,
+    location_hint: Optional[str] = None,
+    date_hint: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Cache (and single-flight) key for one search
+
+    The provider receives "query location date", so location words are part
+    of the term set; unrecognized date hints are too.
+
+    Returns:
+        (sorted unique terms, canonical date or "")
+    """
+    date = canonical_date(date_hint)
+    terms = query_terms(query) + query_terms(location_hint)
+    if date is None:
+        terms += query_terms(date_hint)
+    return " ".join(sorted(set(terms))), date or ""
+
+
+def extraction_key(search_results: List, partial_event: Dict, model: Optional[str] = None) -> str:
+    """
+    Cache key for one search-based extraction
+
+    Args:
+        search_results: SearchResults (only the ones sent to the LLM count)
+        partial_event: Partial event information from initial parsing
+        model: Model name (default: settings.OPENAI_MODEL)
+    """
+    payload = json.dumps(
+        {
+            "results": [list(r) for r in search_results[:EXTRACTION_RESULTS]],
+            "event": partial_event,
+            "model": model or settings.OPENAI_MODEL,
+        },
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+class SearchCache:
+    """In-memory caches for search results and extraction output"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 21600.0,
+        negative_ttl: float = 900.0,
+        extraction_ttl: float = 21600.0,
+    ):
+        self.results = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.extractions = TTLCache(max_entries=max_entries, ttl=extraction_ttl)
+        self.negative_ttl = negative_ttl
+
+    def get_results(self, key: Tuple[str, str]) -> Optional[List]:
+        """Cached search results (possibly empty), or None on a miss"""
+        if not settings.ENABLE_SEARCH_CACHE:
+            return None
+        results = self.results.get(key)
+        metrics.inc("search_cache_requests_total", kind="search", result="miss" if results is None else "hit")
+        return None if results is None else list(results)
+
+    def put_results(self, key: Tuple[str, str], results: List):
+        """Store search results; empty results expire after negative_ttl"""
+        if not settings.ENABLE_SEARCH_CACHE:
+            return
+        self.results.set(key, tuple(results), ttl=None if results else self.negative_ttl)
+
+    def get_extraction(self, key: str):
+        """Cached EventSearchResult, or None on a miss"""
+        if not settings.ENABLE_SEARCH_CACHE:
+            return None
+        result = self.extractions.get(key)
+        metrics.inc("search_cache_requests_total", kind="extraction", result="miss" if result is None else "hit")
+        return result
+
+    def put_extraction(self, key: str, result):
+        """Store an EventSearchResult (None, also returned on LLM failure, is skipped)"""
+        if not settings.ENABLE_SEARCH_CACHE or result is None:
+            return
+        self.extractions.set(key, result)
+
+    def clear(self):
+        """Drop all entries"""
+        self.results.clear()
+        self.extractions.clear()
+
+
+# Global search cache
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=settings.SEARCH_CACHE_TTL_SECONDS,
+    negative_ttl=settings.SEARCH_CACHE_NEGATIVE_TTL_SECONDS,
+    extraction_ttl=settings.SEARCH_EXTRACTION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,195 @@
+"""
+Search Fan-out - Run query variants across providers concurrently and fuse the results
+
+Responsibilities:
+- Build query variants from the title and the location / date hints
+- Run every (provider, variant) search with bounded concurrency
+- Fuse the ranked lists with reciprocal rank fusion, de-duplicated by URL
+- Return early once enough results are confirmed by several lists
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from config import settings
+from logging_config import get_logger
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Query parameters that do not change the page
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "mc_cid", "mc_eid")
+
+
+def fanout_enabled() -> bool:
+    """Whether search_event_info fans out (SEARCH_FANOUT)"""
+    return settings.SEARCH_FANOUT
+
+
+def query_variants(
+    query: str,
+    location_hint: Optional[str] = None,
+    date_hint: Optional[str] = None,
+) -> List[str]:
+    """
+    Query variants for one search: title only, title + location, title + date
+
+    Args:
+        query: Event title / search query
+        location_hint: Optional location context
+        date_hint: Optional date context
+
+    Returns:
+        Distinct variants (case-insensitive), in that order
+    """
+    variants = [query]
+    if location_hint:
+        variants.append(f"{query} {location_hint}")
+    if date_hint:
+        variants.append(f"{query} {date_hint}")
+
+    distinct, seen = [], set()
+    for variant in variants:
+        key = " ".join(variant.lower().split())
+        if key not in seen:
+            seen.add(key)
+            distinct.append(variant)
+    return distinct
+
+
+def normalize_url(url: str) -> str:
+    """URL identity for de-duplication: scheme, "www.", trailing slash, fragment and tracking parameters ignored"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/")
+    return f"{host}{path}" + (f"?{urlencode(params)}" if params else "")
+
+
+def fuse_results(ranked_lists: List[List], k: int = 60, limit: Optional[int] = None) -> List:
+    """
+    Reciprocal rank fusion: score(url) = sum over lists of 1 / (k + rank)
+
+    Args:
+        ranked_lists: Result lists (SearchResult-like, with .link), best first
+        k: RRF constant (larger values flatten the rank differences)
+        limit: Maximum number of fused results
+
+    Returns:
+        De-duplicated results by descending score; each URL keeps the entry
+        from its best-ranked appearance
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, tuple] = {}  # url -> (rank, result)
+    for results in ranked_lists:
+        seen = set()
+        for rank, result in enumerate(results, 1):
+            url = normalize_url(result.link)
+            if url in seen:
+                continue
+            seen.add(url)
+            scores[url] = scores.get(url, 0.0) + 1.0 / (k + rank)
+            if url not in best or rank < best[url][0]:
+                best[url] = (rank, result)
+
+    # sorted() is stable: ties keep first-seen order
+    fused = [best[url][1] for url in sorted(scores, key=lambda url: -scores[url])]
+    return fused[:limit] if limit else fused
+
+
+def confirmed_urls(ranked_lists: List[List], min_lists: int) -> set:
+    """URLs that appear in at least min_lists result lists"""
+    counts: Dict[str, int] = {}
+    for results in ranked_lists:
+        for url in {normalize_url(result.link) for result in results}:
+            counts[url] = counts.get(url, 0) + 1
+    return {url for url, count in counts.items() if count >= min_lists}
+
+
+async def fan_out(
+    providers: Dict[str, Callable[[str], Awaitable[Optional[List]]]],
+    queries: List[str],
+    max_concurrency: Optional[int] = None,
+    early_results: Optional[int] = None,
+    min_agreement: Optional[int] = None,
+    k: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Optional[List]:
+    """
+    Search every query with every provider and fuse the results
+
+    Calls beyond max_concurrency wait for a slot. Once early_results URLs
+    appear in at least min_agreement completed lists, the remaining calls
+    are cancelled (early_results=0 always waits for all of them).
+
+    Args:
+        providers: Provider name -> search(query), returning None on failure
+        queries: Query variants, most important first
+        max_concurrency: Maximum calls in flight (default: SEARCH_FANOUT_MAX_CONCURRENCY)
+        early_results: Confirmed URLs needed to return early (default: SEARCH_FANOUT_EARLY_RESULTS)
+        min_agreement: Lists a URL must appear in to count as confirmed (default: SEARCH_FANOUT_MIN_AGREEMENT)
+        k: RRF constant (default: SEARCH_FANOUT_RRF_K)
+        limit: Maximum number of fused results (default: SEARCH_FANOUT_MAX_RESULTS)
+
+    Returns:
+        Fused results, or None if every call failed
+    """
+    max_concurrency = settings.SEARCH_FANOUT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+    early_results = settings.SEARCH_FANOUT_EARLY_RESULTS if early_results is None else early_results
+    min_agreement = settings.SEARCH_FANOUT_MIN_AGREEMENT if min_agreement is None else min_agreement
+    k = settings.SEARCH_FANOUT_RRF_K if k is None else k
+    limit = settings.SEARCH_FANOUT_MAX_RESULTS if limit is None else limit
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def call(provider: str, search, query: str) -> Optional[List]:
+        try:
+            async with semaphore:
+                results = await search(query)
+        except asyncio.CancelledError:
+            metrics.inc("search_fanout_calls_total", provider=provider, result="cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"[SEARCH-FANOUT] {provider} search failed: {e!r}")
+            results = None
+        metrics.inc("search_fanout_calls_total", provider=provider, result="failed" if results is None else "ok")
+        return results
+
+    tasks = [
+        asyncio.create_task(call(provider, search, query))
+        for query in queries
+        for provider, search in providers.items()
+    ]
+    ranked_lists, outcome = [], "complete"
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            results = await next_done
+            if results is None:
+                continue
+            ranked_lists.append(results)
+            if early_results and len(confirmed_urls(ranked_lists, min_agreement)) >= early_results:
+                outcome = "early"
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if not ranked_lists:
+        outcome = "failed"
+    metrics.inc("search_fanout_total", outcome=outcome)
+    metrics.histogram("search_fanout_duration_seconds", time.perf_counter() - started)
+    logger.info(
+        f"[SEARCH-FANOUT] {outcome}: {len(ranked_lists)}/{len(tasks)} result lists "
+        f"({len(queries)} queries x {len(providers)} providers)"
+    )
+    if not ranked_lists:
+        return None
+    return fuse_results(ranked_lists, k=k, limit=limit)
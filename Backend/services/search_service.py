@@ -4,14 +4,34 @@ Web Search Service - Search for event information using Google/SerpAPI
 When event information is incomplete, automatically search the web
 to find missing details.
 """
+import asyncio
+import ipaddress
 import json
-from typing import List, Optional, Dict, NamedTuple
+import socket
+import threading
+import time
+import weakref
+from typing import List, Optional, Dict, NamedTuple, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
 
 from config import settings
 from logging_config import get_logger
+from services.instrumentation import llm_stage
+from services.metrics import metrics
+from services.search_cache import extraction_key, search_cache, search_key
+from services.search_fanout import fan_out, fanout_enabled, query_variants
+from services.singleflight import SingleFlight
+from services.structured_data import parse_html, parse_ical, pick_event
 
 logger = get_logger(__name__)
 
+# Concurrent identical searches / extractions (double taps, client retries)
+# share one upstream call
+_search_flight = SingleFlight("search")
+_extraction_flight = SingleFlight("search_extraction")
+
 
 class SearchResult(NamedTuple):
     """Single search result"""
@@ -40,6 +60,33 @@ async def search_event_info(
 ) -> List[SearchResult]:
     """
     Search web for event information
+
+    Results are cached by normalized query (services.search_cache);
+    concurrent identical searches share one call.
+
+    Args:
+        query: Search query (e.g., "Hamburg Philharmonic Concert February 2026")
+        location_hint: Optional location context
+        date_hint: Optional date context
+
+    Returns:
+        List of search results
+    """
+    key = search_key(query, location_hint, date_hint)
+    cached = search_cache.get_results(key)
+    if cached is not None:
+        logger.info(f"[SEARCH] Cache hit for {key} - {len(cached)} results")
+        return cached
+    return await _search_flight.do(key, lambda: _search_event_info(query, location_hint, date_hint))
+
+
+async def _search_event_info(
+    query: str,
+    location_hint: Optional[str] = None,
+    date_hint: Optional[str] = None,
+) -> List[SearchResult]:
+    """
+    Search web for event information
     
     Args:
         query: Search query (e.g., "Hamburg Philharmonic Concert February 2026")
@@ -68,6 +115,9 @@ async def search_event_info(
         logger.info("[SEARCH] Search aborted - returning empty results")
         return []
 
+    if fanout_enabled():
+        return await _fanout_search(query, location_hint, date_hint, has_tavily, has_serpapi)
+
     # Build optimized query
     full_query = query
     if location_hint:
@@ -81,16 +131,14 @@ async def search_event_info(
         # Try Tavily first (preferred - AI-optimized search)
         if has_tavily:
             logger.info("[SEARCH] Attempting search with Tavily (preferred)...")
-            results = await _search_with_tavily(full_query)
-            logger.info(f"[SEARCH] Tavily search completed - returned {len(results)} results")
-            return results
+            results = await _timed_search("tavily", _search_with_tavily, full_query)
+            return _cache_results(query, location_hint, date_hint, results)
         
         # Fallback to SerpAPI
         if has_serpapi:
             logger.info("[SEARCH] Attempting search with SerpAPI (fallback)...")
-            results = await _search_with_serpapi(full_query)
-            logger.info(f"[SEARCH] SerpAPI search completed - returned {len(results)} results")
-            return results
+            results = await _timed_search("serpapi", _search_with_serpapi, full_query)
+            return _cache_results(query, location_hint, date_hint, results)
 
         logger.warning("[SEARCH] No search API key available (both keys are empty)")
         logger.info("[SEARCH] Search aborted - returning empty results")
@@ -102,21 +150,152 @@ async def search_event_info(
         return []
 
 
-async def _search_with_serpapi(query: str) -> List[SearchResult]:
-    """Search using SerpAPI (Google Search)"""
+async def _fanout_search(
+    query: str,
+    location_hint: Optional[str],
+    date_hint: Optional[str],
+    has_tavily: bool,
+    has_serpapi: bool,
+) -> List[SearchResult]:
+    """Search query variants across all configured providers concurrently (services.search_fanout)"""
+    searches = {"tavily": _search_with_tavily, "serpapi": _search_with_serpapi}
+    enabled = {"tavily": has_tavily, "serpapi": has_serpapi}
+    providers = {
+        name: (lambda q, name=name, search=search: _timed_search(name, search, q))
+        for name, search in searches.items()
+        if enabled[name]
+    }
+    queries = query_variants(query, location_hint, date_hint)
+    logger.info(f"[SEARCH] Fan-out: {queries} x {list(providers)}")
+
     try:
-        from serpapi import GoogleSearch
-        
-        params = {
-            "q": query,
-            "api_key": settings.SERPAPI_KEY,
-            "num": 5,
-            "hl": "en",  # Language
-        }
-        
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
+        results = await fan_out(providers, queries)
+    except Exception as e:
+        logger.error(f"[SEARCH] Fan-out search failed with error: {e}", exc_info=True)
+        return []
+    return _cache_results(query, location_hint, date_hint, results)
+
+
+def _cache_results(
+    query: str,
+    location_hint: Optional[str],
+    date_hint: Optional[str],
+    results: Optional[List[SearchResult]],
+) -> List[SearchResult]:
+    """Cache provider results (empty ones briefly); failed searches (None) are not cached"""
+    if results is None:
+        logger.info("[SEARCH] Search failed - returning empty results")
+        return []
+    logger.info(f"[SEARCH] Search completed - returned {len(results)} results")
+    search_cache.put_results(search_key(query, location_hint, date_hint), results)
+    return results
+
+
+async def _timed_search(provider: str, search, query: str) -> Optional[List[SearchResult]]:
+    """Run one provider search, recording search_request_duration_seconds{provider}"""
+    started = time.perf_counter()
+    cancelled = False
+    try:
+        return await search(query)
+    except asyncio.CancelledError:
+        cancelled = True  # Cut short by a fan-out early return: not a provider latency
+        raise
+    finally:
+        if not cancelled:
+            metrics.histogram("search_request_duration_seconds", time.perf_counter() - started, provider=provider)
+
+
+# ============================================================================
+# Search providers (shared pooled HTTP client)
+# ============================================================================
+
+class SearchHTTPClient:
+    """
+    Shared, connection-pooled async HTTP client for the search providers
+
+    One httpx.AsyncClient per event loop (the app has one; sync wrappers and
+    tests run their own loops), so connections are reused across searches.
+    """
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> httpx.AsyncClient:
+        """Client for the running event loop (created on first use)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.SEARCH_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.SEARCH_MAX_CONNECTIONS,
+                    ),
+                )
+                self._clients[loop] = client
+                logger.debug(f"Created pooled search HTTP client (max_connections={settings.SEARCH_MAX_CONNECTIONS})")
+            return client
+
+    async def aclose(self):
+        """Close the client of the running event loop (app shutdown)"""
+        with self._lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+# Global search HTTP client
+search_http = SearchHTTPClient()
+
+
+def provider_timeout(provider: str) -> float:
+    """Total seconds allowed for one request to a provider (default: WEB_SEARCH_TIMEOUT)"""
+    return float(settings.SEARCH_PROVIDER_TIMEOUTS.get(provider, settings.WEB_SEARCH_TIMEOUT))
+
+
+async def _provider_request(provider: str, method: str, url: str, **kwargs) -> dict:
+    """
+    One JSON request to a search provider on the shared client
+
+    Args:
+        provider: Provider name (for the timeout)
+        method: HTTP method
+        url: Endpoint URL
+        **kwargs: Passed to httpx (params, json, headers)
+
+    Returns:
+        Decoded JSON body
+
+    Raises:
+        asyncio.TimeoutError: The provider timeout elapsed
+        httpx.HTTPError: Connection error or non-2xx status
+    """
+    timeout = provider_timeout(provider)
+    response = await asyncio.wait_for(
+        search_http.get().request(method, url, timeout=timeout, **kwargs),
+        timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _search_with_serpapi(query: str) -> Optional[List[SearchResult]]:
+    """Search using SerpAPI (Google Search); None if the request failed"""
+    try:
+        results = await _provider_request(
+            "serpapi",
+            "GET",
+            f"{settings.SERPAPI_BASE_URL}/search.json",
+            params={
+                "engine": "google",
+                "q": query,
+                "api_key": settings.SERPAPI_KEY,
+                "num": 5,
+                "hl": "en",  # Language
+            },
+        )
+
         search_results = []
         for r in results.get("organic_results", []):
             search_results.append(SearchResult(
@@ -124,40 +303,35 @@ async def _search_with_serpapi(query: str) -> List[SearchResult]:
                 link=r.get("link", ""),
                 snippet=r.get("snippet", ""),
             ))
-        
+
         logger.info(f"SerpAPI returned {len(search_results)} results")
         return search_results
-        
-    except ImportError:
-        logger.error("serpapi package not installed. Install with: pip install google-search-results")
-        return []
+
     except Exception as e:
-        logger.error(f"SerpAPI search failed: {e}", exc_info=True)
-        return []
+        logger.error(f"SerpAPI search failed: {e!r}")
+        metrics.inc("search_errors_total", provider="serpapi")
+        return None
 
 
-async def _search_with_tavily(query: str) -> List[SearchResult]:
-    """Search using Tavily (AI-optimized search)"""
+async def _search_with_tavily(query: str) -> Optional[List[SearchResult]]:
+    """Search using Tavily (AI-optimized search); None if the request failed"""
     logger.info(f"[SEARCH-Tavily] Starting Tavily search for: {query}")
     try:
-        from tavily import TavilyClient
-
-        logger.info("[SEARCH-Tavily] Initializing Tavily client...")
-        client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-        
         logger.info("[SEARCH-Tavily] Sending search request (search_depth=advanced, max_results=5)...")
-        response = client.search(
-            query=query,
-            search_depth="advanced",
-            max_results=5,
+        response = await _provider_request(
+            "tavily",
+            "POST",
+            f"{settings.TAVILY_BASE_URL}/search",
+            json={"query": query, "search_depth": "advanced", "max_results": 5},
+            headers={"Authorization": f"Bearer {settings.TAVILY_API_KEY}"},
         )
 
         logger.debug(f"[SEARCH-Tavily] Received response from Tavily")
-        
+
         search_results = []
         results = response.get("results", [])
         logger.info(f"[SEARCH-Tavily] Found {len(results)} results")
-        
+
         for idx, r in enumerate(results, 1):
             search_results.append(SearchResult(
                 title=r.get("title", ""),
@@ -169,15 +343,10 @@ async def _search_with_tavily(query: str) -> List[SearchResult]:
         logger.info(f"[SEARCH-Tavily] Successfully processed {len(search_results)} results")
         return search_results
 
-    except ImportError:
-        logger.error(
-            "tavily package not installed. "
-            "Install with: pip install tavily-python"
-        )
-        return []
     except Exception as e:
-        logger.error(f"Tavily search failed: {e}", exc_info=True)
-        return []
+        logger.error(f"Tavily search failed: {e!r}")
+        metrics.inc("search_errors_total", provider="tavily")
+        return None
 
 
 async def extract_event_details_from_search(
@@ -187,6 +356,213 @@ async def extract_event_details_from_search(
     """
     Use LLM to extract structured event info from search results
 
+    With ENABLE_PAGE_FETCH, the top result pages are fetched first and
+    schema.org Event data (JSON-LD, microdata, linked iCal) is used when
+    found; the LLM is only called otherwise. Results are cached per
+    (result set, partial event, model); concurrent identical extractions
+    share one call.
+
+    Args:
+        search_results: List of search results from web
+        partial_event: Partial event information from initial parsing
+
+    Returns:
+        EventSearchResult with complete information, or None if fails
+    """
+    key = extraction_key(search_results, partial_event)
+    cached = search_cache.get_extraction(key)
+    if cached is not None:
+        logger.info("[SEARCH] Extraction cache hit")
+        return cached
+
+    async def extract():
+        result = None
+        if settings.ENABLE_PAGE_FETCH:
+            result = await _extract_structured_event(search_results, partial_event)
+        if result is None:
+            result = await _extract_event_details_from_search(search_results, partial_event)
+        search_cache.put_extraction(key, result)
+        return result
+
+    return await _extraction_flight.do(key, extract)
+
+
+# ============================================================================
+# Structured data from result pages (services/structured_data.py)
+# ============================================================================
+
+PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/calendar")
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+async def _resolve(host: str, port: int) -> List[str]:
+    """IP addresses for a host name"""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+async def _is_fetchable(url: str) -> bool:
+    """
+    http(s) URLs whose host does not resolve to a loopback / private address
+    (unless PAGE_FETCH_ALLOW_PRIVATE)
+
+    Every address the host resolves to must be public. Hosts that do not
+    resolve are not fetched.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    if settings.PAGE_FETCH_ALLOW_PRIVATE:
+        return True
+    host = parts.hostname
+    if host == "localhost" or host.endswith(".localhost"):
+        return False
+    try:
+        addresses = [host] if _is_ip(host) else await _resolve(host, parts.port or (443 if parts.scheme == "https" else 80))
+    except OSError:
+        return False
+    return bool(addresses) and all(
+        ipaddress.ip_address(address.split("%")[0]).is_global for address in addresses
+    )
+
+
+async def _fetch_page(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Fetch one result page within PAGE_FETCH_TIMEOUT and PAGE_FETCH_MAX_BYTES
+
+    Redirects are followed by hand (at most PAGE_FETCH_MAX_REDIRECTS) so that
+    every hop passes _is_fetchable.
+
+    Args:
+        url: Page URL
+
+    Returns:
+        (content type, text), or None if skipped, too large, timed out or failed
+    """
+    async def fetch() -> Tuple[str, Optional[str]]:
+        target = url
+        for _ in range(settings.PAGE_FETCH_MAX_REDIRECTS + 1):
+            if not await _is_fetchable(target):
+                logger.info(f"[SEARCH] Not fetching {target}")
+                return "skipped", None
+            async with search_http.get().stream(
+                "GET",
+                target,
+                timeout=settings.PAGE_FETCH_TIMEOUT,
+                follow_redirects=False,
+                headers={"Accept": "text/html,application/xhtml+xml,text/calendar;q=0.9"},
+            ) as response:
+                if response.is_redirect:
+                    target = urljoin(target, response.headers["location"])
+                    continue
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if response.status_code != 200 or content_type not in PAGE_CONTENT_TYPES:
+                    return "skipped", None
+                if int(response.headers.get("content-length") or 0) > settings.PAGE_FETCH_MAX_BYTES:
+                    return "too_large", None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > settings.PAGE_FETCH_MAX_BYTES:
+                        return "too_large", None
+                return "ok", (content_type, body.decode(response.encoding or "utf-8", errors="replace"))
+        return "too_many_redirects", None
+
+    try:
+        result, page = await asyncio.wait_for(fetch(), settings.PAGE_FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        result, page = "timeout", None
+    except Exception as e:
+        logger.info(f"[SEARCH] Page fetch failed for {url}: {e!r}")
+        result, page = "error", None
+    metrics.inc("page_fetch_total", result=result)
+    return page
+
+
+def _event_from_page(url: str, page: Tuple[str, str], title: Optional[str], date_hint: Optional[str]) -> Tuple[Optional[Dict], Optional[str]]:
+    """The page's schema.org Event, or else its first linked iCal file to try"""
+    content_type, text = page
+    if content_type == "text/calendar":
+        return pick_event(parse_ical(text, url), title, date_hint), None
+
+    data = parse_html(text, url)
+    event = pick_event(data.events, title, date_hint)
+    return event, (data.ical_links[0] if event is None and data.ical_links else None)
+
+
+async def _extract_structured_event(
+    search_results: List[SearchResult],
+    partial_event: Dict,
+) -> Optional[EventSearchResult]:
+    """
+    Read event details from the top result pages' structured data (no LLM call)
+
+    The pages are fetched concurrently, then the linked iCal files of the
+    pages ranked above the first page with an event, also concurrently: at
+    most two PAGE_FETCH_TIMEOUT rounds.
+
+    Args:
+        search_results: List of search results from web
+        partial_event: Partial event information from initial parsing
+
+    Returns:
+        EventSearchResult from the best-ranked page with a matching event, or None
+    """
+    urls = [r.link for r in search_results[:settings.PAGE_FETCH_MAX_PAGES] if r.link]
+    if not urls:
+        return None
+
+    started = time.perf_counter()
+    title = partial_event.get("title")
+    date_hint = partial_event.get("date_hint")
+    pages = await asyncio.gather(*(_fetch_page(url) for url in urls))
+    found = [
+        _event_from_page(url, page, title, date_hint) if page is not None else (None, None)
+        for url, page in zip(urls, pages)
+    ]
+
+    ical_links = []
+    for event, ical_link in found:  # Search rank order
+        if event is not None:
+            break
+        if ical_link and ical_link not in ical_links:
+            ical_links.append(ical_link)
+    ical_pages = dict(zip(ical_links, await asyncio.gather(*(_fetch_page(link) for link in ical_links))))
+
+    for url, (event, ical_link) in zip(urls, found):
+        if event is None and ical_link:
+            ical = ical_pages.get(ical_link)
+            if ical is not None and ical[0] == "text/calendar":
+                event = pick_event(parse_ical(ical[1], ical_link), title, date_hint)
+        if event is None:
+            continue
+        source = event.pop("source")
+        metrics.inc("structured_data_total", source=source)
+        metrics.histogram("structured_data_seconds", time.perf_counter() - started)
+        logger.info(f"[SEARCH] Structured event data ({source}) from {url}: {event['event_name']} at {event['start_time']}")
+        return EventSearchResult(**{**event, "event_name": event["event_name"] or title or "Unknown Event"})
+
+    metrics.inc("structured_data_total", source="none")
+    metrics.histogram("structured_data_seconds", time.perf_counter() - started)
+    logger.info("[SEARCH] No structured event data on result pages - using the LLM")
+    return None
+
+
+@llm_stage("search_extraction")
+async def _extract_event_details_from_search(
+    search_results: List[SearchResult],
+    partial_event: Dict,
+) -> Optional[EventSearchResult]:
+    """
+    Use LLM to extract structured event info from search results
+
     Args:
         search_results: List of search results from web
         partial_event: Partial event information from initial parsing
@@ -199,6 +575,7 @@ async def extract_event_details_from_search(
 
     try:
         from services.llm_service import get_llm
+        from services.prompt_budget import fit_text
 
         llm = get_llm()
 
@@ -207,6 +584,7 @@ async def extract_event_details_from_search(
             f"Source: {r.link}\nTitle: {r.title}\nSnippet: {r.snippet}"
             for r in search_results[:5]  # Limit to top 5 results
         ])
+        context = fit_text(context, node="search_extraction", name="search_results", line_based=True)
 
         prompt = f"""I have partial event information that needs to be completed for a calendar entry:
 - Title: {partial_event.get('title', 'Unknown')}
@@ -240,7 +618,7 @@ Notes:
 - If you cannot find specific information, return null for that field
 - Include organizer name in description if available"""
 
-        response = llm.invoke(prompt)
+        response = await llm.ainvoke(prompt)
 
         # Parse JSON response
         content = response.content
@@ -399,122 +777,39 @@ def is_event_complete(result: Dict) -> bool:
 
 
 # ============================================================================
-# Synchronous versions for use in non-async contexts
+# Synchronous wrappers for use in non-async contexts
 # ============================================================================
 
+def _run_sync(coro):
+    """Run a coroutine on a new event loop, closing that loop's search client afterwards"""
+    async def run():
+        try:
+            return await coro
+        finally:
+            await search_http.aclose()
+
+    return asyncio.run(run())
+
+
 def search_event_info_sync(
     query: str,
     location_hint: Optional[str] = None,
     date_hint: Optional[str] = None,
 ) -> List[SearchResult]:
     """
-    Synchronous version of search_event_info
+    Synchronous version of search_event_info (not callable from a running event loop)
     """
-    logger.info(f"[SEARCH-SYNC] Starting web search")
-    logger.info(f"[SEARCH-SYNC] Query: {query}")
-    
-    if not settings.ENABLE_WEB_SEARCH:
-        logger.info("[SEARCH-SYNC] Web search is disabled")
-        return []
+    return _run_sync(search_event_info(query, location_hint, date_hint))
 
-    has_serpapi = bool(settings.SERPAPI_KEY)
-    has_tavily = bool(settings.TAVILY_API_KEY)
-    
-    if not has_serpapi and not has_tavily:
-        logger.warning("[SEARCH-SYNC] No search API keys configured")
-        return []
 
-    full_query = query
-    if location_hint:
-        full_query += f" {location_hint}"
-    if date_hint:
-        full_query += f" {date_hint}"
-
-    logger.info(f"[SEARCH-SYNC] Full query: {full_query}")
-    
-    try:
-        # Try Tavily first (preferred - AI-optimized search)
-        if has_tavily:
-            logger.info("[SEARCH-SYNC] Using Tavily (preferred)...")
-            return _search_with_tavily_sync(full_query)
-        
-        # Fallback to SerpAPI
-        if has_serpapi:
-            logger.info("[SEARCH-SYNC] Using SerpAPI (fallback)...")
-            return _search_with_serpapi_sync(full_query)
-
-        return []
-
-    except Exception as e:
-        logger.error(f"[SEARCH-SYNC] Search failed: {e}", exc_info=True)
-        return []
-
-
-def _search_with_serpapi_sync(query: str) -> List[SearchResult]:
+def _search_with_serpapi_sync(query: str) -> Optional[List[SearchResult]]:
     """Synchronous SerpAPI search"""
-    try:
-        from serpapi import GoogleSearch
-        
-        params = {
-            "q": query,
-            "api_key": settings.SERPAPI_KEY,
-            "num": 5,
-            "hl": "en",
-        }
-        
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
-        search_results = []
-        for r in results.get("organic_results", []):
-            search_results.append(SearchResult(
-                title=r.get("title", ""),
-                link=r.get("link", ""),
-                snippet=r.get("snippet", ""),
-            ))
-        
-        logger.info(f"[SEARCH-SYNC] SerpAPI returned {len(search_results)} results")
-        return search_results
-        
-    except ImportError:
-        logger.error("[SEARCH-SYNC] serpapi not installed")
-        return []
-    except Exception as e:
-        logger.error(f"[SEARCH-SYNC] SerpAPI failed: {e}")
-        return []
+    return _run_sync(_search_with_serpapi(query))
 
 
-def _search_with_tavily_sync(query: str) -> List[SearchResult]:
+def _search_with_tavily_sync(query: str) -> Optional[List[SearchResult]]:
     """Synchronous Tavily search"""
-    logger.info(f"[SEARCH-SYNC-Tavily] Searching: {query}")
-    try:
-        from tavily import TavilyClient
-
-        client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-        
-        response = client.search(
-            query=query,
-            search_depth="advanced",
-            max_results=5,
-        )
-        
-        search_results = []
-        for r in response.get("results", []):
-            search_results.append(SearchResult(
-                title=r.get("title", ""),
-                link=r.get("url", ""),
-                snippet=r.get("content", ""),
-            ))
-        
-        logger.info(f"[SEARCH-SYNC] Tavily returned {len(search_results)} results")
-        return search_results
-        
-    except ImportError:
-        logger.error("[SEARCH-SYNC] tavily not installed")
-        return []
-    except Exception as e:
-        logger.error(f"[SEARCH-SYNC] Tavily failed: {e}")
-        return []
+    return _run_sync(_search_with_tavily(query))
 
 
 def extract_event_details_from_search_sync(
@@ -524,64 +819,4 @@ def extract_event_details_from_search_sync(
     """
     Synchronous version of extract_event_details_from_search
     """
-    if not search_results:
-        return None
-
-    try:
-        from services.llm_service import get_llm
-
-        llm = get_llm()
-
-        context = "\n\n".join([
-            f"Source: {r.link}\nTitle: {r.title}\nSnippet: {r.snippet}"
-            for r in search_results[:5]
-        ])
-
-        prompt = f"""I have partial event information that needs to be completed:
-- Title: {partial_event.get('title', 'Unknown')}
-- Date hint: {partial_event.get('date_hint', 'Unknown')}
-- Location hint: {partial_event.get('location_hint', 'Unknown')}
-
-Web search results:
-{context}
-
-Extract event details in JSON:
-{{
-    "event_name": "Full event name",
-    "start_time": "ISO 8601 (e.g., 2026-02-15T09:00:00)",
-    "end_time": "ISO 8601 or null",
-    "location": "Venue name",
-    "venue_address": "Full address",
-    "description": "Brief description",
-    "ticket_url": "URL or null",
-    "price_range": "Price or null",
-    "source_url": "Source URL"
-}}
-
-Use T00:00:00 for all-day events if only date is available."""
-
-        response = llm.invoke(prompt)
-
-        content = response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-
-        result_data = json.loads(content.strip())
-
-        return EventSearchResult(
-            event_name=result_data.get("event_name", partial_event.get("title", "Unknown")),
-            start_time=result_data.get("start_time"),
-            end_time=result_data.get("end_time"),
-            location=result_data.get("location"),
-            venue_address=result_data.get("venue_address"),
-            description=result_data.get("description"),
-            ticket_url=result_data.get("ticket_url"),
-            price_range=result_data.get("price_range"),
-            source_url=result_data.get("source_url", search_results[0].link if search_results else ""),
-        )
-
-    except Exception as e:
-        logger.error(f"[SEARCH-SYNC] Failed to extract event details: {e}")
-        return None
+    return _run_sync(extract_event_details_from_search(search_results, partial_event))
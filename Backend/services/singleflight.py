@@ -0,0 +1,95 @@
+"""
+Single-Flight - Coalesce concurrent identical async calls
+
+Responsibilities:
+- Run one upstream call per key at a time; concurrent callers with the same
+  key await the in-flight call instead of issuing their own
+- Cancel the upstream call only when every waiting caller has gone away
+- Count leaders and coalesced callers per group in services.metrics
+
+Keys should match the corresponding result cache key, so a double tap that
+misses the cache (the first call has not finished yet) still costs one call.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from config import settings
+from logging_config import get_logger
+from services.metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """One in-flight upstream call"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Per-group registry of in-flight calls"""
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() unless an identical call is in flight, then share its result
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine factory performing the upstream call
+
+        Returns:
+            The (shared) result of fn(); exceptions are shared as well
+        """
+        if not settings.ENABLE_SINGLEFLIGHT:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, k=key, c=call: self._forget(k, c))
+            metrics.inc("singleflight_requests_total", group=self.group, result="leader")
+        else:
+            metrics.inc("singleflight_requests_total", group=self.group, result="coalesced")
+            logger.info(f"Coalesced identical in-flight call ({self.group})")
+
+        call.waiters += 1
+        try:
+            # Shielded so one caller's cancellation does not cancel the others
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight"""
+        return len(self._calls)
+
+
+def coalesced_count(group: str) -> int:
+    """Callers of a group that shared another caller's in-flight call"""
+    return int(metrics.counter("singleflight_requests_total", group=group, result="coalesced"))
+
+
+def freeze(value: Any) -> Hashable:
+    """Turn dicts/lists (e.g. partial_event) into a hashable key component"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
@@ -0,0 +1,467 @@
+"""
+Structured Data - Read schema.org Event data from event pages
+
+Responsibilities:
+- Find schema.org Event objects in JSON-LD scripts and microdata
+- Find linked iCalendar files (.ics / webcal: / text/calendar links)
+- Read VEVENTs from iCalendar data
+- Map events to EventSearchResult fields (ISO start/end time, venue,
+  address, ticket URL, price range)
+
+Pages are parsed with the standard library HTML parser; nothing is fetched
+here (see search_service.extract_event_details_from_search).
+"""
+import html as html_lib
+import json
+import re
+from datetime import date, datetime, timedelta
+from html.parser import HTMLParser
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+from zoneinfo import ZoneInfo
+
+from dateutil.parser import ParserError, isoparse
+from icalendar import Calendar
+
+from config import settings
+from logging_config import get_logger
+from services.search_cache import canonical_date
+
+logger = get_logger(__name__)
+
+# Elements without an end tag
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+})
+
+# Microdata properties whose value is an attribute rather than the element text
+URL_ATTRIBUTES = {"a": "href", "area": "href", "link": "href", "img": "src", "source": "src", "embed": "src"}
+
+# An event name must contain more than this share of the title's words
+MIN_TITLE_MATCH = 0.5
+
+
+class PageData(NamedTuple):
+    """Structured data found on one page"""
+    events: List[Dict]  # EventSearchResult fields + "source" (json_ld / microdata)
+    ical_links: List[str]
+
+
+# ============================================================================
+# HTML
+# ============================================================================
+
+class _PageParser(HTMLParser):
+    """Collects JSON-LD scripts, top-level microdata items and iCal links"""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.json_ld: List[str] = []
+        self.items: List[Dict] = []
+        self.ical_links: List[str] = []
+        self._script: Optional[List[str]] = None
+        # Open elements: {"tag", "scope" (item for child properties), "props", "text"}
+        self._stack: List[Dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+
+        if tag == "script" and attrs.get("type", "").lower().startswith("application/ld+json"):
+            self._script = []
+            return
+
+        self._collect_ical_link(tag, attrs)
+
+        parent = self._stack[-1]["scope"] if self._stack else None
+        props = attrs.get("itemprop", "").split()
+        entry = {"tag": tag, "scope": parent, "props": [], "text": None}
+
+        if "itemscope" in attrs:
+            item = {"@type": attrs.get("itemtype", "").split(" ")[0]}
+            if props and parent is not None:
+                for prop in props:
+                    parent.setdefault(prop, item)
+            else:
+                self.items.append(item)
+            entry["scope"] = item
+        elif props and parent is not None:
+            value = self._attribute_value(tag, attrs)
+            if value is not None:
+                for prop in props:
+                    parent.setdefault(prop, value)
+            elif tag not in VOID_TAGS:
+                entry["props"] = props
+                entry["text"] = []
+
+        if tag not in VOID_TAGS:
+            self._stack.append(entry)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self._stack and self._stack[-1]["tag"] == tag:
+            self._close(self._stack.pop())
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._script is not None:
+            self.json_ld.append("".join(self._script))
+            self._script = None
+            return
+        if not any(entry["tag"] == tag for entry in self._stack):
+            return
+        while self._stack:
+            entry = self._stack.pop()
+            self._close(entry)
+            if entry["tag"] == tag:
+                break
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+            return
+        for entry in self._stack:
+            if entry["text"] is not None:
+                entry["text"].append(data)
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._close(self._stack.pop())
+
+    def _close(self, entry: Dict):
+        if entry["text"] is None or entry["scope"] is None:
+            return
+        # Chunks are split at child tags (<br>, <span>), so join them with spaces
+        text = " ".join(" ".join(entry["text"]).split())
+        for prop in entry["props"]:
+            entry["scope"].setdefault(prop, text)
+
+    def _attribute_value(self, tag: str, attrs: Dict[str, str]) -> Optional[str]:
+        if "content" in attrs:
+            return attrs["content"]
+        if tag == "time" and attrs.get("datetime"):
+            return attrs["datetime"]
+        if tag in URL_ATTRIBUTES and attrs.get(URL_ATTRIBUTES[tag]):
+            return urljoin(self.base_url, attrs[URL_ATTRIBUTES[tag]])
+        return None
+
+    def _collect_ical_link(self, tag: str, attrs: Dict[str, str]):
+        href = attrs.get("href", "").strip()
+        if tag not in ("a", "link") or not href:
+            return
+        is_ical = (
+            href.lower().startswith("webcal:")
+            or urlsplit(href).path.lower().endswith(".ics")
+            or attrs.get("type", "").lower() == "text/calendar"
+        )
+        if is_ical:
+            if href.lower().startswith("webcal:"):
+                href = "https:" + href[len("webcal:"):]
+            url = urljoin(self.base_url, href)
+            if url not in self.ical_links:
+                self.ical_links.append(url)
+
+
+def parse_html(html: str, base_url: str = "") -> PageData:
+    """
+    Find schema.org Events (JSON-LD first, then microdata) and iCal links in a page
+
+    Args:
+        html: Page HTML
+        base_url: Page URL (relative links are resolved against it)
+
+    Returns:
+        PageData with the events that have a name or start date
+    """
+    parser = _PageParser(base_url)
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logger.warning(f"[STRUCTURED] Could not parse {base_url or 'page'}: {e}")
+
+    events = []
+    for script in parser.json_ld:
+        try:
+            data = json.loads(script)
+        except ValueError:
+            # Some sites emit trailing commas or HTML comments; skip those scripts
+            continue
+        for obj in _find_events(data):
+            events.append({**event_fields(obj, base_url), "source": "json_ld"})
+    for item in parser.items:
+        for obj in _find_events(item):
+            events.append({**event_fields(obj, base_url), "source": "microdata"})
+
+    return PageData(
+        events=[e for e in events if e["event_name"] or e["start_time"]],
+        ical_links=parser.ical_links,
+    )
+
+
+def _type_names(obj: Dict) -> List[str]:
+    types = obj.get("@type") or []
+    if isinstance(types, str):
+        types = [types]
+    # "http://schema.org/MusicEvent", "schema:MusicEvent" -> "MusicEvent"
+    return [re.split(r"[/:#]", str(t))[-1] for t in types]
+
+
+def _is_event(obj: Dict) -> bool:
+    return any(name.endswith("Event") or name == "Festival" for name in _type_names(obj))
+
+
+def _find_events(data: Any) -> List[Dict]:
+    """Event objects anywhere in a JSON-LD document or microdata item (@graph, lists, nested objects)"""
+    if isinstance(data, list):
+        return [event for value in data for event in _find_events(value)]
+    if not isinstance(data, dict):
+        return []
+    if _is_event(data):
+        return [data]
+    return [event for value in data.values() for event in _find_events(value)]
+
+
+# ============================================================================
+# Field mapping
+# ============================================================================
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _text(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@value") or value.get("url")
+    if value is None:
+        return None
+    # JSON-LD values are often HTML-escaped ("&amp;")
+    text = " ".join(html_lib.unescape(str(value)).split())
+    return text or None
+
+
+def _local_time(dt: datetime) -> str:
+    """
+    Naive local time for an event datetime
+
+    Times with a non-UTC offset are already the venue's wall-clock time and
+    keep it. UTC times (a "Z" suffix is common in feeds) are converted to
+    EVENT_TIMEZONE.
+    """
+    if dt.tzinfo is not None and dt.utcoffset() == timedelta(0):
+        dt = dt.astimezone(ZoneInfo(settings.EVENT_TIMEZONE))
+    return dt.replace(tzinfo=None).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def normalize_datetime(value: Any) -> Optional[str]:
+    """
+    ISO 8601 local datetime as used for event times ("2026-02-15T19:30:00")
+
+    See _local_time for UTC offsets. Date-only values become midnight
+    (all-day events).
+    """
+    value = _text(value)
+    if not value:
+        return None
+    try:
+        parsed = isoparse(value)
+    except (ParserError, ValueError, OverflowError):
+        return None
+    return _local_time(parsed)
+
+
+def _address(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        street = _text(value.get("streetAddress"))
+        city = " ".join(filter(None, [_text(value.get("postalCode")), _text(value.get("addressLocality"))]))
+        country = value.get("addressCountry")
+        country = _text(country) if isinstance(country, (str, dict)) else None
+        return ", ".join(filter(None, [street, city, country])) or None
+    return _text(value)
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _offers(value: Any) -> tuple:
+    """(ticket URL, price range) from Offer / AggregateOffer objects"""
+    offers = [o for o in (value if isinstance(value, list) else [value]) if isinstance(o, dict)]
+    ticket_url = next((_text(o.get("url")) for o in offers if o.get("url")), None)
+
+    prices, currency = [], None
+    for offer in offers:
+        for key in ("price", "lowPrice", "highPrice"):
+            price = _price(offer.get(key))
+            if price is not None:
+                prices.append(price)
+        currency = currency or _text(offer.get("priceCurrency"))
+
+    if not prices:
+        return ticket_url, None
+    if max(prices) == 0:
+        return ticket_url, "Free"
+
+    def fmt(price: float) -> str:
+        return f"{price:g}"
+
+    low, high = min(prices), max(prices)
+    price_range = fmt(low) if low == high else f"{fmt(low)} - {fmt(high)}"
+    return ticket_url, f"{price_range} {currency}" if currency else price_range
+
+
+def event_fields(obj: Dict, base_url: str = "") -> Dict:
+    """
+    Map a schema.org Event object to EventSearchResult fields
+
+    Args:
+        obj: Event from JSON-LD or microdata
+        base_url: Page URL (default source_url)
+
+    Returns:
+        Dict with event_name, start_time, end_time, location, venue_address,
+        description, ticket_url, price_range, source_url
+    """
+    location = _first(obj.get("location"))
+    if isinstance(location, dict):
+        venue = _text(location.get("name"))
+        address = _address(location.get("address"))
+    else:
+        venue, address = _text(location), None
+
+    ticket_url, price_range = _offers(obj.get("offers"))
+    url = _text(obj.get("url"))
+
+    return {
+        "event_name": _text(obj.get("name")),
+        "start_time": normalize_datetime(obj.get("startDate")),
+        "end_time": normalize_datetime(obj.get("endDate")),
+        "location": venue or address,
+        "venue_address": address,
+        "description": _text(obj.get("description")),
+        "ticket_url": urljoin(base_url, ticket_url) if ticket_url else None,
+        "price_range": price_range,
+        "source_url": urljoin(base_url, url) if url else base_url,
+    }
+
+
+# ============================================================================
+# iCalendar
+# ============================================================================
+
+def _ical_time(value) -> Optional[str]:
+    if value is None:
+        return None
+    dt = value.dt
+    if isinstance(dt, datetime):
+        return _local_time(dt)
+    if isinstance(dt, date):
+        return dt.strftime("%Y-%m-%dT00:00:00")
+    return None
+
+
+def parse_ical(data: str, source_url: str = "") -> List[Dict]:
+    """
+    Read VEVENTs from iCalendar data
+
+    Args:
+        data: .ics file content
+        source_url: URL the file was fetched from
+
+    Returns:
+        EventSearchResult field dicts with "source": "ical"
+    """
+    try:
+        calendar = Calendar.from_ical(data)
+    except Exception as e:
+        logger.warning(f"[STRUCTURED] Invalid iCalendar data from {source_url or 'page'}: {e}")
+        return []
+
+    events = []
+    for component in calendar.walk("VEVENT"):
+        location = _text(component.get("location"))
+        events.append({
+            "event_name": _text(component.get("summary")),
+            "start_time": _ical_time(component.get("dtstart")),
+            "end_time": _ical_time(component.get("dtend")),
+            "location": location,
+            "venue_address": location,
+            "description": _text(component.get("description")),
+            "ticket_url": None,
+            "price_range": None,
+            "source_url": _text(component.get("url")) or source_url,
+            "source": "ical",
+        })
+    return events
+
+
+# ============================================================================
+# Selection
+# ============================================================================
+
+def _words(text: Optional[str]) -> set:
+    return set(re.findall(r"\w+", (text or "").casefold()))
+
+
+def _now() -> datetime:
+    return datetime.now()
+
+
+def _fits_dates(event: Dict, date_hint: Optional[str], now: datetime) -> bool:
+    """
+    Whether the event is not over yet and overlaps the date hint
+
+    Result pages are often about an earlier edition of the event; a hint that
+    is not a recognizable date does not restrict anything.
+    """
+    last = event["end_time"] or event["start_time"]
+    if last < now.strftime("%Y-%m-%dT%H:%M:%S"):
+        return False
+    wanted = canonical_date(date_hint)
+    if not wanted:
+        return True
+    return event["start_time"][:len(wanted)] <= wanted <= last[:len(wanted)]
+
+
+def pick_event(
+    events: List[Dict],
+    title: Optional[str] = None,
+    date_hint: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> Optional[Dict]:
+    """
+    The event a page is about: the upcoming dated event whose name shares
+    the most words with the title
+
+    Pages are often about a different event than the one searched for (a
+    "Hamburg Marathon" search can return the Berlin Marathon page, or last
+    year's edition), so even a page's only event is used only if its name
+    contains more than MIN_TITLE_MATCH of the title's words, it has not
+    ended yet and it overlaps the date hint.
+
+    Args:
+        events: Events found on one page
+        title: Title from the partial event
+        date_hint: Date hint from the partial event
+        now: Reference time (default: now)
+
+    Returns:
+        Event dict, or None
+    """
+    wanted = _words(title)
+    now = now or _now()
+    dated = [event for event in events if event["start_time"] and _fits_dates(event, date_hint, now)]
+    if not wanted or not dated:
+        return None
+
+    scored = [
+        (len(wanted & _words(event["event_name"])), -index, event)
+        for index, event in enumerate(dated)
+    ]
+    overlap, _, best = max(scored, key=lambda s: s[:2])
+    return best if overlap / len(wanted) > MIN_TITLE_MATCH else None
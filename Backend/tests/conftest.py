@@ -3,7 +3,12 @@ Pytest 配置和共享 fixtures
 
 测试使用独立的内存数据库，完全隔离生产数据库
 """
+import asyncio
+import json
 import os
+import socket
+import threading
+import time
 from pathlib import Path
 
 # 加载 .env 文件（在设置其他环境变量之前）
@@ -12,7 +17,11 @@ env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
 import pytest
+import uvicorn
 from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -30,9 +39,12 @@ test_engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
 # 导入模型的 Base（在创建引擎之后）
+from config import settings
 from database import Base, get_db
 from main import app
 from models import User, Event
+from services.agent import graph as agent_graph
+from services.metrics import metrics
 
 
 @pytest.fixture(scope="function")
@@ -116,3 +128,118 @@ def test_user():
         "password": "alice123",
         "token": "alice123",
     }
+
+
+@pytest.fixture(autouse=True)
+def clean_search_cache():
+    """每个测试使用空的搜索缓存（全局缓存会让相同查询跨测试命中）"""
+    from services.search_cache import search_cache
+
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """每个测试使用空的指标注册表（全局 metrics 会让计数跨测试累加）"""
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+@pytest.fixture(scope="session")
+def local_server():
+    """
+    在本地随机端口上用 uvicorn（后台线程）启动 ASGI 应用
+
+    返回 start(app) -> base URL；会话结束时关闭所有启动的服务。
+    """
+    running = []
+
+    def start(app) -> str:
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+        running.append((server, thread))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    yield start
+    for server, thread in running:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+# ============================================================================
+# Fake agent LLM
+# ============================================================================
+
+TOOL_CALL_PREFIX = "TOOL_CALL:"
+
+
+def tool_call_response(name: str, args: dict) -> str:
+    """Fake response that CountingFakeLLM answers as a tool call"""
+    return f"{TOOL_CALL_PREFIX}{name}:{json.dumps(args)}"
+
+
+class CountingFakeLLM(FakeListChatModel):
+    """Fake chat model that replays responses in order, counts calls and simulates async latency"""
+    calls: int = 0
+    latency: float = 0.0
+    in_flight: int = 0
+    max_in_flight: int = 0  # Most calls waiting on the simulated latency at once
+
+    async def _wait(self):
+        if not self.latency:
+            return
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await self._wait()
+        result = self._generate(messages, stop=stop, **kwargs)
+        text = result.generations[0].message.content
+        if text.startswith(TOOL_CALL_PREFIX):
+            name, _, args = text[len(TOOL_CALL_PREFIX):].partition(":")
+            message = AIMessage(content="", tool_calls=[{"name": name, "args": json.loads(args), "id": "call_1"}])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await self._wait()
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs):
+        # Responses built with tool_call_response() are answered as tool calls
+        return self
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Patch the agent LLM factory with a counting fake (local intent fast path disabled)"""
+    monkeypatch.setattr(settings, "ENABLE_INTENT_FASTPATH", False)
+
+    def install(responses, latency: float = 0.0):
+        llm = CountingFakeLLM(responses=responses, latency=latency)
+        monkeypatch.setattr(agent_graph, "get_llm", lambda: llm)
+        return llm
+    return install
+
+
+async def collect_stream(**kwargs) -> list:
+    """Run the streaming agent and collect all chunks"""
+    return [chunk async for chunk in agent_graph.run_agent_stream(**kwargs)]
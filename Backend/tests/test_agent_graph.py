@@ -0,0 +1,385 @@
+"""
+Agent 图流程测试
+
+使用假 LLM 替代 OpenAI，统计每轮对话的 LLM 调用次数，无需 OPENAI_API_KEY。
+"""
+import asyncio
+import base64
+import io
+import re
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from config import settings
+from models import Event, User
+from schemas import ParsedEvent
+from services.agent import graph as agent_graph
+from services.llm_resilience import reset_breakers
+from services.metrics import metrics
+from tests.conftest import CountingFakeLLM, collect_stream, tool_call_response
+
+
+@pytest.mark.asyncio
+async def test_stream_query_classifies_once(db, fake_llm):
+    """流式查询：一次意图分类 + 一次查询回答"""
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    db.add(Event(
+        user_id=user_id,
+        title="Team meeting",
+        start_time=datetime.now() + timedelta(days=1),
+        source_type="manual",
+    ))
+    db.commit()
+
+    llm = fake_llm([
+        '{"intent": "query_event", "confidence": 0.9}',
+        "Tomorrow you have: Team meeting",
+    ])
+
+    chunks = await collect_stream(message="when is the team meeting", user_id=user_id, db=db)
+
+    assert {"type": "intent", "intent": "query_event"} in chunks
+    assert chunks[-1] == {"type": "done"}
+    assert llm.calls == 2
+
+    # The query answer is streamed token by token instead of as one content chunk
+    tokens = [c["token"] for c in chunks if c["type"] == "token"]
+    assert "".join(tokens) == "Tomorrow you have: Team meeting"
+    assert len(tokens) > 1
+    assert not [c for c in chunks if c["type"] == "content"]
+
+
+@pytest.mark.asyncio
+async def test_stream_query_templated_answer(db, fake_llm):
+    """常见时间范围的查询直接由模板回答，只调用一次意图分类"""
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    tomorrow = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    db.add(Event(user_id=user_id, title="Team meeting", start_time=tomorrow, location="Room 201", source_type="manual"))
+    db.add(Event(user_id=user_id, title="Next month trip", start_time=tomorrow + timedelta(days=40), source_type="manual"))
+    db.commit()
+
+    llm = fake_llm(['{"intent": "query_event", "confidence": 0.9}'])
+
+    chunks = await collect_stream(message="what do I have tomorrow", user_id=user_id, db=db)
+
+    assert llm.calls == 1
+    content = "".join(c["content"] for c in chunks if c["type"] == "content")
+    assert "You have 1 event tomorrow" in content
+    assert "**Team meeting** — 10:00" in content
+    action = [c for c in chunks if c["type"] == "action"][0]["action_result"]
+    assert [e["title"] for e in action["events"]] == ["Team meeting"]
+
+
+@pytest.mark.asyncio
+async def test_stream_create_event_classifies_once(db, fake_llm):
+    """流式创建：一次意图分类 + 一次信息提取"""
+    start = (datetime.now() + timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0)
+    llm = fake_llm([
+        '{"intent": "create_event", "confidence": 0.95}',
+        f'{{"complete": true, "title": "Dentist", "start_time": "{start.isoformat()}"}}',
+    ])
+
+    chunks = await collect_stream(message="dentist tomorrow at 3pm", user_id=1, db=db)
+
+    actions = [c for c in chunks if c["type"] == "action"]
+    assert actions and actions[0]["action_result"]["event_title"] == "Dentist"
+    assert llm.calls == 2
+    # The JSON extraction call is internal and must not leak as tokens
+    assert not [c for c in chunks if c["type"] == "token"]
+    assert [c for c in chunks if c["type"] == "content"]
+
+
+@pytest.mark.asyncio
+async def test_combined_extraction_creates_event_in_one_call(db, fake_llm):
+    """意图分类与信息提取合并为一次工具调用：创建活动只需一次 LLM 往返"""
+    start = (datetime.now() + timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0)
+    llm = fake_llm([tool_call_response("IntentExtraction", {
+        "intent": "create_event",
+        "confidence": 0.95,
+        "event": {"complete": True, "title": "Dentist", "start_time": start.isoformat()},
+    })])
+
+    chunks = await collect_stream(message="dentist tomorrow at 3pm", user_id=1, db=db)
+
+    actions = [c for c in chunks if c["type"] == "action"]
+    assert actions and actions[0]["action_result"]["event_title"] == "Dentist"
+    assert llm.calls == 1
+    saved = db.query(Event).filter(Event.title == "Dentist").first()
+    assert saved.start_time == start
+
+
+@pytest.mark.asyncio
+async def test_combined_extraction_update_skips_update_call(db, fake_llm, monkeypatch):
+    """更新：分类调用已返回要修改的字段时跳过 EVENT_UPDATE_PROMPT"""
+    monkeypatch.setattr(settings, "EVENT_MATCH_SKIP_LLM", True)
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    db.add(Event(user_id=user_id, title="Dentist appointment", start_time=datetime.now() + timedelta(days=2), source_type="manual"))
+    db.commit()
+    new_start = (datetime.now() + timedelta(days=4)).replace(hour=15, minute=0, second=0, microsecond=0)
+
+    llm = fake_llm([tool_call_response("IntentExtraction", {
+        "intent": "update_event",
+        "confidence": 0.9,
+        "update": {"start_time": new_start.isoformat(), "location": None},
+    })])
+
+    result = await agent_graph.run_agent(message="move my dentist appointment to friday 3pm", user_id=user_id, db=db)
+
+    assert result["intent"] == "update_event"
+    assert llm.calls == 1
+    event = db.query(Event).filter(Event.title == "Dentist appointment").first()
+    assert event.start_time == new_start
+
+
+@pytest.mark.asyncio
+async def test_combined_extraction_invalid_payload_defaults_to_chat(db, fake_llm):
+    """工具调用参数校验失败时按 chat 处理"""
+    llm = fake_llm([
+        tool_call_response("IntentExtraction", {"intent": "book_flight", "confidence": 0.9}),
+        "How can I help?",
+    ])
+
+    result = await agent_graph.run_agent(message="book me a flight", user_id=1, db=db)
+
+    assert result["intent"] == "chat"
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_graph_enters_at_routed_node(db, fake_llm):
+    """预先分类的状态直接进入处理节点"""
+    llm = fake_llm(["Hello there!"])
+
+    result = await agent_graph.get_agent_graph().ainvoke(agent_graph.AgentState(
+        message="hi",
+        image_base64=None,
+        images_base64=None,
+        user_id=1,
+        conversation_history="",
+        intent="chat",
+        confidence=1.0,
+        response="",
+        action_result=None,
+        db=db,
+    ))
+
+    assert result["response"] == "Hello there!"
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_tokens_through_resilient_wrapper(db, monkeypatch):
+    """生产路径：真实的 ResilientChatModel 包装假模型，STREAM_TAG 的 token 经 run_agent_stream 转发"""
+    monkeypatch.setattr(settings, "ENABLE_INTENT_FASTPATH", False)
+    monkeypatch.setattr(settings, "ENABLE_LLM_RESILIENCE", True)
+    reset_breakers()
+    llm = CountingFakeLLM(responses=['{"intent": "chat", "confidence": 0.9}', "Hello there!"])
+    # Only the raw client is replaced; agent_graph.get_llm() still wraps it
+    monkeypatch.setattr(agent_graph, "get_chat_model", lambda *args, **kwargs: llm)
+
+    chunks = await collect_stream(message="hello", user_id=1, db=db)
+
+    tokens = [c["token"] for c in chunks if c["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Hello there!"
+    assert chunks[-1]["type"] == "done"
+    # Both calls went through the wrapper
+    assert llm.calls == 2
+    assert metrics.counter("llm_requests_total", model=settings.OPENAI_MODEL, result="ok") == 2
+
+
+@pytest.mark.asyncio
+async def test_parallel_chats_do_not_block_each_other(db, fake_llm):
+    """50 个并发对话的 LLM 调用应同时进行（LLM 调用不阻塞事件循环）"""
+    llm = fake_llm(['{"intent": "chat", "confidence": 0.9}', "Hi!"], latency=0.2)
+
+    results = await asyncio.gather(*(
+        agent_graph.run_agent(message="hello", user_id=1, db=db) for _ in range(50)
+    ))
+
+    assert all(r["intent"] == "chat" and r["response"] for r in results)
+    assert llm.calls == 2 * 50
+    # Serialized execution would never have more than one call in flight
+    assert llm.max_in_flight >= 10
+
+
+@pytest.mark.asyncio
+async def test_delete_always_uses_llm_match(db, fake_llm, monkeypatch):
+    """删除：即使有唯一明确匹配的活动也由 LLM 确认目标"""
+    monkeypatch.setattr(settings, "EVENT_MATCH_SKIP_LLM", True)
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    for title in ["Dentist appointment", "Team meeting", "Yoga class"]:
+        db.add(Event(user_id=user_id, title=title, start_time=datetime.now() + timedelta(days=2), source_type="manual"))
+    db.commit()
+    dentist = db.query(Event).filter(Event.title == "Dentist appointment").first()
+
+    llm = fake_llm(['{"intent": "delete_event", "confidence": 0.95}', f'{{"matched_event_id": {dentist.id}}}'])
+
+    result = await agent_graph.run_agent(message="delete my dentist appointment", user_id=user_id, db=db)
+
+    assert result["response"] == "Event deleted: **Dentist appointment**"
+    # Intent classification + event match
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_update_dominant_match_skips_llm(db, fake_llm, monkeypatch):
+    """更新：EVENT_MATCH_SKIP_LLM 开启且唯一明确匹配时无需 LLM 匹配"""
+    monkeypatch.setattr(settings, "EVENT_MATCH_SKIP_LLM", True)
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    for title in ["Dentist appointment", "Team meeting", "Yoga class"]:
+        db.add(Event(user_id=user_id, title=title, start_time=datetime.now() + timedelta(days=2), source_type="manual"))
+    db.commit()
+
+    llm = fake_llm([
+        '{"intent": "update_event", "confidence": 0.95}',
+        '{"location": "Room 5"}',
+    ])
+
+    result = await agent_graph.run_agent(message="move my dentist appointment to Room 5", user_id=user_id, db=db)
+
+    assert result["action_result"]["action"] == "update_event"
+    assert db.query(Event).filter(Event.title == "Dentist appointment").first().location == "Room 5"
+    # Intent classification + update extraction, no match call
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_match_sends_top_k(db, fake_llm, monkeypatch):
+    """歧义时只把 top-k 候选发送给 LLM"""
+    monkeypatch.setattr(settings, "EVENT_MATCH_TOP_K", 3)
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    for i in range(20):
+        db.add(Event(user_id=user_id, title=f"Meeting {i}", start_time=datetime.now() + timedelta(days=i + 1), source_type="manual"))
+    db.commit()
+
+    llm = fake_llm(['{"intent": "delete_event", "confidence": 0.95}', '{"matched_event_id": null}'])
+    prompts = []
+    original = type(llm)._call
+
+    def record(self, messages, *args, **kwargs):
+        prompts.append("\n".join(m.content for m in messages))
+        return original(self, messages, *args, **kwargs)
+
+    monkeypatch.setattr(type(llm), "_call", record)
+
+    result = await agent_graph.run_agent(message="cancel the meeting", user_id=user_id, db=db)
+
+    assert result["action_result"]["error"] == "no_match"
+    assert llm.calls == 2
+    assert len(re.findall(r"^#\d+ \|", prompts[1], re.M)) == 3
+
+
+def make_image(color) -> str:
+    """Create a small solid-color JPEG as base64"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.mark.asyncio
+async def test_multi_image_create_runs_concurrently(db, fake_llm, monkeypatch):
+    """多图创建：并发解析，结果按图片顺序且缩略图对应正确，进度逐张推送"""
+    from services import llm_service
+    from services.image_utils import generate_thumbnail
+
+    monkeypatch.setattr(settings, "IMAGE_CONCURRENCY", 4)
+    images = [make_image(color) for color in ["red", "green", "blue", "yellow"]]
+    # The first image is the slowest so completion order differs from input order
+    latencies = [0.4, 0.1, 0.2, 0.1]
+    start = (datetime.now() + timedelta(days=3)).replace(hour=19, minute=0, second=0, microsecond=0)
+
+    async def fake_parse_image(image_base64, additional_note=None):
+        idx = images.index(image_base64)
+        await asyncio.sleep(latencies[idx])
+        return llm_service.ParseResult(events=[ParsedEvent(
+            title=f"Poster {idx}",
+            start_time=start + timedelta(days=idx),
+            source_type="image",
+        )])
+
+    monkeypatch.setattr(llm_service, "parse_image_with_llm", fake_parse_image)
+    fake_llm(['{"intent": "create_event", "confidence": 0.95}'])
+
+    started = time.perf_counter()
+    chunks = await collect_stream(message="add these", user_id=1, db=db, images_base64=images)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < sum(latencies)
+    statuses = [c["message"] for c in chunks if c["type"] == "status"]
+    assert statuses == [f"Processed image {i}/4" for i in range(1, 5)]
+    # Progress arrives before the final result
+    kinds = [c["type"] for c in chunks]
+    assert kinds.index("status") < kinds.index("action")
+
+    events = [c for c in chunks if c["type"] == "action"][0]["action_result"]["events"]
+    assert [e["title"] for e in events] == ["Poster 0", "Poster 1", "Poster 2", "Poster 3"]
+    for idx, event in enumerate(events):
+        saved = db.query(Event).filter(Event.id == event["id"]).first()
+        assert saved.source_thumbnail == generate_thumbnail(images[idx])
+
+
+@pytest.mark.asyncio
+async def test_speculative_parse_overlaps_classification(db, fake_llm, monkeypatch):
+    """带图消息：图片解析与意图分类并行，create_event 直接使用推测结果"""
+    from services import llm_service
+    from services.metrics import metrics
+
+    image = make_image("red")
+    start = (datetime.now() + timedelta(days=3)).replace(hour=19, minute=0, second=0, microsecond=0)
+    parse_calls = []
+
+    async def fake_parse_image(image_base64, additional_note=None):
+        parse_calls.append(additional_note)
+        await asyncio.sleep(0.3)
+        return llm_service.ParseResult(events=[ParsedEvent(title="Poster", start_time=start, source_type="image")])
+
+    monkeypatch.setattr(llm_service, "parse_image_with_llm", fake_parse_image)
+    fake_llm(['{"intent": "create_event", "confidence": 0.95}'], latency=0.3)
+
+    started = time.perf_counter()
+    chunks = await collect_stream(message="add this", user_id=1, db=db, images_base64=[image])
+    elapsed = time.perf_counter() - started
+
+    assert parse_calls == ["add this"]
+    assert elapsed < 0.55
+    action = [c for c in chunks if c["type"] == "action"][0]["action_result"]
+    assert action["event_title"] == "Poster"
+    assert metrics.counter("speculative_parse_total", outcome="hit") == 1
+    count, saved = metrics.summary("speculative_parse_saved_seconds")
+    assert count == 1 and saved > 0.2
+    # Classification sees only the low-detail thumbnail
+    assert metrics.counter("vision_images_total", stage="intent_classifier", fidelity="thumbnail") == 1
+    assert metrics.counter("vision_image_tokens_total", stage="intent_classifier") == 85
+
+
+@pytest.mark.asyncio
+async def test_speculative_parse_cancelled_for_other_intents(db, fake_llm, monkeypatch):
+    """带图消息但意图不是 create_event：推测解析被取消并记为 miss"""
+    from services import llm_service
+    from services.metrics import metrics
+
+    cancelled = asyncio.Event()
+
+    async def fake_parse_image(image_base64, additional_note=None):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(llm_service, "parse_image_with_llm", fake_parse_image)
+    fake_llm(['{"intent": "chat", "confidence": 0.9}', "Nice picture!"])
+
+    started = time.perf_counter()
+    chunks = await collect_stream(message="look at this", user_id=1, db=db, images_base64=[make_image("blue")])
+    await asyncio.sleep(0)
+
+    assert time.perf_counter() - started < 1
+    assert chunks[-1]["type"] == "done"
+    assert cancelled.is_set()
+    assert metrics.counter("speculative_parse_total", outcome="miss") == 1
+    assert metrics.counter("speculative_parse_total", outcome="hit") == 0
@@ -0,0 +1,79 @@
+"""
+候选活动检索测试
+"""
+from datetime import datetime, timedelta
+
+from models import Event
+from services.agent.retrieval import (
+    extract_date_hints,
+    pick_dominant,
+    retrieve_candidates,
+)
+
+NOW = datetime(2026, 3, 2, 9, 0)  # Monday
+
+
+def make_events():
+    """构造一个包含多种活动的日历"""
+    specs = [
+        ("Dentist appointment", None, 3),
+        ("Team meeting", "Room 201", 1),
+        ("Team meeting", "Room 305", 8),
+        ("Dinner with Anna", "Nobu", 5),
+        ("Concert", "Elbphilharmonie", 4),
+        ("牙医预约", None, 10),
+    ]
+    events = []
+    for i, (title, location, days) in enumerate(specs, start=1):
+        events.append(Event(id=i, user_id=1, title=title, location=location, start_time=NOW + timedelta(days=days)))
+    # Filler events far in the past
+    for i in range(50):
+        events.append(Event(id=100 + i, user_id=1, title=f"Old event {i}", start_time=NOW - timedelta(days=200 + i)))
+    return events
+
+
+def test_date_hints():
+    """识别相对日期、星期和具体日期"""
+    assert extract_date_hints("what about tomorrow", NOW) == {datetime(2026, 3, 3).date()}
+    assert datetime(2026, 3, 6).date() in extract_date_hints("cancel Friday's call", NOW)
+    assert datetime(2026, 3, 6).date() in extract_date_hints("取消周五的会议", NOW)
+    assert extract_date_hints("move it to 2026-04-01", NOW) == {datetime(2026, 4, 1).date()}
+    assert extract_date_hints("am 10.3. verschieben", NOW) == {datetime(2026, 3, 10).date()}
+    assert extract_date_hints("dinner on March 7th", NOW) == {datetime(2026, 3, 7).date()}
+    assert extract_date_hints("run the marathon 2 times", NOW) == set()
+
+
+def test_top_k_limits_candidates():
+    """只返回 top-k 候选，相关活动排在前面"""
+    candidates = retrieve_candidates(make_events(), "delete my dentist appointment", top_k=5, now=NOW)
+    assert len(candidates) == 5
+    assert candidates[0].event.title == "Dentist appointment"
+
+
+def test_dominant_candidate_skips_llm():
+    """唯一明确匹配时直接选中"""
+    events = make_events()
+    for message, expected_id in [
+        ("delete my dentist appointment", 1),
+        ("cancel dinner with Anna", 4),
+        ("删除牙医预约", 6),
+        ("move the team meeting tomorrow to 3pm", 2),
+    ]:
+        candidates = retrieve_candidates(events, message, top_k=10, now=NOW)
+        assert pick_dominant(candidates).id == expected_id, message
+
+
+def test_ambiguous_candidates_need_llm():
+    """多个相近候选或无明确描述时交给 LLM"""
+    events = make_events()
+    assert pick_dominant(retrieve_candidates(events, "cancel the team meeting", now=NOW)) is None
+    assert pick_dominant(retrieve_candidates(events, "delete it", now=NOW)) is None
+    # One shared title word is not enough
+    assert pick_dominant(retrieve_candidates(events, "cancel the concert", now=NOW)) is None
+
+
+def test_history_boosts_referenced_event():
+    """对话历史中提到的活动排名靠前"""
+    history = "User: what's on Thursday?\nAssistant: You have a Concert at Elbphilharmonie."
+    candidates = retrieve_candidates(make_events(), "delete it", conversation_history=history, now=NOW)
+    assert candidates[0].event.title == "Concert"
@@ -0,0 +1,125 @@
+"""
+本地假 OpenAI 服务测试：按 prompt 回放录制响应（JSON / 流式 / 工具调用）、错误注入、OPENAI_BASE_URL
+"""
+import json
+
+import httpx
+import openai
+import pytest
+from langchain_openai import ChatOpenAI
+
+from benchmarks.fake_openai import FakeOpenAIConfig, Recordings, create_app, identify_prompt
+from config import settings
+from services.agent.prompts.intent import CHAT_PROMPT, INTENT_EXTRACTION_PROMPT
+from services.llm_registry import get_chat_model, llm_registry
+from services.prompts.event_extraction import IntentExtraction, TEXT_PARSE_PROMPT
+
+
+def fake_chat_model(config=None, recordings=None, **kwargs) -> ChatOpenAI:
+    """ChatOpenAI talking to the fake server in-process (no socket)"""
+    app = create_app(config, recordings)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return ChatOpenAI(
+        model="gpt-test",
+        api_key="sk-fake",
+        base_url="http://fake-openai/v1",
+        http_async_client=client,
+        max_retries=0,
+        **kwargs,
+    )
+
+
+def intent_messages(message: str):
+    return INTENT_EXTRACTION_PROMPT.format_messages(
+        current_time="2026-02-01 10:00", message=message, image_note="", conversation_history="(none)",
+    )
+
+
+def test_prompts_identified_by_system_message():
+    """按 system prompt 识别请求来自哪个 prompt"""
+    def as_wire(messages):
+        return [{"role": "system" if m.type == "system" else "user", "content": m.content} for m in messages]
+
+    chat = CHAT_PROMPT.format_messages(current_time="now", message="hi", conversation_history="")
+    text_parse = TEXT_PARSE_PROMPT.format_messages(current_time="now", text="hi", additional_note="")
+
+    assert identify_prompt(as_wire(intent_messages("hi"))) == "intent_extraction"
+    assert identify_prompt(as_wire(chat)) == "chat"
+    assert identify_prompt(as_wire(text_parse)) == "text_parse"
+    assert identify_prompt([{"role": "user", "content": "hi"}]) == "default"
+
+
+@pytest.mark.asyncio
+async def test_tool_call_replayed_streaming_and_not():
+    """工具调用（IntentExtraction）以 JSON 和流式两种方式回放，日期占位符被替换"""
+    llm = fake_chat_model().bind_tools([IntentExtraction], tool_choice=IntentExtraction.__name__)
+
+    response = await llm.ainvoke(intent_messages("Schedule a team meeting tomorrow at 10"))
+    args = response.tool_calls[0]["args"]
+    assert args["intent"] == "create_event"
+    assert "{tomorrow}" not in args["event"]["start_time"]
+
+    chunks = [chunk async for chunk in llm.astream(intent_messages("what do I have next week"))]
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        merged = merged + chunk
+    assert len(chunks) > 2
+    assert merged.tool_calls[0]["args"]["intent"] == "query_event"
+
+
+@pytest.mark.asyncio
+async def test_text_streamed_with_usage():
+    """文本回答逐词流式输出，最后一个 chunk 带 token 用量"""
+    llm = fake_chat_model(stream_usage=True)
+    messages = CHAT_PROMPT.format_messages(current_time="now", message="hello", conversation_history="")
+
+    chunks = [chunk async for chunk in llm.astream(messages)]
+    text = "".join(chunk.content for chunk in chunks)
+
+    assert text.startswith("Hi! I'm FollowUP")
+    assert len([c for c in chunks if c.content]) > 10
+    usage = [c.usage_metadata for c in chunks if c.usage_metadata][0]
+    assert usage["input_tokens"] > 0 and usage["output_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_error_injection_and_missing_recording(tmp_path):
+    """错误注入返回 429/5xx；没有录制响应的 prompt 返回 400"""
+    failing = fake_chat_model(FakeOpenAIConfig(error_rate=1.0, error_statuses=(503,)))
+    with pytest.raises(openai.InternalServerError):
+        await failing.ainvoke("hi")
+
+    path = tmp_path / "recordings.json"
+    path.write_text(json.dumps({"chat": [{"content": "only chat"}]}))
+    empty = fake_chat_model(recordings=Recordings(path))
+    with pytest.raises(openai.BadRequestError):
+        await empty.ainvoke("hi")
+
+
+def test_base_url_setting(monkeypatch):
+    """OPENAI_BASE_URL 指向兼容 OpenAI 的服务"""
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", "http://127.0.0.1:8001/v1")
+    llm_registry.clear()
+    try:
+        assert get_chat_model().openai_api_base == "http://127.0.0.1:8001/v1"
+    finally:
+        llm_registry.clear()
+
+
+@pytest.mark.asyncio
+async def test_prompt_cache_simulated():
+    """模拟提供方的前缀缓存：1024 token 以上的相同前缀在后续调用中计为 cached"""
+    llm = fake_chat_model()
+    history = "\n".join(f"user: message {i}\nassistant: answer {i}" for i in range(200))
+
+    def messages(text):
+        return CHAT_PROMPT.format_messages(current_time="2026-02-01T10:00", message=text, conversation_history=history)
+
+    first = await llm.ainvoke(messages("hello"))
+    second = await llm.ainvoke(messages("how are you"))
+
+    assert first.usage_metadata["input_token_details"].get("cache_read", 0) == 0
+    cached = second.usage_metadata["input_token_details"]["cache_read"]
+    assert cached >= 1024
+    assert cached % 128 == 0
@@ -0,0 +1,78 @@
+"""
+图片处理进程池测试
+"""
+import asyncio
+import base64
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from services.image_pool import ImagePool
+from services.image_utils import generate_thumbnail, generate_thumbnail_async
+from services.metrics import metrics
+
+
+def worker_pid() -> int:
+    return os.getpid()
+
+
+def crash_in_worker(parent_pid: int) -> str:
+    """工作进程中崩溃；在主进程（线程回退）中正常返回"""
+    if os.getpid() != parent_pid:
+        os._exit(1)
+    return "thread"
+
+
+def slow(seconds: float) -> str:
+    time.sleep(seconds)
+    return "done"
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_outside_main_process():
+    """进程模式：图片任务在独立进程中执行"""
+    pool = ImagePool(mode="process", max_workers=1)
+    try:
+        assert await pool.run(worker_pid) != os.getpid()
+        assert metrics.counter("image_pool_tasks_total", mode="process", result="ok") == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_broken_process_pool_falls_back_to_threads():
+    """工作进程崩溃时回退到线程池重试"""
+    pool = ImagePool(mode="process", max_workers=1)
+    try:
+        assert await pool.run(crash_in_worker, os.getpid()) == "thread"
+        assert pool.mode == "thread"
+        assert metrics.counter("image_pool_fallback_total") == 1
+        assert await pool.run(worker_pid) == os.getpid()
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout():
+    """超过超时时间时抛出 TimeoutError 并计数"""
+    pool = ImagePool(mode="thread", max_workers=1, timeout=0.05)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(slow, 0.3)
+        assert metrics.counter("image_pool_tasks_total", mode="thread", result="timeout") == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_thumbnail_async_matches_sync():
+    """异步缩略图与同步版本结果一致"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 900), "purple").save(buffer, format="JPEG")
+    image_base64 = base64.b64encode(buffer.getvalue()).decode()
+
+    assert await generate_thumbnail_async(image_base64) == generate_thumbnail(image_base64)
+    assert await generate_thumbnail_async("not base64!") is None
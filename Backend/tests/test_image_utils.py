@@ -0,0 +1,105 @@
+"""
+图片预处理测试
+"""
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from config import settings
+from services.image_utils import (
+    THUMBNAIL_SIZE,
+    generate_thumbnail,
+    image_content_part,
+    prepare_image,
+    preprocess_image,
+    vision_tokens,
+)
+from services.metrics import metrics
+from services.parse_cache import image_digest
+
+
+def encode(image: Image.Image, fmt: str = "JPEG", **kwargs) -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **kwargs)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def decode(image_base64: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(image_base64)))
+
+
+def test_long_edge_capped_and_thumbnail():
+    """模型用图长边不超过 max_edge，同时生成缩略图与内容哈希"""
+    image_base64 = encode(Image.new("RGB", (3000, 2000), "red"))
+
+    prepared = preprocess_image(image_base64, max_edge=1000)
+
+    assert prepared.original_size == (3000, 2000)
+    assert prepared.model_size == (1000, 667)
+    assert decode(prepared.model_base64).size == (1000, 667)
+    assert max(decode(prepared.thumbnail).size) <= max(THUMBNAIL_SIZE)
+    assert prepared.digest == image_digest(image_base64)
+    assert prepared.model_bytes < prepared.original_bytes
+
+
+def test_exif_orientation_applied():
+    """按 EXIF 方向旋转（手机竖拍照片以横向像素存储）"""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    image_base64 = encode(Image.new("RGB", (400, 300), "blue"), exif=exif)
+
+    prepared = preprocess_image(f"data:image/jpeg;base64,{image_base64}", max_edge=1000)
+
+    assert prepared.model_size == (300, 400)
+    assert decode(prepared.model_base64).size == (300, 400)
+
+
+def test_small_jpeg_kept_and_png_converted():
+    """足够小的 JPEG 保留原图；PNG（含透明通道）转换为 JPEG"""
+    small = encode(Image.new("RGB", (400, 300), "green"), quality=50)
+    assert preprocess_image(small, max_edge=1000).model_base64 == small
+
+    png = encode(Image.new("RGBA", (400, 300), (0, 0, 255, 128)), fmt="PNG")
+    assert decode(preprocess_image(png, max_edge=1000).model_base64).format == "JPEG"
+
+    assert preprocess_image("bm90IGFuIGltYWdl") is None
+
+
+def test_thumbnail_shares_prepared_image():
+    """默认尺寸的缩略图复用预处理结果"""
+    image_base64 = encode(Image.new("RGB", (800, 600), "yellow"))
+
+    assert generate_thumbnail(image_base64) == prepare_image(image_base64).thumbnail
+
+
+def test_vision_tokens():
+    """Vision token 估算：分块计数"""
+    assert vision_tokens(512, 512) == 255
+    assert vision_tokens(1152, 1536) == 765
+    assert vision_tokens(4032, 3024) == 765
+    assert vision_tokens(4032, 3024, detail="low") == 85
+
+
+@pytest.mark.asyncio
+async def test_image_content_part_per_stage(monkeypatch):
+    """按阶段选择清晰度：分类用低清缩略图，提取用高清模型用图；记录字节数与 token"""
+    monkeypatch.setattr(settings, "IMAGE_STAGE_FIDELITY", {"intent_classifier": "thumbnail", "triage": "low"})
+    metrics.clear()
+    image_base64 = encode(Image.new("RGB", (2400, 1600), "orange"))
+    prepared = prepare_image(image_base64)
+
+    intent = await image_content_part(image_base64, "intent_classifier")
+    parse = await image_content_part(image_base64, "image_parse")
+    triage = await image_content_part(image_base64, "triage")
+
+    assert intent["image_url"] == {"url": f"data:image/jpeg;base64,{prepared.thumbnail}", "detail": "low"}
+    assert parse["image_url"] == {"url": f"data:image/jpeg;base64,{prepared.model_base64}", "detail": "high"}
+    assert triage["image_url"]["detail"] == "low"
+    assert metrics.counter("vision_image_tokens_total", stage="intent_classifier") == 85
+    assert metrics.counter("vision_image_tokens_total", stage="image_parse") == vision_tokens(*prepared.model_size)
+    assert (
+        metrics.counter("vision_image_bytes_total", stage="intent_classifier")
+        < metrics.counter("vision_image_bytes_total", stage="image_parse")
+    )
@@ -0,0 +1,165 @@
+"""
+本地意图快速分类测试
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from models import Event, User
+from services.agent import graph as agent_graph
+from services.agent.intent_fastpath import (
+    DEFAULT_RULE_CONFIDENCE,
+    IntentModel,
+    classify_by_rules,
+    classify_fast,
+    compute_rule_precision,
+    get_intent_model,
+    log_intent_sample,
+    rule_precision,
+)
+
+
+@pytest.mark.parametrize("message,intent", [
+    ("delete my dentist appointment", "delete_event"),
+    ("what do I have tomorrow", "query_event"),
+    ("reschedule the team meeting to 4pm", "update_event"),
+    ("remind me to call mom on Sunday", "create_event"),
+    ("lösche den Zahnarzttermin", "delete_event"),
+    ("was habe ich morgen", "query_event"),
+    ("删除牙医预约", "delete_event"),
+    ("我明天有什么安排", "query_event"),
+    ("你好", "chat"),
+])
+def test_rules_unambiguous(message, intent):
+    """无歧义消息由规则直接识别"""
+    assert classify_by_rules(message)[0] == intent
+
+
+def test_rules_ambiguous_returns_none():
+    """同时命中多个意图时不做判断"""
+    assert classify_by_rules("cancel the meeting and add a new meeting on Friday") is None
+
+
+@pytest.mark.parametrize("message", [
+    "I will drop by the meeting later",
+    "I will drop by the dentist appointment later",
+    "remove the notes from my dentist appointment",
+    "I want to move to Berlin next year",
+    "what is the weather like tomorrow",
+])
+def test_loose_phrases_not_matched(message):
+    """日常用语不被规则误判为删除 / 修改 / 查询，也不会在本地决定意图"""
+    assert classify_by_rules(message) is None
+    assert classify_fast(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "delete my dentist appointment",
+    "reschedule the team meeting to 4pm",
+    "lösche den Zahnarzttermin",
+    "删除牙医预约",
+])
+def test_destructive_intents_go_to_llm(message):
+    """删除和修改活动从不在本地决定（即使规则命中），一律交给 LLM"""
+    assert classify_by_rules(message)[0] in ("delete_event", "update_event")
+    assert classify_fast(message, threshold=0.0) is None
+
+
+def test_rule_confidence_calibrated():
+    """规则置信度来自种子样本上的平滑精确率，不是固定值；有模型时与模型概率取平均"""
+    precision = rule_precision()
+    assert all(0 < p < 1 for p in precision.values())
+    assert classify_by_rules("what do I have tomorrow")[1] == round(precision["query_event"], 3)
+
+    result = classify_fast("what do I have tomorrow")
+    model_p = get_intent_model().predict_proba("what do I have tomorrow")["query_event"]
+    assert result.confidence == round((precision["query_event"] + model_p) / 2, 3)
+
+
+def test_rule_precision_from_given_samples():
+    """精确率只用传入的样本计算（训练脚本只传训练集，评估样本不参与校准）"""
+    precision = compute_rule_precision([
+        ("what do I have tomorrow", "query_event"),
+        ("what do I have to bring to dinner?", "chat"),
+    ])
+    assert precision["query_event"] == 0.5
+    assert precision["chat"] == DEFAULT_RULE_CONFIDENCE
+    assert classify_by_rules("what do I have tomorrow", precision) == ("query_event", 0.5)
+    assert classify_fast("what do I have tomorrow", threshold=0.6, model=IntentModel(), precision=precision) is None
+
+
+def test_fast_path_declines_when_llm_needed():
+    """带图片、回答上一轮提问或置信度不足时交给 LLM"""
+    assert classify_fast("what do I have tomorrow", has_images=True) is None
+    assert classify_fast("what do I have tomorrow", conversation_history="User: hi\nAssistant: Which day do you mean?") is None
+    assert classify_fast("what do I have tomorrow", threshold=1.0) is None
+
+
+def test_trained_model_shipped_and_loaded():
+    """内置模型可以加载并识别种子样本以外的表达"""
+    model = get_intent_model()
+    assert model is not None
+    intent, confidence = model.predict("what is on my calendar for next Monday")
+    assert intent == "query_event"
+    assert 0 < confidence <= 1
+
+
+def test_model_fit_save_load(tmp_path):
+    """训练后的模型保存再加载，预测一致"""
+    model = IntentModel().fit([
+        ("hello there", "chat"),
+        ("good morning friend", "chat"),
+        ("drop the yoga class", "delete_event"),
+        ("drop the gym session", "delete_event"),
+    ], epochs=20)
+    path = tmp_path / "model.json"
+    model.save(path)
+    loaded = IntentModel.load(path)
+
+    assert loaded.predict("drop the yoga session")[0] == "delete_event"
+    assert loaded.predict("hello friend")[0] == "chat"
+    assert abs(loaded.predict("drop it")[1] - model.predict("drop it")[1]) < 1e-2
+
+
+@pytest.mark.asyncio
+async def test_classify_intent_skips_llm(monkeypatch):
+    """快速路径命中时不调用 LLM"""
+    def fail():
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(settings, "ENABLE_INTENT_FASTPATH", True)
+    monkeypatch.setattr(agent_graph, "get_llm", fail)
+
+    state = await agent_graph.classify_intent({"message": "what do I have tomorrow", "conversation_history": ""})
+    assert state["intent"] == "query_event"
+    assert state["confidence"] >= settings.INTENT_FASTPATH_THRESHOLD
+
+
+@pytest.mark.asyncio
+async def test_no_delete_without_llm(db, monkeypatch):
+    """LLM 不可用时，"drop by" 之类的消息不会在本地删除活动"""
+    def fail():
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(settings, "ENABLE_INTENT_FASTPATH", True)
+    monkeypatch.setattr(agent_graph, "get_llm", fail)
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    db.add(Event(user_id=user_id, title="Dentist appointment", start_time=datetime.now() + timedelta(days=2), source_type="manual"))
+    db.commit()
+
+    try:
+        await agent_graph.run_agent(message="I will drop by the dentist appointment later", user_id=user_id, db=db)
+    except RuntimeError:
+        pass
+
+    assert db.query(Event).filter(Event.user_id == user_id, Event.title == "Dentist appointment").count() == 1
+
+
+def test_log_intent_sample(tmp_path):
+    """记录 (消息, LLM 意图) 样本供训练使用"""
+    path = tmp_path / "samples.jsonl"
+    log_intent_sample(str(path), "什么时候开会", "query_event", 0.9, 0.6543)
+    row = json.loads(path.read_text(encoding="utf-8"))
+    assert row == {"message": "什么时候开会", "intent": "query_event", "confidence": 0.9, "llm_latency": 0.654}
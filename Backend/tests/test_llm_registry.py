@@ -0,0 +1,19 @@
+"""
+LLM 客户端注册表测试
+"""
+from services.llm_registry import LLMRegistry
+
+
+def test_registry_reuses_clients(monkeypatch):
+    """相同 (model, temperature, timeout) 返回同一个客户端"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    registry = LLMRegistry()
+
+    first = registry.get("gpt-test", 0.3)
+    second = registry.get("gpt-test", 0.3)
+    other = registry.get("gpt-test", 0.0, timeout=10)
+
+    assert first is second
+    assert other is not first
+    assert first.http_async_client is other.http_async_client
+    assert registry.stats() == {"clients": 2, "hits": 1, "misses": 2, "hit_rate": 1 / 3}
@@ -0,0 +1,171 @@
+"""
+LLM 调用韧性测试：截止时间、重试、对冲请求、熔断
+"""
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from config import settings
+from services.llm_resilience import (
+    STREAM_TAG,
+    CircuitOpenError,
+    DeadlineExceeded,
+    get_breaker,
+    provider_degraded,
+    reset_breakers,
+    resilient,
+    turn_budget,
+)
+from services.metrics import metrics
+
+
+class FlakyFakeLLM(FakeListChatModel):
+    """Fake model: the first `failures` calls raise ConnectionError; latencies are per call"""
+    failures: int = 0
+    latencies: list = []
+    calls: int = 0
+
+    async def _start_call(self):
+        call = self.calls
+        self.calls += 1
+        if call < len(self.latencies):
+            await asyncio.sleep(self.latencies[call])
+        if call < self.failures:
+            raise ConnectionError("connection reset")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await self._start_call()
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await self._start_call()
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "LLM_BREAKER_FAILURES", 3)
+    reset_breakers()
+    metrics.clear()
+    yield
+    reset_breakers()
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_retried():
+    """瞬时错误按抖动退避重试"""
+    llm = FlakyFakeLLM(responses=["ok"], failures=2)
+
+    response = await resilient(llm).ainvoke("hi")
+
+    assert response.content == "ok"
+    assert llm.calls == 3
+    assert metrics.counter("llm_retries_total", model=settings.OPENAI_MODEL) == 2
+
+
+@pytest.mark.asyncio
+async def test_call_timeout_and_turn_budget(monkeypatch):
+    """单次调用超时；本轮预算用完后不再发起调用"""
+    monkeypatch.setattr(settings, "LLM_CALL_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    llm = FlakyFakeLLM(responses=["ok"], latencies=[1.0])
+
+    started = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        await resilient(llm).ainvoke("hi")
+    assert time.perf_counter() - started < 0.5
+
+    with turn_budget(0.01):
+        await asyncio.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            await resilient(llm).ainvoke("hi")
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    """连续失败后熔断（快速失败），重置时间后探测成功则恢复"""
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "LLM_BREAKER_RESET_SECONDS", 0.05)
+    llm = FlakyFakeLLM(responses=["ok"], failures=3)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await resilient(llm).ainvoke("hi")
+    assert provider_degraded()
+    with pytest.raises(CircuitOpenError):
+        await resilient(llm).ainvoke("hi")
+    assert llm.calls == 3
+
+    await asyncio.sleep(0.06)
+    assert (await resilient(llm).ainvoke("hi")).content == "ok"
+    assert get_breaker().state == "closed"
+
+
+def test_degraded_provider_uses_keyword_parser(client, test_user, monkeypatch):
+    """熔断期间 /api/parse 文字解析使用本地关键词解析"""
+    from services import llm_service
+
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+
+    async def must_not_call(*args, **kwargs):
+        raise AssertionError("LLM called while the circuit is open")
+
+    monkeypatch.setattr(llm_service, "_parse_text_with_llm", must_not_call)
+    breaker = get_breaker()
+    for _ in range(settings.LLM_BREAKER_FAILURES):
+        breaker.record_failure()
+
+    response = client.post(
+        "/api/parse",
+        json={"input_type": "text", "text_content": "明天下午3点开会"},
+        headers={"Authorization": f"Bearer {test_user['token']}"},
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()["events"]) > 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_primary(monkeypatch):
+    """对冲：主请求超过延迟阈值后发出副本，先返回者胜出"""
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY", 0.05)
+    llm = FlakyFakeLLM(responses=["answer"], latencies=[1.0, 0.01])
+
+    started = time.perf_counter()
+    response = await resilient(llm).ainvoke("hi")
+
+    assert time.perf_counter() - started < 0.5
+    assert response.content == "answer"
+    assert llm.calls == 2
+    assert metrics.counter("llm_hedged_requests_total", model=settings.OPENAI_MODEL, outcome="hedge_won") == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_calls_not_hedged_or_retried(monkeypatch):
+    """流式调用（STREAM_TAG）：token 照常转发，不对冲也不重试"""
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY", 0.01)
+    llm = resilient(FlakyFakeLLM(responses=["hello"], latencies=[0.05]))
+
+    async def node(_):
+        return await llm.ainvoke("hi", config={"tags": [STREAM_TAG]})
+
+    tokens = [
+        event["data"]["chunk"].content
+        async for event in RunnableLambda(node).astream_events("x", version="v2")
+        if event["event"] == "on_chat_model_stream" and STREAM_TAG in event.get("tags", [])
+    ]
+    assert "".join(tokens) == "hello"
+    assert llm.llm.calls == 1
+
+    failing = resilient(FlakyFakeLLM(responses=["hello"], failures=1))
+    with pytest.raises(ConnectionError):
+        await failing.ainvoke("hi", config={"tags": [STREAM_TAG]})
+    assert failing.llm.calls == 1
@@ -0,0 +1,134 @@
+"""
+指标导出测试：直方图、Prometheus 文本格式、多 worker 合并、/api/metrics 端点
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from langchain_core.messages import AIMessage
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from config import settings
+from models import Event, User
+from services.instrumentation import install_db_instrumentation, llm_node, record_llm_usage
+from services.metrics import MetricsRegistry, metrics
+from services.metrics_export import collect, merge_snapshots, render_prometheus, write_snapshot
+from tests.conftest import collect_stream, test_engine
+
+
+def test_histogram_rendered_cumulatively():
+    """直方图按 Prometheus 格式输出累计 bucket、_count 和 _sum"""
+    registry = MetricsRegistry()
+    for value in (0.2, 0.7, 3.0, 100.0):
+        registry.histogram("http_request_duration_seconds", value, buckets=(0.5, 1.0, 5.0), route="/api/events")
+    registry.inc("db_queries_total", 3)
+
+    text = render_prometheus(registry.snapshot())
+
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_bucket{route="/api/events",le="0.5"} 1' in text
+    assert 'http_request_duration_seconds_bucket{route="/api/events",le="1"} 2' in text
+    assert 'http_request_duration_seconds_bucket{route="/api/events",le="5"} 3' in text
+    assert 'http_request_duration_seconds_bucket{route="/api/events",le="+Inf"} 4' in text
+    assert 'http_request_duration_seconds_count{route="/api/events"} 4' in text
+    assert 'http_request_duration_seconds_sum{route="/api/events"} 103.9' in text
+    assert "db_queries_total 3" in text
+
+
+def test_snapshots_merged_across_workers(tmp_path, monkeypatch):
+    """多 worker：各自写出快照文件，抓取时合并；已退出 worker 的文件被清理"""
+    worker = MetricsRegistry()
+    worker.inc("search_errors_total", 2, provider="tavily")
+    worker.histogram("graph_node_duration_seconds", 0.3, node="chat")
+    # A worker that is still running (the parent process) and one that has exited
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(worker.snapshot()))
+    (tmp_path / "999999999.json").write_text(json.dumps(worker.snapshot()))
+
+    metrics.inc("search_errors_total", 1, provider="tavily")
+    metrics.histogram("graph_node_duration_seconds", 0.7, node="chat")
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+
+    merged = collect()
+
+    counter = [c for c in merged["counters"] if c["name"] == "search_errors_total"][0]
+    assert counter["value"] == 3
+    histogram = [h for h in merged["histograms"] if h["name"] == "graph_node_duration_seconds"][0]
+    assert sum(histogram["counts"]) == 2
+    assert histogram["sum"] == pytest.approx(1.0)
+    assert not (tmp_path / "999999999.json").exists()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    # Merging is a plain sum, so the result does not depend on file order
+    assert merge_snapshots([worker.snapshot(), metrics.snapshot()])["counters"][0]["value"] == 3
+
+
+def test_llm_tokens_attributed_to_node():
+    """LLM token 用量按节点和模型计数（含缓存命中的 prompt token）"""
+    response = AIMessage(
+        content="ok",
+        usage_metadata={
+            "input_tokens": 120,
+            "output_tokens": 30,
+            "total_tokens": 150,
+            "input_token_details": {"cache_read": 64},
+        },
+    )
+
+    with llm_node("text_parse"):
+        record_llm_usage(response, "gpt-test")
+    record_llm_usage(response, "gpt-test")
+
+    assert metrics.counter("llm_tokens_total", node="text_parse", model="gpt-test", type="prompt") == 120
+    assert metrics.counter("llm_tokens_total", node="text_parse", model="gpt-test", type="completion") == 30
+    assert metrics.counter("llm_tokens_total", node="text_parse", model="gpt-test", type="prompt_cached") == 64
+    assert metrics.counter("llm_tokens_total", node="other", model="gpt-test", type="prompt") == 120
+
+
+@pytest.mark.asyncio
+async def test_graph_node_latency_recorded(db, fake_llm):
+    """Agent 图每个节点记录耗时直方图"""
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    db.add(Event(user_id=user_id, title="Team meeting", start_time=datetime.now() + timedelta(days=1), source_type="manual"))
+    db.commit()
+    fake_llm(['{"intent": "query_event", "confidence": 0.9}', "Tomorrow you have: Team meeting"])
+
+    await collect_stream(message="when is the team meeting", user_id=user_id, db=db)
+
+    assert metrics.histogram_count("graph_node_duration_seconds", node="intent_classifier")[0] == 1
+    assert metrics.histogram_count("graph_node_duration_seconds", node="query_event")[0] == 1
+
+
+def test_metrics_endpoint(client, test_user):
+    """/api/metrics 输出按路由模板统计的请求耗时和每请求数据库查询数"""
+    install_db_instrumentation(test_engine)
+    headers = {"Authorization": f"Bearer {test_user['token']}"}
+
+    assert client.get("/api/events", headers=headers).status_code == 200
+    assert client.get("/api/events/999999", headers=headers).status_code == 404
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/events",status="200"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/events/{event_id}",status="404"} 1' in text
+    assert "/api/events/999999" not in text
+    assert 'db_queries_per_request_bucket{route="/api/events",le="0"} 0' in text
+    assert "db_queries_total" in text
+
+
+def test_failed_query_recorded():
+    """执行失败的语句也计入 db_queries_total，且不残留计时起点"""
+    install_db_instrumentation(test_engine)
+
+    with test_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert conn.info["query_started"] == []
+
+    assert metrics.counter("db_queries_total", result="ok") == 1
+    assert metrics.counter("db_queries_total", result="error") == 1
@@ -1,8 +1,16 @@
 """
 日程解析相关测试
 """
+import asyncio
+import base64
+import io
+import json
+from datetime import datetime, timedelta
+
 import pytest
 from fastapi import status
+from langchain_core.language_models import FakeListChatModel
+from PIL import Image
 
 
 def test_parse_text_success(client, test_user):
@@ -101,3 +109,87 @@ def test_parse_no_auth(client):
         },
     )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def make_image(color) -> str:
+    """生成纯色 JPEG（base64）"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.mark.asyncio
+async def test_parse_images_with_llm_groups_by_source_image(monkeypatch):
+    """批量解析：按 source_image_index 归属到对应图片，无效索引归入 unattributed"""
+    from services import llm_service
+
+    start = (datetime.now() + timedelta(days=2)).replace(microsecond=0).isoformat()
+    response = {"events": [
+        {"title": "Concert", "start_time": start, "source_image_index": 1},
+        {"title": "Lecture", "start_time": start, "source_image_index": 0},
+        {"title": "Workshop", "start_time": start, "source_image_index": 7},
+        {"title": "No time", "start_time": None, "source_image_index": 2},
+    ]}
+    llm = FakeListChatModel(responses=[json.dumps(response)])
+    monkeypatch.setattr(llm_service, "get_llm", lambda: llm)
+
+    result = await llm_service.parse_images_with_llm(["a", "b", "c"])
+
+    assert [[e.title for e in events] for events in result.events_by_image] == [["Lecture"], ["Concert"], []]
+    assert [e.title for e in result.unattributed] == ["Workshop"]
+
+
+def test_parse_images_batched_mode(client, test_user, monkeypatch):
+    """多图批量模式：一次调用覆盖所有图片，缩略图对应正确，只对无结果的图片单独解析"""
+    from routers import parse as parse_router
+    from schemas import ParsedEvent
+    from services.image_utils import generate_thumbnail
+    from services.llm_service import BatchImageParseResult, ParseResult
+
+    images = [make_image(color) for color in ["red", "green", "blue"]]
+    start = (datetime.now() + timedelta(days=2)).replace(microsecond=0)
+
+    def event(title):
+        return ParsedEvent(title=title, start_time=start, source_type="image")
+
+    batch_calls, single_calls = [], []
+
+    async def fake_batch(images_base64, additional_note=None):
+        batch_calls.append(len(images_base64))
+        return BatchImageParseResult(events_by_image=[[event("Red")], [], [event("Blue")]], unattributed=[])
+
+    async def fake_single(image_base64, additional_note=None):
+        single_calls.append(images.index(image_base64))
+        return ParseResult(events=[event("Green")])
+
+    in_flight = [0, 0]  # 当前并发数, 峰值
+    real_thumbnail = parse_router.generate_thumbnail_async
+
+    async def tracked_thumbnail(image_base64):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            return await real_thumbnail(image_base64)
+        finally:
+            in_flight[0] -= 1
+
+    monkeypatch.setattr(parse_router, "is_llm_available", lambda: True)
+    monkeypatch.setattr(parse_router, "parse_images_with_llm", fake_batch)
+    monkeypatch.setattr(parse_router, "parse_image_with_llm", fake_single)
+    monkeypatch.setattr(parse_router, "generate_thumbnail_async", tracked_thumbnail)
+
+    response = client.post(
+        "/api/parse",
+        json={"input_type": "image", "images_base64": images, "image_parse_mode": "batched"},
+        headers={"Authorization": f"Bearer {test_user['token']}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    events = {e["title"]: e for e in response.json()["events"]}
+    assert set(events) == {"Red", "Green", "Blue"}
+    assert batch_calls == [3]
+    assert single_calls == [1]
+    for title, image in zip(["Red", "Green", "Blue"], images):
+        assert events[title]["source_thumbnail"] == generate_thumbnail(image)
+    # 有批量结果的图片，其缩略图应并发生成
+    assert in_flight[1] == 2
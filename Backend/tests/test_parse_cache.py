@@ -0,0 +1,122 @@
+"""
+解析结果缓存测试
+"""
+import base64
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from config import settings
+from models import ParseCacheEntry
+from schemas import ParsedEvent
+from services import llm_service
+from services.cache import TTLCache
+from services.llm_service import ParseResult
+from services.metrics import metrics
+from services.parse_cache import ParseCache, make_key, parse_cache
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    parse_cache.clear()
+    metrics.clear()
+    yield
+    parse_cache.clear()
+
+
+def make_result(title="Concert") -> ParseResult:
+    return ParseResult(events=[ParsedEvent(
+        title=title,
+        start_time=datetime(2026, 5, 1, 19, 0),
+        source_type="text",
+    )])
+
+
+def test_ttl_cache_lru_and_expiry():
+    """超过容量时淘汰最久未使用的条目，过期条目视为未命中"""
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+    assert cache.stats()["hits"] == 3
+
+
+def test_make_key_normalization():
+    """文字按空白归一化；补充说明、模型、日期不同则键不同；图片按解码后的字节"""
+    key = make_key("text", "Concert  at\n8pm", day=date(2026, 5, 1))
+    assert key == make_key("text", " Concert at 8pm ", day=date(2026, 5, 1))
+    assert key != make_key("text", "Concert at 8pm", additional_note="Hamburg", day=date(2026, 5, 1))
+    assert key != make_key("text", "Concert at 8pm", model="other-model", day=date(2026, 5, 1))
+    assert key != make_key("text", "Concert at 8pm", day=date(2026, 5, 2))
+
+    image = base64.b64encode(b"poster bytes").decode()
+    assert make_key("image", image) == make_key("image", f"data:image/jpeg;base64,{image}")
+    assert make_key("image", image) != make_key("text", image)
+
+
+@pytest.mark.asyncio
+async def test_parse_text_cache_hit(monkeypatch):
+    """同一文字第二次解析命中缓存，不调用 LLM，且返回独立的对象"""
+    calls = []
+
+    async def fake_parse(text, additional_note=None):
+        calls.append(text)
+        return make_result()
+
+    monkeypatch.setattr(llm_service, "_parse_text_with_llm", fake_parse)
+
+    first = await llm_service.parse_text_with_llm("Concert at 8pm", "note")
+    first.events[0].source_thumbnail = "thumb"
+    second = await llm_service.parse_text_with_llm("Concert   at 8pm", "note")
+
+    assert calls == ["Concert at 8pm"]
+    assert second.events[0].title == "Concert"
+    assert second.events[0].source_thumbnail is None
+    assert metrics.counter("parse_cache_requests_total", kind="text", result="hit_memory") == 1
+    assert metrics.counter("parse_cache_requests_total", kind="text", result="miss") == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_result_not_cached(monkeypatch):
+    """空结果（也是 LLM 调用失败时的返回值）不缓存"""
+    calls = []
+
+    async def fake_parse(image_base64, additional_note=None):
+        calls.append(image_base64)
+        return ParseResult(events=[])
+
+    monkeypatch.setattr(llm_service, "_parse_image_with_llm", fake_parse)
+
+    await llm_service.parse_image_with_llm("aW1hZ2U=")
+    await llm_service.parse_image_with_llm("aW1hZ2U=")
+
+    assert len(calls) == 2
+
+
+def test_persistent_tier(db, monkeypatch):
+    """持久化层：内存层为空时从数据库读取，过期记录被删除"""
+    monkeypatch.setattr(settings, "PARSE_CACHE_PERSIST", True)
+    key = make_key("text", "Concert at 8pm")
+
+    ParseCache(session_factory=TestingSessionLocal).put(key, make_result(), kind="text")
+
+    fresh = ParseCache(session_factory=TestingSessionLocal)
+    result = fresh.get(key, kind="text")
+    assert result is not None and result.events[0].title == "Concert"
+    assert metrics.counter("parse_cache_requests_total", kind="text", result="hit_db") == 1
+
+    entry = db.query(ParseCacheEntry).filter(ParseCacheEntry.key == key).first()
+    entry.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert ParseCache(session_factory=TestingSessionLocal).get(key, kind="text") is None
+    db.expire_all()
+    assert db.query(ParseCacheEntry).count() == 0
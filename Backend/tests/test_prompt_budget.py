@@ -0,0 +1,91 @@
+"""
+Prompt token 预算测试
+"""
+from datetime import datetime
+
+from models import Event
+from services import prompt_budget
+from services.prompt_budget import (
+    Section,
+    count_tokens,
+    encode_event,
+    encode_events,
+    estimate_tokens,
+    fit_sections,
+    fit_text,
+    preload_encoding,
+)
+
+
+def test_estimate_tokens():
+    """字符估算：中文约每字一个 token，其他约 4 字符一个 token"""
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("你好世界") == 4
+    assert count_tokens("") == 0
+
+
+def test_preload_encoding_falls_back_to_estimate(monkeypatch):
+    """启动时加载编码失败（如离线）后，请求中使用估算而不再尝试下载"""
+    import tiktoken
+
+    attempts = []
+
+    def unavailable(name):
+        attempts.append(name)
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", unavailable)
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    prompt_budget._get_encoding.cache_clear()
+    try:
+        assert preload_encoding("offline-model") is False
+        assert count_tokens("abcdefgh", model="offline-model") == 2
+        assert len(attempts) == 1
+    finally:
+        prompt_budget._get_encoding.cache_clear()
+
+
+def test_encode_event_compact():
+    """每个活动一行，省略空字段"""
+    event = Event(
+        id=7,
+        title="Team meeting",
+        start_time=datetime(2026, 3, 4, 10, 0),
+        end_time=datetime(2026, 3, 4, 11, 30),
+        location=None,
+        description="Weekly sync\n  with the whole team",
+    )
+    assert encode_event(event, description_chars=0) == "#7 | 2026-03-04 10:00–11:30 | Team meeting"
+    assert encode_event(event, description_chars=11) == "#7 | 2026-03-04 10:00–11:30 | Team meeting | Weekly sync…"
+    assert encode_event({"title": "Dinner", "start_time": "2026-03-05T19:00:00", "location": "Nobu"}) == \
+        "2026-03-05 19:00 | Dinner | @Nobu"
+    assert encode_events([]) == "(no events)"
+
+
+def test_fit_sections_under_budget_unchanged():
+    """未超预算时原样返回"""
+    texts = fit_sections([Section("a", "hello", 1), Section("b", "world", 2)], node="test", budget=100)
+    assert texts == {"a": "hello", "b": "world"}
+
+
+def test_fit_sections_trims_lowest_priority_first():
+    """超出预算时先裁剪低优先级部分，历史保留最近的消息"""
+    history = "\n".join(f"User: message number {i}" for i in range(200))
+    message = "delete my dentist appointment"
+    texts = fit_sections([
+        Section("message", message, priority=2),
+        Section("history", history, priority=1, keep="tail", line_based=True),
+    ], node="test", budget=200)
+
+    assert texts["message"] == message
+    assert texts["history"].startswith("(")
+    assert texts["history"].endswith("User: message number 199")
+    assert count_tokens(texts["message"]) + count_tokens(texts["history"]) <= 200
+
+
+def test_fit_text_head_truncation():
+    """单段文本按字符截断并加省略号"""
+    text = "x" * 4000
+    fitted = fit_text(text, node="test", budget=100)
+    assert fitted.endswith("…")
+    assert count_tokens(fitted) <= 100
@@ -0,0 +1,85 @@
+"""
+Prompt 缓存友好布局测试：system 消息固定不变、时间精确到分钟、记录缓存命中的 token
+"""
+from datetime import datetime
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from services.agent.prompts import intent as agent_prompts
+from services.instrumentation import llm_node, record_llm_usage
+from services.metrics import metrics
+from services.prompt_cache import prompt_time
+from services.prompts import IMAGE_PARSE_SYSTEM_PROMPT, TEXT_PARSE_PROMPT
+
+PROMPTS = [
+    agent_prompts.INTENT_CLASSIFIER_PROMPT,
+    agent_prompts.INTENT_EXTRACTION_PROMPT,
+    agent_prompts.CHAT_PROMPT,
+    agent_prompts.EVENT_MATCH_PROMPT,
+    agent_prompts.EVENT_EXTRACTION_PROMPT,
+    agent_prompts.EVENT_UPDATE_PROMPT,
+    agent_prompts.EVENT_QUERY_PROMPT,
+    TEXT_PARSE_PROMPT,
+]
+
+
+def render(prompt, current_time: str, message: str) -> list:
+    values = {
+        "current_time": current_time,
+        "message": message,
+        "user_description": message,
+        "user_message": message,
+        "text": message,
+        "image_note": "",
+        "additional_note": "None",
+        "conversation_history": "user: hi\nassistant: hello",
+        "events_list": "#1 | 2026-02-02 10:00–11:00 | Team meeting | @Room 201",
+        "original_event": '{"title": "Team meeting"}',
+    }
+    return prompt.format_messages(**{k: v for k, v in values.items() if k in prompt.input_variables})
+
+
+def test_prompt_time_rounded_to_minute():
+    """提示词中的时间精确到分钟"""
+    assert prompt_time(datetime(2026, 2, 1, 14, 5, 59, 999999)) == "2026-02-01T14:05"
+
+
+@pytest.mark.parametrize("prompt", PROMPTS, ids=lambda p: p.messages[0].prompt.template[:40])
+def test_system_message_is_static(prompt):
+    """system 消息不含变量；变化的值放在 user 消息中，且用户消息在最后"""
+    assert prompt.messages[0].prompt.input_variables == []
+
+    first = render(prompt, "2026-02-01T14:05", "cancel the dentist")
+    second = render(prompt, "2026-02-01T14:05", "what about lunch")
+
+    assert first[0].content == second[0].content
+    # Everything before the user's own message is shared
+    user_first, user_second = first[-1].content, second[-1].content
+    assert user_first[:user_first.index("cancel the dentist")] == user_second[:user_second.index("what about lunch")]
+
+
+def test_image_parse_system_prompt_static():
+    """图片解析的 system 消息是固定文本（当前时间在 user 消息中）"""
+    assert "{current_time}" not in IMAGE_PARSE_SYSTEM_PROMPT
+    assert '{"events": [{"title": "Cursor AI Hackathon"' in IMAGE_PARSE_SYSTEM_PROMPT
+
+
+def test_cached_tokens_recorded_per_call():
+    """每次调用记录缓存命中的 prompt token 及其占比"""
+    metrics.clear()
+    response = AIMessage(
+        content="ok",
+        usage_metadata={"input_tokens": 2048, "output_tokens": 10, "total_tokens": 2058, "input_token_details": {"cache_read": 1536}},
+    )
+    uncached = AIMessage(content="ok", usage_metadata={"input_tokens": 2048, "output_tokens": 10, "total_tokens": 2058})
+
+    with llm_node("intent_classifier"):
+        record_llm_usage(response, "gpt-test")
+        record_llm_usage(uncached, "gpt-test")
+
+    assert metrics.counter("llm_tokens_total", node="intent_classifier", model="gpt-test", type="prompt_cached") == 1536
+    count, total = metrics.histogram_count("llm_prompt_cached_ratio", node="intent_classifier")
+    assert count == 2
+    assert total == pytest.approx(0.75)
+    metrics.clear()
@@ -0,0 +1,114 @@
+"""
+日程查询规划器测试
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Event, User
+from services.agent.query_planner import execute_plan, plan_query, render_answer
+
+NOW = datetime(2026, 3, 4, 9, 0)  # Wednesday
+
+
+@pytest.mark.parametrize("message,start,end", [
+    ("what do I have tomorrow", datetime(2026, 3, 5), datetime(2026, 3, 6)),
+    ("was habe ich heute", datetime(2026, 3, 4), datetime(2026, 3, 5)),
+    ("这周末有什么安排", datetime(2026, 3, 7), datetime(2026, 3, 9)),
+    ("show my events next week", datetime(2026, 3, 9), datetime(2026, 3, 16)),
+    ("anything on Friday?", datetime(2026, 3, 6), datetime(2026, 3, 7)),
+])
+def test_common_shapes_are_templated(message, start, end):
+    """常见时间范围直接生成过滤条件并使用模板回答"""
+    plan = plan_query(message, NOW)
+    assert plan.templated
+    assert (plan.start, plan.end) == (start, end)
+
+
+@pytest.mark.parametrize("message,start,end", [
+    ("what did I have last week", datetime(2026, 2, 23), datetime(2026, 3, 2)),
+    ("was hatte ich gestern", datetime(2026, 3, 3), datetime(2026, 3, 4)),
+    ("what is happening in May", datetime(2026, 5, 1), datetime(2026, 6, 1)),
+    ("was habe ich im Mai", datetime(2026, 5, 1), datetime(2026, 6, 1)),
+    ("what did I have in January", datetime(2026, 1, 1), datetime(2026, 2, 1)),
+    ("what do I have in January", datetime(2027, 1, 1), datetime(2027, 2, 1)),
+])
+def test_past_and_month_ranges(message, start, end):
+    """过去的时间范围和月份名称生成日期范围，而不是关键词"""
+    plan = plan_query(message, NOW)
+    assert plan.templated
+    assert plan.keywords == ()
+    assert (plan.start, plan.end) == (start, end)
+
+
+def test_keyword_lookup_covers_past_events(db):
+    """只有关键词的问题（如 when was ...）搜索全部活动，包括过去的"""
+    plan = plan_query("when was my dentist appointment", NOW)
+    assert (plan.start, plan.end) == (None, None)
+    assert plan.keywords == ("dentist", "appointment")
+
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    db.add_all([
+        Event(user_id=user_id, title="Dentist appointment", start_time=NOW - timedelta(days=40), source_type="manual"),
+        Event(user_id=user_id, title="Team meeting", start_time=NOW + timedelta(days=1), source_type="manual"),
+    ])
+    db.commit()
+
+    events, total = execute_plan(db, user_id, plan, max_events=20)
+    assert [e.title for e in events] == ["Dentist appointment"]
+
+    # Keyword outside the date range: the text filter is retried without the dates
+    events, total = execute_plan(db, user_id, plan_query("any dentist appointment next week", NOW), max_events=20)
+    assert [e.title for e in events] == ["Dentist appointment"]
+
+
+def test_keyword_and_location_need_llm():
+    """包含关键词或地点的问题交给 LLM 总结"""
+    plan = plan_query("concerts in Hamburg next week", NOW)
+    assert not plan.templated
+    assert plan.keywords == ("concert",)
+    assert plan.location == "Hamburg"
+
+    plan = plan_query("when is my dentist appointment", NOW)
+    assert not plan.templated
+    assert plan.keywords == ("dentist", "appointment")
+
+
+def test_followed_only():
+    """识别仅查看关注的活动"""
+    plan = plan_query("show my followed events", NOW)
+    assert plan.followed_only and plan.templated
+
+
+def test_execute_plan_filters_in_sql(db):
+    """SQL 只返回时间范围内且匹配关键词的活动"""
+    user_id = db.query(User).filter(User.username == "alice").first().id
+    other_id = db.query(User).filter(User.username == "bob").first().id
+    db.add_all([
+        Event(user_id=user_id, title="Dentist", start_time=NOW + timedelta(days=1, hours=2), source_type="manual"),
+        Event(user_id=user_id, title="Team meeting", start_time=NOW + timedelta(days=1, hours=5), location="Room 201", source_type="manual"),
+        Event(user_id=user_id, title="Team meeting", start_time=NOW + timedelta(days=8), source_type="manual"),
+        Event(user_id=other_id, title="Bob's meeting", start_time=NOW + timedelta(days=1), source_type="manual"),
+    ])
+    db.commit()
+
+    events, total = execute_plan(db, user_id, plan_query("what do I have tomorrow", NOW), max_events=20)
+    assert total == 2
+    assert [e.title for e in events] == ["Dentist", "Team meeting"]
+
+    events, total = execute_plan(db, user_id, plan_query("what meetings do I have tomorrow", NOW), max_events=20)
+    assert [e.title for e in events] == ["Team meeting"]
+
+    # Keyword matches nothing: fall back to the date range alone
+    events, total = execute_plan(db, user_id, plan_query("any concerts tomorrow", NOW), max_events=20)
+    assert total == 2
+
+    answer = render_answer(plan_query("what do I have tomorrow", NOW), events[:1], total)
+    assert answer.startswith("You have 2 events tomorrow:")
+    assert "...and 1 more." in answer
+
+
+def test_render_no_events():
+    """没有活动时给出友好回复"""
+    assert render_answer(plan_query("what do I have this weekend", NOW), [], 0) == "You have no events this weekend."
+    assert render_answer(plan_query("what did I have last week", NOW), [], 0) == "You had no events last week."
@@ -0,0 +1,135 @@
+"""
+搜索缓存测试：查询规范化、TTL 与空结果缓存、搜索结果提取缓存
+"""
+import pytest
+from langchain_core.messages import AIMessage
+
+from config import settings
+from services import llm_service, search_service
+from services.metrics import metrics
+from services.search_cache import SearchCache, canonical_date, extraction_key, search_cache, search_key
+from services.search_service import SearchResult, extract_event_details_from_search, search_event_info
+
+RESULTS = [
+    SearchResult(title="Beethoven at Elbphilharmonie", link="https://example.com/1", snippet="Feb 15, 2026 19:30"),
+    SearchResult(title="Schedule", link="https://example.com/2", snippet="Upcoming concerts"),
+]
+
+
+@pytest.fixture
+def fake_tavily(monkeypatch):
+    """Tavily 替身：记录查询，返回 responses[0]（None 表示请求失败）"""
+    calls = []
+    responses = [RESULTS]
+
+    async def search(query):
+        calls.append(query)
+        return responses[0]
+
+    monkeypatch.setattr(settings, "ENABLE_WEB_SEARCH", True)
+    monkeypatch.setattr(settings, "TAVILY_API_KEY", "tvly-test")
+    monkeypatch.setattr(search_service, "_search_with_tavily", search)
+    return calls, responses
+
+
+def test_query_normalization():
+    """大小写、标点、停用词、词序、地点与日期写法不同的查询使用同一个键"""
+    assert search_key("The Beethoven Concert!", "Hamburg", "15.02.2026") == search_key(
+        "beethoven  concert in hamburg", None, "February 15, 2026"
+    )
+    assert search_key("Beethoven Concert", "Hamburg") != search_key("Beethoven Concert", "Berlin")
+    assert search_key("Beethoven", date_hint="2026-02-15") != search_key("Beethoven", date_hint="2026-02-16")
+
+    assert canonical_date("2026-02-15T19:30") == "2026-02-15"
+    # Day <= 12: ISO stays year-month-day, dotted dates are day-first
+    assert canonical_date("2026-03-02") == "2026-03-02"
+    assert canonical_date("2026-03-02 19:30") == "2026-03-02"
+    assert canonical_date("03.02.2026") == "2026-02-03"
+    assert search_key("Beethoven", date_hint="2026-03-02") != search_key("Beethoven", date_hint="03.02.2026")
+    assert search_key("Beethoven", date_hint="2026-03-02") == search_key("Beethoven", date_hint="02.03.2026")
+    assert canonical_date("Feb 2026") == "2026-02"
+    assert canonical_date("next weekend") is None
+
+
+@pytest.mark.asyncio
+async def test_repeat_search_served_from_cache(fake_tavily):
+    """相同（规范化后）的搜索第二次不访问搜索服务"""
+    calls, _ = fake_tavily
+
+    first = await search_event_info("Beethoven Concert", location_hint="Hamburg")
+    second = await search_event_info("beethoven concert", location_hint="hamburg")
+
+    assert first == second == RESULTS
+    assert len(calls) == 1
+    assert metrics.counter("search_cache_requests_total", kind="search", result="hit") == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_results_cached_with_negative_ttl(fake_tavily, monkeypatch):
+    """空结果使用较短的 TTL 缓存；请求失败不缓存"""
+    calls, responses = fake_tavily
+    stored = []
+    monkeypatch.setattr(search_cache.results, "set", lambda key, value, ttl=None: stored.append((value, ttl)))
+
+    responses[0] = []
+    assert await search_event_info("Unknown Festival") == []
+    assert stored == [((), search_cache.negative_ttl)]
+
+    responses[0] = None
+    assert await search_event_info("Another Festival") == []
+    assert len(stored) == 1
+
+    responses[0] = RESULTS
+    await search_event_info("Known Festival")
+    assert stored[-1] == (tuple(RESULTS), None)
+
+
+def test_entries_expire():
+    """条目在 TTL 后过期，空结果更早过期"""
+    cache = SearchCache(ttl=0.2, negative_ttl=0.0)
+    cache.put_results(("beethoven", ""), RESULTS)
+    cache.put_results(("nothing", ""), [])
+
+    assert cache.get_results(("beethoven", "")) == RESULTS
+    assert cache.get_results(("nothing", "")) is None
+
+
+@pytest.mark.asyncio
+async def test_search_cache_disabled(fake_tavily, monkeypatch):
+    """ENABLE_SEARCH_CACHE=false 时每次都搜索"""
+    calls, _ = fake_tavily
+    monkeypatch.setattr(settings, "ENABLE_SEARCH_CACHE", False)
+
+    await search_event_info("Beethoven Concert")
+    await search_event_info("Beethoven Concert")
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_extraction_cached(monkeypatch):
+    """相同结果集和部分活动信息的提取只调用一次 LLM；失败（None）不缓存"""
+    replies = ['{"event_name": "Beethoven 9", "start_time": "2026-02-15T19:30:00"}']
+    prompts = []
+
+    class FakeLLM:
+        async def ainvoke(self, prompt, **kwargs):
+            prompts.append(prompt)
+            return AIMessage(content=replies[0])
+
+    monkeypatch.setattr(llm_service, "get_llm", lambda *args, **kwargs: FakeLLM())
+    partial = {"title": "Beethoven", "location_hint": "Hamburg"}
+
+    first = await extract_event_details_from_search(RESULTS, partial)
+    second = await extract_event_details_from_search(list(RESULTS), dict(partial))
+
+    assert first == second
+    assert first.start_time == "2026-02-15T19:30:00"
+    assert len(prompts) == 1
+    assert extraction_key(RESULTS, partial) != extraction_key(RESULTS[:1], partial)
+
+    replies[0] = "not json"
+    other = {"title": "Mahler"}
+    assert await extract_event_details_from_search(RESULTS, other) is None
+    assert await extract_event_details_from_search(RESULTS, other) is None
+    assert len(prompts) == 3
@@ -0,0 +1,147 @@
+"""
+搜索客户端测试：共享连接池上的异步 Tavily/SerpAPI 请求、按服务商超时
+
+本地起一个假的搜索服务（uvicorn，随机端口），不访问外网。
+"""
+import asyncio
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import settings
+from services.metrics import metrics
+from services.search_service import (
+    _search_with_serpapi,
+    _search_with_tavily,
+    search_event_info_sync,
+    search_http,
+)
+
+
+class FakeSearchServer:
+    """Tavily + SerpAPI lookalike that records how many requests overlap"""
+
+    def __init__(self):
+        self.delay = 0.3
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+        self.app = Starlette(routes=[
+            Route("/search", self.tavily, methods=["POST"]),
+            Route("/search.json", self.serpapi, methods=["GET"]),
+        ])
+
+    async def _slow(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+    async def tavily(self, request: Request):
+        body = await request.json()
+        self.requests.append(("tavily", body, request.headers.get("authorization")))
+        await self._slow()
+        return JSONResponse({"results": [
+            {"title": f"Result for {body['query']}", "url": "https://example.com/a", "content": "Feb 15, 19:30"},
+        ]})
+
+    async def serpapi(self, request: Request):
+        self.requests.append(("serpapi", dict(request.query_params), None))
+        await self._slow()
+        return JSONResponse({"organic_results": [
+            {"title": "Concert", "link": "https://example.com/b", "snippet": "Elbphilharmonie"},
+            {"title": "Schedule", "link": "https://example.com/c", "snippet": "Upcoming"},
+        ]})
+
+
+@pytest.fixture(scope="module")
+def search_server(local_server):
+    fake = FakeSearchServer()
+    fake.url = local_server(fake.app)
+    return fake
+
+
+@pytest.fixture
+def fake_providers(search_server, monkeypatch):
+    search_server.delay = 0.3
+    search_server.max_active = 0
+    search_server.requests.clear()
+    monkeypatch.setattr(settings, "TAVILY_BASE_URL", search_server.url)
+    monkeypatch.setattr(settings, "SERPAPI_BASE_URL", search_server.url)
+    monkeypatch.setattr(settings, "TAVILY_API_KEY", "tvly-test")
+    monkeypatch.setattr(settings, "SERPAPI_KEY", "serp-test")
+    monkeypatch.setattr(settings, "SEARCH_PROVIDER_TIMEOUTS", {})
+    return search_server
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_do_not_serialize(fake_providers):
+    """5 个并发搜索同时在服务端执行，总耗时接近单次而不是 5 倍"""
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_search_with_tavily(f"concert {i}") for i in range(5)))
+    elapsed = time.perf_counter() - started
+    await search_http.aclose()
+
+    assert all(len(r) == 1 for r in results)
+    assert results[3][0].title == "Result for concert 3"
+    assert fake_providers.max_active == 5
+    assert elapsed < 5 * fake_providers.delay * 0.6
+
+
+@pytest.mark.asyncio
+async def test_tavily_request_format(fake_providers):
+    """Tavily 请求：Bearer 认证、advanced 深度、最多 5 条"""
+    fake_providers.delay = 0
+    await _search_with_tavily("Beethoven Hamburg")
+    await search_http.aclose()
+
+    provider, body, auth = fake_providers.requests[0]
+    assert provider == "tavily"
+    assert body == {"query": "Beethoven Hamburg", "search_depth": "advanced", "max_results": 5}
+    assert auth == "Bearer tvly-test"
+
+
+@pytest.mark.asyncio
+async def test_serpapi_results_parsed(fake_providers):
+    """SerpAPI 的 organic_results 解析为 SearchResult"""
+    fake_providers.delay = 0
+    results = await _search_with_serpapi("Beethoven Hamburg")
+    await search_http.aclose()
+
+    assert [r.link for r in results] == ["https://example.com/b", "https://example.com/c"]
+    _, params, _ = fake_providers.requests[0]
+    assert params["q"] == "Beethoven Hamburg"
+    assert params["api_key"] == "serp-test"
+    assert params["engine"] == "google"
+
+
+@pytest.mark.asyncio
+async def test_provider_timeout(fake_providers, monkeypatch):
+    """超过服务商超时时间返回 None（失败，不缓存）并计入错误数"""
+    monkeypatch.setattr(settings, "SEARCH_PROVIDER_TIMEOUTS", {"tavily": 0.1})
+
+    started = time.perf_counter()
+    results = await _search_with_tavily("slow query")
+    elapsed = time.perf_counter() - started
+    await search_http.aclose()
+
+    assert results is None
+    assert elapsed < fake_providers.delay
+    assert metrics.counter("search_errors_total", provider="tavily") == 1
+
+
+def test_sync_wrapper(fake_providers, monkeypatch):
+    """同步版本只是异步搜索的包装"""
+    fake_providers.delay = 0
+    monkeypatch.setattr(settings, "ENABLE_WEB_SEARCH", True)
+
+    results = search_event_info_sync("Beethoven", location_hint="Hamburg")
+
+    assert results[0].link == "https://example.com/a"
+    assert fake_providers.requests[0][1]["query"] == "Beethoven Hamburg"
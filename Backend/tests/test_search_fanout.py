@@ -0,0 +1,152 @@
+"""
+搜索扇出测试：查询变体、RRF 融合与 URL 去重、并发上限、提前返回
+"""
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services import search_service
+from services.metrics import metrics
+from services.search_fanout import fan_out, fuse_results, normalize_url, query_variants
+from services.search_service import SearchResult, search_event_info
+
+
+def result(link: str, title: str = "") -> SearchResult:
+    return SearchResult(title=title or link, link=link, snippet="")
+
+
+def test_query_variants():
+    """标题、标题 + 地点、标题 + 日期；重复的变体只保留一个"""
+    assert query_variants("Beethoven 9", "Hamburg", "2026-02-15") == [
+        "Beethoven 9",
+        "Beethoven 9 Hamburg",
+        "Beethoven 9 2026-02-15",
+    ]
+    assert query_variants("Beethoven 9") == ["Beethoven 9"]
+    assert query_variants("Beethoven", "", None) == ["Beethoven"]
+
+
+def test_normalize_url():
+    """协议、www、结尾斜杠、锚点和跟踪参数不影响 URL 去重"""
+    assert normalize_url("https://www.Example.com/event/1/?utm_source=x#tickets") == normalize_url(
+        "http://example.com/event/1"
+    )
+    assert normalize_url("https://example.com/e?id=1") != normalize_url("https://example.com/e?id=2")
+
+
+def test_reciprocal_rank_fusion():
+    """多个列表中都靠前的结果排在前面；同一 URL 只出现一次"""
+    tavily = [result("https://a.com"), result("https://b.com"), result("https://c.com")]
+    serpapi = [result("https://www.b.com/"), result("https://d.com"), result("https://a.com")]
+    variant = [result("https://b.com"), result("https://e.com")]
+
+    fused = fuse_results([tavily, serpapi, variant], k=60)
+
+    assert [normalize_url(r.link) for r in fused] == ["b.com", "a.com", "d.com", "e.com", "c.com"]
+    # The entry from the best-ranked appearance is kept
+    assert fused[0].link == "https://www.b.com/"
+    assert len(fuse_results([tavily, serpapi], limit=2)) == 2
+
+
+@pytest.mark.asyncio
+async def test_bounded_concurrency():
+    """同时进行的搜索不超过 max_concurrency"""
+    active = peak = 0
+
+    async def search(query):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return [result(f"https://{query.replace(' ', '-')}.com")]
+
+    fused = await fan_out(
+        {"tavily": search, "serpapi": search},
+        ["a", "a b", "a c"],
+        max_concurrency=2,
+        early_results=0,
+    )
+
+    assert peak == 2
+    assert len(fused) == 3
+    assert metrics.counter("search_fanout_total", outcome="complete") == 1
+    assert metrics.counter("search_fanout_calls_total", provider="serpapi", result="ok") == 3
+
+
+@pytest.mark.asyncio
+async def test_early_return_cancels_slow_calls():
+    """足够多的结果被多个列表确认后提前返回，取消剩余的慢请求"""
+    shared = [result("https://a.com"), result("https://b.com")]
+
+    async def fast(query):
+        return shared + [result(f"https://{len(query)}.com")]
+
+    async def slow(query):
+        await asyncio.sleep(5)
+        return [result("https://slow.com")]
+
+    started = time.perf_counter()
+    fused = await fan_out(
+        {"tavily": fast, "serpapi": slow},
+        ["a", "a b"],
+        max_concurrency=4,
+        early_results=2,
+        min_agreement=2,
+    )
+
+    assert time.perf_counter() - started < 1
+    assert [r.link for r in fused[:2]] == ["https://a.com", "https://b.com"]
+    assert metrics.counter("search_fanout_total", outcome="early") == 1
+    assert metrics.counter("search_fanout_calls_total", provider="serpapi", result="cancelled") == 2
+
+
+@pytest.mark.asyncio
+async def test_all_calls_failed():
+    """全部失败时返回 None（调用方不缓存）"""
+    async def failing(query):
+        return None
+
+    async def raising(query):
+        raise RuntimeError("boom")
+
+    assert await fan_out({"tavily": failing, "serpapi": raising}, ["a"]) is None
+    assert metrics.counter("search_fanout_total", outcome="failed") == 1
+
+
+@pytest.mark.asyncio
+async def test_search_event_info_fanout(monkeypatch):
+    """SEARCH_FANOUT=true 时所有已配置的服务商都搜索每个查询变体，并记录各自的延迟"""
+    calls = []
+
+    def provider(name):
+        async def search(query):
+            calls.append((name, query))
+            return [result(f"https://{name}.com"), result("https://official.com")]
+        return search
+
+    monkeypatch.setattr(settings, "ENABLE_WEB_SEARCH", True)
+    monkeypatch.setattr(settings, "TAVILY_API_KEY", "tvly-test")
+    monkeypatch.setattr(settings, "SERPAPI_KEY", "serp-test")
+    monkeypatch.setattr(settings, "SEARCH_FANOUT", True)
+    monkeypatch.setattr(settings, "SEARCH_FANOUT_EARLY_RESULTS", 0)
+    monkeypatch.setattr(search_service, "_search_with_tavily", provider("tavily"))
+    monkeypatch.setattr(search_service, "_search_with_serpapi", provider("serpapi"))
+
+    results = await search_event_info("Beethoven", location_hint="Hamburg", date_hint="2026-02-15")
+
+    assert sorted(calls) == sorted(
+        (name, query)
+        for name in ("tavily", "serpapi")
+        for query in ("Beethoven", "Beethoven Hamburg", "Beethoven 2026-02-15")
+    )
+    assert results[0].link == "https://official.com"
+    assert {r.link for r in results} == {"https://official.com", "https://tavily.com", "https://serpapi.com"}
+    assert metrics.histogram_count("search_request_duration_seconds", provider="tavily")[0] == 3
+    assert metrics.histogram_count("search_request_duration_seconds", provider="serpapi")[0] == 3
+
+    # Fused results are cached like single-provider results
+    assert await search_event_info("beethoven", location_hint="hamburg", date_hint="15.02.2026") == results
+    assert len(calls) == 6
@@ -2,7 +2,7 @@
 Tests for Web Search Service
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from services.search_service import (
     SearchResult,
     EventSearchResult,
@@ -128,7 +128,7 @@ async def test_extract_event_details_from_search(mock_get_llm, mock_search_resul
         "price_range": "€49 - €120",
         "source_url": "https://www.elbphilharmonie.de/event/123"
     }'''
-    mock_llm.invoke.return_value = mock_response
+    mock_llm.ainvoke = AsyncMock(return_value=mock_response)
     mock_get_llm.return_value = mock_llm
     
     result = await extract_event_details_from_search(
@@ -0,0 +1,133 @@
+"""
+Single-flight 请求合并测试
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from schemas import ParsedEvent
+from services import llm_service, search_service
+from services.llm_service import ParseResult
+from services.metrics import metrics
+from services.parse_cache import parse_cache
+from services.search_service import SearchResult
+from services.singleflight import SingleFlight, coalesced_count
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    metrics.clear()
+    parse_cache.clear()
+    yield
+    parse_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_call():
+    """相同键的并发调用只执行一次，结果共享"""
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+
+    assert results == ["result"] * 3
+    assert len(calls) == 1
+    assert coalesced_count("test") == 2
+    assert flight.in_flight() == 0
+
+    # Finished calls are not reused
+    await flight.do("key", work)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_exceptions_are_shared():
+    """上游异常传递给所有等待者"""
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancellation_only_when_all_waiters_leave():
+    """一个等待者取消不影响其他等待者；全部取消时才取消上游调用"""
+    flight = SingleFlight("test")
+    upstream_cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(0.1)
+            return "done"
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    first = asyncio.ensure_future(flight.do("k", slow))
+    second = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "done"
+    assert not upstream_cancelled.is_set()
+
+    only = asyncio.ensure_future(flight.do("k2", slow))
+    await asyncio.sleep(0.01)
+    only.cancel()
+    await asyncio.sleep(0.01)
+    assert upstream_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_double_tap_parse_makes_one_llm_call(monkeypatch):
+    """重复提交的同一张图片只触发一次 Vision 调用"""
+    calls = []
+
+    async def fake_parse(image_base64, additional_note=None):
+        calls.append(image_base64)
+        await asyncio.sleep(0.05)
+        return ParseResult(events=[ParsedEvent(title="Poster", start_time=datetime(2026, 5, 1, 19), source_type="image")])
+
+    monkeypatch.setattr(llm_service, "_parse_image_with_llm", fake_parse)
+
+    first, second = await asyncio.gather(
+        llm_service.parse_image_with_llm("aW1hZ2U=", "note"),
+        llm_service.parse_image_with_llm("aW1hZ2U=", "note"),
+    )
+
+    assert len(calls) == 1
+    assert first.events[0].title == second.events[0].title == "Poster"
+    assert coalesced_count("parse") == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_searches_coalesced(monkeypatch):
+    """查询仅大小写/空白不同的并发搜索合并为一次"""
+    calls = []
+
+    async def fake_search(query, location_hint=None, date_hint=None):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return [SearchResult(title="Concert", link="https://example.com", snippet="Feb 15")]
+
+    monkeypatch.setattr(search_service, "_search_event_info", fake_search)
+
+    results = await asyncio.gather(
+        search_service.search_event_info("Hamburg Concert", location_hint="Hamburg"),
+        search_service.search_event_info("hamburg  concert", location_hint="Hamburg"),
+        search_service.search_event_info("Berlin Concert"),
+    )
+
+    assert len(calls) == 2
+    assert results[0] == results[1]
+    assert coalesced_count("search") == 1
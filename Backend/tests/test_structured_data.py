@@ -0,0 +1,361 @@
+"""
+结构化数据测试：从活动页面读取 schema.org Event（JSON-LD / microdata / iCal），
+以及搜索结果提取前的页面抓取阶段
+
+页面来自 tests/fixtures/event_pages，由本地 uvicorn 服务提供，不访问外网。
+"""
+import asyncio
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+from starlette.applications import Starlette
+from starlette.responses import RedirectResponse, Response
+from starlette.routing import Route
+
+from config import settings
+from services import llm_service, search_service, structured_data
+from services.metrics import metrics
+from services.search_service import SearchResult, _is_fetchable, extract_event_details_from_search, search_http
+from services.structured_data import parse_html, parse_ical, pick_event
+
+PAGES = Path(__file__).parent / "fixtures" / "event_pages"
+
+# Fixture events take place in 2026
+NOW = datetime(2026, 1, 15, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def fixed_now(monkeypatch):
+    monkeypatch.setattr(structured_data, "_now", lambda: NOW)
+
+
+def page(name: str, base_url: str = "https://www.example.com/events/page"):
+    return parse_html((PAGES / name).read_text(encoding="utf-8"), base_url)
+
+
+def test_json_ld_event():
+    """JSON-LD（@graph 中的 MusicEvent）：时间去掉时区、地点与地址、票价范围"""
+    data = page("jsonld_event.html", "https://www.elbphilharmonie.de/de/konzerte")
+
+    assert len(data.events) == 1
+    event = data.events[0]
+    assert event["source"] == "json_ld"
+    assert event["event_name"] == "Beethoven: Symphony No. 9"
+    assert event["start_time"] == "2026-02-15T19:30:00"
+    assert event["end_time"] == "2026-02-15T21:45:00"
+    assert event["location"] == "Elbphilharmonie Grand Hall"
+    assert event["venue_address"] == "Platz der Deutschen Einheit 1, 20457 Hamburg, DE"
+    assert event["description"] == "Hamburg Philharmonic State Orchestra & choir perform Beethoven's Ninth."
+    assert event["ticket_url"] == "https://tickets.example.com/beethoven-9"
+    assert event["price_range"] == "49 - 120 EUR"
+    assert event["source_url"] == "https://www.elbphilharmonie.de/de/konzerte/beethoven-9/12345"
+
+
+def test_microdata_event():
+    """Microdata：嵌套的 Place / PostalAddress / Offer，time 的 datetime 属性，免费票"""
+    data = page("microdata_event.html")
+
+    event = data.events[0]
+    assert event["source"] == "microdata"
+    assert event["event_name"] == "Cursor AI Hackathon Hamburg"
+    assert event["start_time"] == "2026-03-07T09:00:00"
+    assert event["end_time"] == "2026-03-08T00:00:00"
+    assert event["location"] == "Hamburg Congress Center"
+    assert event["venue_address"] == "Marseiller Str. 1, 20355 Hamburg"
+    assert event["description"] == "Two days of building with AI coding tools. Teams of up to four."
+    assert event["price_range"] == "Free"
+    assert event["ticket_url"] == "https://www.example.com/register"
+
+
+def test_ical_links_and_vevent():
+    """页面中的 .ics / webcal 链接，以及 iCal 文件中的 VEVENT"""
+    data = page("ical_link.html")
+
+    assert data.events == []
+    assert data.ical_links == [
+        "https://www.example.com/feeds/hafengeburtstag.ics",
+        "https://example.com/feeds/hafengeburtstag.ics",
+    ]
+
+    events = parse_ical((PAGES / "hafengeburtstag.ics").read_text(), "https://example.com/feeds/hafengeburtstag.ics")
+    assert events[0]["event_name"] == "Hafengeburtstag Hamburg 2026"
+    assert events[0]["start_time"] == "2026-05-08T12:00:00"
+    assert events[0]["end_time"] == "2026-05-10T22:00:00"
+    assert events[0]["location"] == "Landungsbruecken, Hamburg"
+    assert events[0]["source_url"] == "https://example.com/hafengeburtstag"
+
+
+def test_listing_page_needs_title_match():
+    """列出多个活动的页面：按标题选择；没有匹配的标题时不使用"""
+    data = page("venue_listing.html")
+
+    assert len(data.events) == 3  # The broken JSON-LD script is skipped
+    assert pick_event(data.events, "Brahms piano concerto")["start_time"] == "2026-02-14T19:00:00"
+    assert pick_event(data.events, "Beethoven 9") is None
+    assert page("no_structured_data.html") == ([], [])
+
+
+def test_single_event_needs_title_match():
+    """页面上唯一的活动也要与标题匹配（搜索 Hamburg Marathon 可能返回柏林马拉松的页面）"""
+    events = page("jsonld_utc_event.html").events
+
+    assert pick_event(events, "Hamburg Marathon") is None
+    assert pick_event(events, "Berlin Marathon")["event_name"] == "Berlin Marathon 2026"
+    assert pick_event(events, None) is None
+
+
+def test_past_edition_and_date_hint():
+    """已经结束的活动（往届页面）和与日期提示冲突的活动不使用"""
+    assert pick_event(page("past_edition.html").events, "Hamburg Marathon") is None
+
+    events = page("jsonld_event.html").events
+    assert pick_event(events, "Beethoven 9", date_hint="2026-02-15") is not None
+    assert pick_event(events, "Beethoven 9", date_hint="15.02.2026") is not None
+    assert pick_event(events, "Beethoven 9", date_hint="Feb 2026") is not None
+    assert pick_event(events, "Beethoven 9", date_hint="next weekend") is not None
+    assert pick_event(events, "Beethoven 9", date_hint="2026-03-15") is None
+    assert pick_event(events, "Beethoven 9", now=datetime(2026, 2, 16)) is None
+
+    # Multi-day events match any day they cover
+    events = parse_ical((PAGES / "hafengeburtstag.ics").read_text())
+    assert pick_event(events, "Hafengeburtstag", date_hint="2026-05-09") is not None
+
+
+def test_utc_times_converted(monkeypatch):
+    """UTC 时间（Z）转换为 EVENT_TIMEZONE，带其他时区偏移的时间保持当地时间"""
+    monkeypatch.setattr(settings, "EVENT_TIMEZONE", "Europe/Berlin")
+
+    event = page("jsonld_utc_event.html").events[0]
+    assert event["start_time"] == "2026-09-27T09:15:00"  # CEST
+    assert event["end_time"] == "2026-09-27T16:00:00"
+
+    event = parse_ical((PAGES / "utc_event.ics").read_text())[0]
+    assert event["start_time"] == "2026-02-15T19:30:00"  # CET
+    assert event["end_time"] == "2026-02-15T21:45:00"
+
+
+@pytest.mark.asyncio
+async def test_private_addresses_not_fetched(monkeypatch):
+    """不抓取 localhost / 内网地址和非 http(s) 链接；域名解析出的所有地址都要检查"""
+    monkeypatch.setattr(settings, "PAGE_FETCH_ALLOW_PRIVATE", False)
+    dns = {
+        "www.elbphilharmonie.de": ["116.203.1.1"],
+        "intranet.example.com": ["10.0.0.7"],
+        "mixed.example.com": ["116.203.1.1", "127.0.0.1"],
+        "v6.example.com": ["::1"],
+    }
+
+    async def resolve(host, port):
+        if host not in dns:
+            raise OSError("Name or service not known")
+        return dns[host]
+
+    monkeypatch.setattr(search_service, "_resolve", resolve)
+
+    assert await _is_fetchable("https://www.elbphilharmonie.de/event")
+    assert not await _is_fetchable("http://127.0.0.1:8000/admin")
+    assert not await _is_fetchable("http://10.0.0.5/")
+    assert not await _is_fetchable("http://[::1]/")
+    assert not await _is_fetchable("http://localhost/")
+    assert not await _is_fetchable("http://intranet.example.com/")
+    assert not await _is_fetchable("http://mixed.example.com/")
+    assert not await _is_fetchable("http://v6.example.com/")
+    assert not await _is_fetchable("http://unknown.example.com/")
+    assert not await _is_fetchable("file:///etc/passwd")
+
+
+# ============================================================================
+# Page fetch stage
+# ============================================================================
+
+class FakePages:
+    """Serves the fixture pages, plus an oversized and a slow page"""
+
+    def __init__(self):
+        self.requests = []
+
+        async def serve(request):
+            name = request.path_params["name"]
+            self.requests.append(name)
+            if name == "huge.html":
+                return Response("<html>" + "x" * 50_000 + "</html>", media_type="text/html")
+            if name == "slow.html":
+                await asyncio.sleep(2)
+                return Response((PAGES / "jsonld_event.html").read_text(), media_type="text/html")
+            path = PAGES / name
+            if not path.exists():
+                return Response("not found", status_code=404)
+            media_type = "text/calendar" if name.endswith(".ics") else "text/html"
+            return Response(path.read_bytes(), media_type=media_type)
+
+        async def redirect(request):
+            self.requests.append(f"redirect/{request.path_params['name']}")
+            return RedirectResponse(f"/events/{request.path_params['name']}", status_code=302)
+
+        async def redirect_out(request):
+            self.requests.append("redirect_out")
+            return RedirectResponse("http://169.254.169.254/latest/meta-data/", status_code=302)
+
+        self.app = Starlette(routes=[
+            Route("/events/{name}", serve),
+            Route("/feeds/{name}", serve),
+            Route("/redirect/out", redirect_out),
+            Route("/redirect/{name}", redirect),
+        ])
+
+
+@pytest.fixture(scope="module")
+def page_server(local_server):
+    fake = FakePages()
+    fake.url = local_server(fake.app)
+    return fake
+
+
+@pytest.fixture
+def page_fetch(page_server, monkeypatch):
+    """Page fetch enabled against the local server; the LLM records its calls"""
+    monkeypatch.setattr(settings, "ENABLE_PAGE_FETCH", True)
+    monkeypatch.setattr(settings, "PAGE_FETCH_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(settings, "PAGE_FETCH_MAX_BYTES", 20_000)
+    monkeypatch.setattr(settings, "PAGE_FETCH_TIMEOUT", 0.5)
+    prompts = []
+
+    class FakeLLM:
+        async def ainvoke(self, prompt, **kwargs):
+            prompts.append(prompt)
+            return AIMessage(content='{"event_name": "From LLM", "start_time": "2026-01-01T10:00:00"}')
+
+    monkeypatch.setattr(llm_service, "get_llm", lambda *args, **kwargs: FakeLLM())
+    page_server.requests.clear()
+    return page_server, prompts
+
+
+def hits(server, *names):
+    return [SearchResult(title=name, link=f"{server.url}/events/{name}", snippet="") for name in names]
+
+
+@pytest.mark.asyncio
+async def test_structured_data_skips_llm(page_fetch):
+    """排名靠前的页面有 JSON-LD 时不调用 LLM"""
+    server, prompts = page_fetch
+
+    result = await extract_event_details_from_search(
+        hits(server, "no_structured_data.html", "jsonld_event.html", "microdata_event.html"),
+        {"title": "Beethoven 9"},
+    )
+    await search_http.aclose()
+
+    assert prompts == []
+    assert result.start_time == "2026-02-15T19:30:00"
+    assert result.location == "Elbphilharmonie Grand Hall"
+    assert result.price_range == "49 - 120 EUR"
+    assert sorted(server.requests) == ["jsonld_event.html", "microdata_event.html", "no_structured_data.html"]
+    assert metrics.counter("structured_data_total", source="json_ld") == 1
+
+
+@pytest.mark.asyncio
+async def test_linked_ical_file(page_fetch):
+    """页面没有 JSON-LD / microdata 时读取其链接的 iCal 文件"""
+    server, prompts = page_fetch
+
+    result = await extract_event_details_from_search(hits(server, "ical_link.html"), {"title": "Hafengeburtstag"})
+    await search_http.aclose()
+
+    assert prompts == []
+    assert result.event_name == "Hafengeburtstag Hamburg 2026"
+    assert result.start_time == "2026-05-08T12:00:00"
+    assert "hafengeburtstag.ics" in server.requests
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_llm(page_fetch):
+    """页面过大、超时或没有结构化数据时回退到 LLM"""
+    server, prompts = page_fetch
+
+    started = time.perf_counter()
+    result = await extract_event_details_from_search(
+        hits(server, "huge.html", "slow.html", "no_structured_data.html"),
+        {"title": "Beethoven 9"},
+    )
+    await search_http.aclose()
+
+    assert len(prompts) == 1
+    assert result.event_name == "From LLM"
+    assert time.perf_counter() - started < 1.5
+    assert metrics.counter("page_fetch_total", result="too_large") == 1
+    assert metrics.counter("page_fetch_total", result="timeout") == 1
+    assert metrics.counter("structured_data_total", source="none") == 1
+
+
+@pytest.mark.asyncio
+async def test_past_edition_page_falls_back_to_llm(page_fetch):
+    """往届活动页面被拒绝，交给能看到日期提示的 LLM"""
+    server, prompts = page_fetch
+
+    result = await extract_event_details_from_search(
+        hits(server, "past_edition.html"),
+        {"title": "Hamburg Marathon", "date_hint": "2026"},
+    )
+    await search_http.aclose()
+
+    assert len(prompts) == 1
+    assert result.event_name == "From LLM"
+
+
+@pytest.mark.asyncio
+async def test_ical_links_below_first_event_not_fetched(page_fetch):
+    """排名更高的页面已有活动时，不再抓取排名更低页面链接的 iCal 文件"""
+    server, prompts = page_fetch
+
+    result = await extract_event_details_from_search(
+        hits(server, "jsonld_event.html", "ical_link.html"),
+        {"title": "Beethoven 9"},
+    )
+    await search_http.aclose()
+
+    assert result.start_time == "2026-02-15T19:30:00"
+    assert sorted(server.requests) == ["ical_link.html", "jsonld_event.html"]
+
+
+@pytest.mark.asyncio
+async def test_page_fetch_disabled(page_fetch, monkeypatch):
+    """ENABLE_PAGE_FETCH=false 时不抓取页面"""
+    server, prompts = page_fetch
+    monkeypatch.setattr(settings, "ENABLE_PAGE_FETCH", False)
+
+    await extract_event_details_from_search(hits(server, "jsonld_event.html"), {"title": "Beethoven 9"})
+
+    assert server.requests == []
+    assert len(prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_redirect_hops_checked(page_fetch, monkeypatch):
+    """每一跳重定向都要通过地址检查；跳转到内网地址时不继续请求"""
+    server, prompts = page_fetch
+    checked = []
+
+    async def fetchable(url):
+        checked.append(url)
+        return url.startswith(server.url)
+
+    monkeypatch.setattr(search_service, "_is_fetchable", fetchable)
+
+    result = await extract_event_details_from_search(
+        [
+            SearchResult(title="out", link=f"{server.url}/redirect/out", snippet=""),
+            SearchResult(title="page", link=f"{server.url}/redirect/jsonld_event.html", snippet=""),
+        ],
+        {"title": "Beethoven 9"},
+    )
+    await search_http.aclose()
+
+    assert prompts == []
+    assert result.start_time == "2026-02-15T19:30:00"
+    assert "http://169.254.169.254/latest/meta-data/" in checked
+    assert f"{server.url}/events/jsonld_event.html" in checked
+    assert sorted(server.requests) == ["jsonld_event.html", "redirect/jsonld_event.html", "redirect_out"]
+    assert metrics.counter("page_fetch_total", result="skipped") == 1
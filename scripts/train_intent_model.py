@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+训练本地意图快速分类模型，并输出评估报告
+
+数据来源：
+- Backend/services/agent/data/intent_seed.jsonl（内置种子样本）
+- 通过 INTENT_LOG_PATH 记录的 (message, LLM intent) 样本（--log 参数）
+
+评估报告：在留出集上统计不同阈值下的覆盖率（跳过 LLM 的比例）、
+与 LLM 意图的一致率，以及估算节省的延迟。评估用的模型和规则置信度
+只用训练集计算，留出集不参与训练和校准。--eval 指定的文件整体作为
+评估集（例如单独标注的线上样本），不参与训练。
+
+用法：
+    python scripts/train_intent_model.py --log logs/intent_samples.jsonl
+    python scripts/train_intent_model.py --log logs/old.jsonl --eval logs/recent.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+# 添加 Backend 目录到路径
+backend_dir = Path(__file__).parent.parent / "Backend"
+sys.path.insert(0, str(backend_dir))
+
+from services.agent.intent_fastpath import (  # noqa: E402
+    DEFAULT_MODEL_PATH,
+    INTENTS,
+    SEED_PATH,
+    IntentModel,
+    classify_fast,
+    compute_rule_precision,
+)
+
+# LLM classification latency assumed when logs carry no measurements (seconds)
+DEFAULT_LLM_LATENCY = 0.8
+
+
+def load_samples(paths):
+    """读取 JSONL 样本，返回 [(message, intent, llm_latency)]"""
+    samples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if row.get("intent") in INTENTS and row.get("message"):
+                    samples.append((row["message"], row["intent"], row.get("llm_latency")))
+    return samples
+
+
+def evaluate(model, precision, holdout, thresholds, mean_latency):
+    """在留出集上评估快速路径（模型和规则置信度都只来自训练集）"""
+    print(f"\n{'threshold':>9} {'coverage':>9} {'agreement':>10} {'saved/turn':>11}")
+    for threshold in thresholds:
+        accepted = agreed = 0
+        for message, intent, _ in holdout:
+            result = classify_fast(message, threshold=threshold, model=model, precision=precision)
+            if result:
+                accepted += 1
+                agreed += result.intent == intent
+        coverage = accepted / len(holdout)
+        agreement = agreed / accepted if accepted else 0.0
+        print(f"{threshold:>9.2f} {coverage:>9.1%} {agreement:>10.1%} {coverage * mean_latency * 1000:>9.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent fast-path model")
+    parser.add_argument("--log", action="append", default=[], help="Logged (message, LLM intent) JSONL file")
+    parser.add_argument("--no-seed", action="store_true", help="Do not include the built-in seed samples")
+    parser.add_argument("--output", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of samples held out for evaluation")
+    parser.add_argument("--eval", action="append", default=[], help="Evaluation-only JSONL file (replaces the holdout split)")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--thresholds", default="0.7,0.8,0.85,0.9,0.95")
+    args = parser.parse_args()
+
+    paths = ([] if args.no_seed else [SEED_PATH]) + [Path(p) for p in args.log]
+    samples = load_samples(paths)
+    if not samples:
+        print("[ERROR] No samples found")
+        sys.exit(1)
+
+    if args.eval:
+        train, holdout = samples, load_samples([Path(p) for p in args.eval])
+    else:
+        random.Random(args.seed).shuffle(samples)
+        split = int(len(samples) * (1 - args.holdout))
+        train, holdout = samples[:split], samples[split:]
+    latencies = [s[2] for s in samples if s[2]]
+    mean_latency = sum(latencies) / len(latencies) if latencies else DEFAULT_LLM_LATENCY
+
+    print(f"[INFO] Samples: {len(samples)} (train {len(train)}, holdout {len(holdout)})")
+    print(f"[INFO] Mean LLM classification latency: {mean_latency * 1000:.0f}ms"
+          + ("" if latencies else " (assumed)"))
+
+    if holdout:
+        model = IntentModel().fit([(m, i) for m, i, _ in train], epochs=args.epochs)
+        precision = compute_rule_precision((m, i) for m, i, _ in train)
+        evaluate(model, precision, holdout, [float(t) for t in args.thresholds.split(",")], mean_latency)
+
+    # 最终模型使用全部样本训练
+    model = IntentModel().fit([(m, i) for m, i, _ in samples], epochs=args.epochs)
+    model.save(Path(args.output))
+    print(f"\n[OK] Saved model to {args.output} ({len(model.weights)} features)")
+
+
+if __name__ == "__main__":
+    main()